@@ -3,6 +3,19 @@ import axios from "axios";
 // Using Vite environment variable or defaulting to localhost
 const BASE_URL = import.meta.env.VITE_API_BASE_URL || "http://127.0.0.1:8000/api";
 
+// crypto.randomUUID only exists in secure contexts (HTTPS or localhost)
+const newIdempotencyKey = () => {
+    if (window.crypto?.randomUUID) {
+        return window.crypto.randomUUID();
+    }
+    const bytes = new Uint8Array(16);
+    window.crypto.getRandomValues(bytes);
+    bytes[6] = (bytes[6] & 0x0f) | 0x40;
+    bytes[8] = (bytes[8] & 0x3f) | 0x80;
+    const hex = Array.from(bytes, (b) => b.toString(16).padStart(2, "0")).join("");
+    return `${hex.slice(0, 8)}-${hex.slice(8, 12)}-${hex.slice(12, 16)}-${hex.slice(16, 20)}-${hex.slice(20)}`;
+};
+
 const api = axios.create({
     baseURL: BASE_URL,
     headers: {
@@ -17,6 +30,11 @@ api.interceptors.request.use(
         if (token) {
             config.headers.Authorization = `Bearer ${token}`;
         }
+        // One key per logical request: retries (e.g. after a token refresh) reuse
+        // this config, so the server replays the first response instead of redoing it
+        if (config.method !== "get" && !config.headers["Idempotency-Key"]) {
+            config.headers["Idempotency-Key"] = newIdempotencyKey();
+        }
         return config;
     },
     (error) => Promise.reject(error)
@@ -9,6 +9,8 @@ const StockAssign = () => {
     const [productId, setProductId] = useState("");
     const [warehouseId, setWarehouseId] = useState("");
     const [quantity, setQuantity] = useState(1);
+    const [file, setFile] = useState(null);
+    const [report, setReport] = useState(null);
     const navigate = useNavigate();
     const { showToast } = useToast();
 
@@ -48,6 +50,24 @@ const StockAssign = () => {
         }
     };
 
+    const handleBulkSubmit = async (e) => {
+        e.preventDefault();
+        const formData = new FormData();
+        formData.append("file", file);
+        try {
+            const res = await api.post("/stocks/assign/bulk/", formData, {
+                headers: { "Content-Type": "multipart/form-data" },
+            });
+            setReport(res.data);
+            showToast(`Assigned ${res.data.assigned} of ${res.data.total} lines`, res.data.assigned === res.data.total ? "success" : "error");
+        } catch (err) {
+            console.error(err);
+            showToast("Failed to import stock: " + (err.response?.data?.error || err.message), "error");
+        }
+    };
+
+    const problems = report ? report.results.filter(r => r.status !== "ASSIGNED") : [];
+
     return (
         <div style={{ maxWidth: '600px', background: 'white', padding: '20px', borderRadius: '8px' }}>
             <h2>Assign Stock</h2>
@@ -78,6 +98,26 @@ const StockAssign = () => {
 
                 <button type="submit">Assign Stock</button>
             </form>
+
+            <h3 style={{ marginTop: '30px' }}>Bulk Import</h3>
+            <form onSubmit={handleBulkSubmit}>
+                <div className="form-group">
+                    <label>CSV (product_id, warehouse_id, quantity) or JSON-lines file</label>
+                    <input type="file" accept=".csv,.jsonl,.ndjson" onChange={e => setFile(e.target.files[0])} required />
+                </div>
+                <button type="submit">Import</button>
+            </form>
+
+            {report && (
+                <div style={{ marginTop: '15px' }}>
+                    <p>{report.assigned} assigned, {report.rejected} rejected, {report.failed} failed</p>
+                    {problems.length > 0 && (
+                        <ul style={{ maxHeight: '200px', overflowY: 'auto' }}>
+                            {problems.map(r => <li key={r.line}>Line {r.line}: {r.error}</li>)}
+                        </ul>
+                    )}
+                </div>
+            )}
         </div>
     );
 };
@@ -250,31 +250,21 @@ const ProductList = () => {
 
   const handleCheckout = async () => {
     if (cart.length === 0) return;
-    let successCount = 0;
-    let failCount = 0;
-    let firstError = null;
-
-    for (const item of cart) {
-      try {
-        await api.post("/purchase-requests/", {
+    try {
+      // One call for the whole cart: the server places one order per warehouse
+      const res = await api.post("/purchase-requests/", {
+        lines: cart.map(item => ({
           product: item.productId,
           warehouse: item.warehouseId,
           quantity: item.quantity
-        });
-        successCount++;
-      } catch (err) {
-        if (!firstError) firstError = err.response?.data ? JSON.stringify(err.response.data) : err.message;
-        failCount++;
-      }
-    }
-
-    let msg = `Checkout complete.\nSent: ${successCount}\nFailed: ${failCount}`;
-    if (failCount > 0) msg += `\n\nError Detail: ${firstError}`;
-    showToast(msg, failCount > 0 ? "error" : "success");
-
-    if (successCount > 0 && failCount === 0) {
+        }))
+      });
+      showToast(`Checkout complete.\nOrders placed: ${res.data.orders.length}`, "success");
       setCart([]);
       setIsCartOpen(false);
+    } catch (err) {
+      const detail = err.response?.data ? JSON.stringify(err.response.data) : err.message;
+      showToast(`Checkout failed.\n\nError Detail: ${detail}`, "error");
     }
   };
 
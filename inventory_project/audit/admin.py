@@ -1,5 +1,5 @@
 from django.contrib import admin
-from audit.models import AuthAuditLog
+from audit.models import ActivityLog, AuthAuditLog
 
 
 @admin.register(AuthAuditLog)
@@ -15,3 +15,14 @@ class AuthAuditLogAdmin(admin.ModelAdmin):
     
     def has_delete_permission(self, request, obj=None):
         return request.user.is_superuser
+
+
+@admin.register(ActivityLog)
+class ActivityLogAdmin(admin.ModelAdmin):
+    list_display = ['event_type', 'warehouse', 'actor', 'occurred_at']
+    list_filter = ['event_type', 'occurred_at']
+    readonly_fields = ['outbox_event_id', 'event_type', 'actor', 'warehouse', 'payload', 'occurred_at']
+    date_hierarchy = 'occurred_at'
+
+    def has_add_permission(self, request):
+        return False
@@ -61,3 +61,39 @@ class AuthAuditLog(models.Model):
     
     def __str__(self):
         return f"{self.username_attempted} - {self.status} at {self.timestamp}"
+
+
+class ActivityLog(models.Model):
+    """
+    Append-only record of business decisions, written from outbox domain
+    events by audit.subscribers (one row per event, so replays are harmless).
+    """
+    outbox_event_id = models.BigIntegerField(unique=True)
+    event_type = models.CharField(max_length=64)
+    actor = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="activity_logs",
+    )
+    warehouse = models.ForeignKey(
+        "warehouses.Warehouse",  # String reference
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="activity_logs",
+    )
+    payload = models.JSONField(default=dict)
+    occurred_at = models.DateTimeField()
+
+    class Meta:
+        db_table = 'audit_activity_log'
+        ordering = ['-occurred_at']
+        indexes = [
+            models.Index(fields=['warehouse', '-occurred_at']),
+            models.Index(fields=['event_type', '-occurred_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.event_type} at {self.occurred_at}"
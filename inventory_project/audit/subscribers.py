@@ -0,0 +1,27 @@
+from core.events import PurchaseDecided, StaffAssigned, TransferDecided, WarehouseDeleted, subscriber
+from audit.models import ActivityLog
+
+
+def _warehouse_id(event):
+    return getattr(event, "warehouse_id", None) or getattr(event, "source_warehouse_id", None)
+
+
+@subscriber("audit_log", PurchaseDecided, TransferDecided, StaffAssigned, WarehouseDeleted)
+def record_activity(records):
+    """
+    One ActivityLog row per decision event; already recorded events are skipped.
+    """
+    ActivityLog.objects.bulk_create(
+        [
+            ActivityLog(
+                outbox_event_id=record.id,
+                event_type=record.event_type,
+                actor_id=record.event.actor_id,
+                warehouse_id=_warehouse_id(record.event),
+                payload=record.payload,
+                occurred_at=record.created_at,
+            )
+            for record in records
+        ],
+        ignore_conflicts=True,
+    )
@@ -1,3 +1,22 @@
 from django.contrib import admin
+from core.models import IdempotencyKey, OutboxConsumer, OutboxEvent
 
-# Register your models here.
+
+@admin.register(OutboxEvent)
+class OutboxEventAdmin(admin.ModelAdmin):
+    list_display = ['id', 'event_type', 'created_at']
+    list_filter = ['event_type']
+    readonly_fields = ['event_type', 'payload', 'created_at']
+
+
+@admin.register(OutboxConsumer)
+class OutboxConsumerAdmin(admin.ModelAdmin):
+    list_display = ['name', 'last_event_id', 'stuck_event_id', 'failed_attempts', 'updated_at']
+    readonly_fields = ['pending_gaps', 'stuck_event_id', 'failed_attempts', 'parked_event_ids', 'last_error', 'updated_at']
+
+
+@admin.register(IdempotencyKey)
+class IdempotencyKeyAdmin(admin.ModelAdmin):
+    list_display = ['key', 'user', 'method', 'path', 'status_code', 'created_at', 'expires_at']
+    list_filter = ['method', 'status_code']
+    readonly_fields = ['user', 'key', 'method', 'path', 'request_hash', 'status_code', 'response_body', 'created_at', 'expires_at']
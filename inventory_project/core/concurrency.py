@@ -0,0 +1,73 @@
+"""
+Optimistic concurrency for models with an integer `version` column.
+
+Instead of locking a row while deciding what to write, read it freely and
+write back with UPDATE ... WHERE version = <the version read>, bumping the
+version. If someone else wrote in between, nothing is updated and the
+change is recomputed from a fresh read (a bounded number of times) rather
+than silently overwriting theirs.
+"""
+import time
+
+from django.db.models import F
+
+
+class ConcurrentUpdate(Exception):
+    """
+    A row kept changing under a compare-and-swap update.
+    """
+
+    def __init__(self, model, pk, attempts):
+        self.model = model
+        self.pk = pk
+        self.attempts = attempts
+        super().__init__(f"{model.__name__} {pk} was modified concurrently")
+
+
+def compare_and_swap(instance, fields):
+    """
+    Write instance's fields only if its row still has instance.version.
+
+    Returns:
+        True when written (instance.version is then the new version),
+        False when the row changed or disappeared since instance was read.
+    """
+    model = type(instance)
+    values = {name: getattr(instance, name) for name in fields}
+    updated = (
+        model._default_manager
+        .filter(pk=instance.pk, version=instance.version)
+        .update(version=F("version") + 1, **values)
+    )
+    if updated:
+        instance.version += 1
+    return bool(updated)
+
+
+def cas_update(model, pk, apply, attempts=3, backoff_seconds=0.01, sleep=time.sleep):
+    """
+    Read-modify-write one row without locking it.
+
+    apply(instance) changes a freshly read instance and returns the names
+    of the fields it changed, or None to write nothing (e.g. the row is no
+    longer in a state the change applies to). On a version conflict the row
+    is read again and apply runs again, up to attempts times, waiting
+    backoff_seconds (doubling) between tries.
+
+    Returns:
+        The written instance, or None when apply declined.
+
+    Raises:
+        model.DoesNotExist: no such row.
+        ConcurrentUpdate: still conflicting after attempts tries.
+    """
+    for attempt in range(attempts):
+        instance = model._default_manager.get(pk=pk)
+        fields = apply(instance)
+        if fields is None:
+            return None
+        if compare_and_swap(instance, fields):
+            return instance
+        if attempt + 1 < attempts:
+            sleep(backoff_seconds * 2 ** attempt)
+    raise ConcurrentUpdate(model, pk, attempts)
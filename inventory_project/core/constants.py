@@ -47,6 +47,26 @@ class Gender:
     ]
 
 
+class MovementKind:
+    """Stock movement ledger entry kinds."""
+    PURCHASE = "PURCHASE"
+    TRANSFER_IN = "TRANSFER_IN"
+    TRANSFER_OUT = "TRANSFER_OUT"
+    ASSIGN = "ASSIGN"
+    RELOCATION_IN = "RELOCATION_IN"
+    RELOCATION_OUT = "RELOCATION_OUT"
+
+    CHOICES = [
+        (PURCHASE, "Purchase"),
+        (TRANSFER_IN, "Transfer In"),
+        (TRANSFER_OUT, "Transfer Out"),
+        (ASSIGN, "Stock Assignment"),
+        (RELOCATION_IN, "Relocation In"),
+        (RELOCATION_OUT, "Relocation Out"),
+    ]
+
+
 # Configuration Defaults
 DEFAULT_LOW_STOCK_THRESHOLD = 10
+DEFAULT_LOW_STOCK_HYSTERESIS = 0  # Units above threshold before a low stock counts as recovered
 DEFAULT_PAGE_SIZE = 10
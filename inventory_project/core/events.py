@@ -0,0 +1,364 @@
+"""
+Domain events and the transactional outbox.
+
+publish() writes events to OutboxEvent inside the caller's transaction, so
+an event exists exactly when the change that caused it commits. Side effects
+(alerts, dashboard summaries, rollups, audit) subscribe with @subscriber and
+receive events in batches from dispatch_events(), run by the dispatch_events
+worker. Every subscriber keeps its own position and can be replayed alone.
+"""
+import dataclasses
+import logging
+import time
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Optional
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Min, Q
+from django.utils import timezone
+
+from core.sequences import scan
+
+logger = logging.getLogger(__name__)
+
+EVENT_TYPES = {}
+
+_SUBSCRIBERS = {}
+
+
+# ---------------------------------------------------------
+# Event types
+# ---------------------------------------------------------
+@dataclass(frozen=True)
+class DomainEvent:
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        EVENT_TYPES[cls.__name__] = cls
+
+    @property
+    def event_type(self):
+        return type(self).__name__
+
+    def to_payload(self):
+        return dataclasses.asdict(self)
+
+
+@dataclass(frozen=True)
+class StockChanged(DomainEvent):
+    """
+    A stock row's quantity changed. quantity is None when the row was
+    deleted, previous_quantity when it was created (or not known).
+    """
+    warehouse_id: int
+    product_id: int
+    quantity: Optional[int]
+    previous_quantity: Optional[int] = None
+
+
+@dataclass(frozen=True)
+class StockBatchChanged(DomainEvent):
+    """
+    Many stock changes written together, published once per batch.
+    changes: [warehouse_id, product_id, quantity, previous_quantity] rows.
+    """
+    changes: list
+
+
+STOCK_EVENTS = (StockChanged, StockBatchChanged)
+
+
+@dataclass(frozen=True)
+class PurchaseDecided(DomainEvent):
+    purchase_request_id: int
+    warehouse_id: int
+    product_id: int
+    quantity: int
+    decision: str
+    actor_id: Optional[int] = None
+
+
+@dataclass(frozen=True)
+class TransferDecided(DomainEvent):
+    transfer_request_id: int
+    source_warehouse_id: int
+    destination_warehouse_id: int
+    product_id: int
+    quantity: int
+    decision: str
+    actor_id: Optional[int] = None
+
+
+@dataclass(frozen=True)
+class StaffAssigned(DomainEvent):
+    """A staff member moved warehouse; warehouse_id is None when unassigned."""
+    staff_id: int
+    user_id: int
+    warehouse_id: Optional[int]
+    previous_warehouse_id: Optional[int] = None
+    actor_id: Optional[int] = None
+
+
+@dataclass(frozen=True)
+class WarehouseDeleted(DomainEvent):
+    warehouse_id: int
+    actor_id: Optional[int] = None
+
+
+def load_event(event_type, payload):
+    return EVENT_TYPES[event_type](**payload)
+
+
+def stock_changes(records):
+    """
+    Flatten StockChanged and StockBatchChanged records into StockChanged
+    events, in order.
+    """
+    for record in records:
+        event = record.event
+        if isinstance(event, StockBatchChanged):
+            for change in event.changes:
+                yield StockChanged(*change)
+        elif isinstance(event, StockChanged):
+            yield event
+
+
+# ---------------------------------------------------------
+# Publishing
+# ---------------------------------------------------------
+def publish(*events):
+    """
+    Write events to the outbox. Call inside the transaction making the change.
+    """
+    from core.models import OutboxEvent
+
+    now = timezone.now()
+    rows = [
+        OutboxEvent(event_type=event.event_type, payload=event.to_payload(), created_at=now)
+        for event in events
+    ]
+    if len(rows) == 1:
+        rows[0].save()
+    elif rows:
+        OutboxEvent.objects.bulk_create(rows)
+
+
+def subscriber(name, *event_classes):
+    """
+    Register handler(records) as the consumer `name` of the given event types.
+
+    records is a list of OutboxEvent rows in id order (record.event is the
+    typed event). The handler runs in the transaction that advances the
+    consumer, so its writes commit together with its position. A failing
+    batch is retried on the next pass, so handlers should be idempotent.
+    """
+    def decorator(handler):
+        _SUBSCRIBERS[name] = (tuple(cls.__name__ for cls in event_classes), handler)
+        return handler
+    return decorator
+
+
+def subscribers():
+    return dict(_SUBSCRIBERS)
+
+
+# ---------------------------------------------------------
+# Dispatch
+# ---------------------------------------------------------
+def _handle_one_by_one(consumer, handler, records, max_attempts):
+    """
+    After a batch failed, hand its events over one at a time (each in a
+    savepoint) to find the one that fails. An event that has failed
+    max_attempts passes in a row is parked: logged, added to the consumer's
+    parked_event_ids and skipped.
+
+    Returns:
+        The failing event, or None when every event was handled or parked.
+    """
+    for record in records:
+        try:
+            with transaction.atomic():
+                handler([record])
+        except Exception as exc:
+            logger.exception("Outbox consumer %s failed on event %s", consumer.name, record.id)
+            if record.id == consumer.stuck_event_id:
+                consumer.failed_attempts += 1
+            else:
+                consumer.stuck_event_id = record.id
+                consumer.failed_attempts = 1
+            consumer.last_error = str(exc)[:2000]
+            if consumer.failed_attempts < max_attempts:
+                return record
+
+            logger.error(
+                "Outbox consumer %s parked event %s after %s attempts",
+                consumer.name, record.id, consumer.failed_attempts,
+            )
+            consumer.parked_event_ids = consumer.parked_event_ids + [record.id]
+            consumer.last_error = f"Parked event {record.id}: {consumer.last_error}"[:2000]
+            consumer.stuck_event_id = None
+            consumer.failed_attempts = 0
+    return None
+
+
+def _deliver(name, event_types, handler, batch_size, gap_seconds, max_attempts):
+    """
+    Hand one batch to one consumer.
+
+    Returns:
+        (events handled, more to read), or None when the consumer is held by
+        another worker or an event failed.
+    """
+    from core.models import OutboxConsumer, OutboxEvent
+
+    with transaction.atomic():
+        consumer = (
+            OutboxConsumer.objects
+            .select_for_update(skip_locked=True)
+            .filter(name=name)
+            .first()
+        )
+        if consumer is None:
+            return None
+
+        filled, position, gaps, more = scan(
+            OutboxEvent.objects.all(),
+            consumer.last_event_id,
+            consumer.pending_gaps,
+            batch_size,
+            gap_seconds,
+        )
+        records = list(
+            OutboxEvent.objects
+            .filter(
+                Q(id__in=filled) | Q(id__gt=consumer.last_event_id, id__lte=position),
+                event_type__in=event_types,
+            )
+            .order_by("id")
+        )
+
+        failed = None
+        try:
+            with transaction.atomic():
+                if records:
+                    handler(records)
+        except Exception:
+            batch_failed = True
+        else:
+            batch_failed = False
+            consumer.last_error = ""
+        if batch_failed:
+            failed = _handle_one_by_one(consumer, handler, records, max_attempts)
+
+        if failed is None:
+            consumer.stuck_event_id = None
+            consumer.failed_attempts = 0
+        else:
+            # Keep what was handled before the failing event; it and every
+            # later event of the batch are delivered again on the next pass
+            if failed.id > consumer.last_event_id:
+                position = failed.id - 1
+            else:
+                position = consumer.last_event_id
+            gaps = {key: missed for key, missed in gaps.items() if int(key) < position}
+            now = time.time()
+            gaps.update({str(record.id): now for record in records if failed.id <= record.id <= position})
+
+        consumer.last_event_id = position
+        consumer.pending_gaps = gaps
+        consumer.save(update_fields=[
+            "last_event_id", "pending_gaps", "failed_attempts", "stuck_event_id",
+            "parked_event_ids", "last_error", "updated_at",
+        ])
+        if failed is not None:
+            return None
+        return len(records), more
+
+
+def dispatch_events(batch_size=500, gap_seconds=60, names=None, max_attempts=None):
+    """
+    Deliver new outbox events to every subscriber (or only `names`).
+
+    An event id missing below a consumer's position may belong to a
+    transaction still in flight: the consumer keeps it as a gap and gets the
+    event when it commits, for up to gap_seconds (see core.sequences).
+    A subscriber that fails stops for this pass and retries on the next,
+    from the failing event (stuck_event_id). An event that fails
+    max_attempts (default OUTBOX_MAX_ATTEMPTS) passes in a row is parked so
+    the subscriber moves on; see parked_event_ids.
+
+    Returns:
+        {consumer name: events handled}
+    """
+    from core.models import OutboxConsumer
+
+    registered = {
+        name: spec for name, spec in _SUBSCRIBERS.items()
+        if names is None or name in names
+    }
+    # New consumers start at the beginning of the outbox
+    OutboxConsumer.objects.bulk_create(
+        [OutboxConsumer(name=name) for name in registered],
+        ignore_conflicts=True,
+    )
+
+    if max_attempts is None:
+        max_attempts = settings.OUTBOX_MAX_ATTEMPTS
+
+    handled = {name: 0 for name in registered}
+    for name, (event_types, handler) in registered.items():
+        while True:
+            result = _deliver(name, event_types, handler, batch_size, gap_seconds, max_attempts)
+            if result is None:
+                break
+            count, more = result
+            handled[name] += count
+            if not more:
+                break
+    return handled
+
+
+def replay(name, from_event_id=0):
+    """
+    Rewind one consumer so it receives every event after from_event_id again.
+    """
+    from core.models import OutboxConsumer
+
+    OutboxConsumer.objects.update_or_create(
+        name=name,
+        defaults={
+            "last_event_id": from_event_id,
+            "pending_gaps": {},
+            "failed_attempts": 0,
+            "stuck_event_id": None,
+            "last_error": "",
+        },
+    )
+
+
+def prune_outbox(older_than_days):
+    """
+    Delete events older than the given age that every consumer has handled.
+    Parked events are kept for inspection and replay.
+
+    Returns:
+        Number of events deleted.
+    """
+    from core.models import OutboxConsumer, OutboxEvent
+
+    floor = OutboxConsumer.objects.aggregate(low=Min("last_event_id"))["low"] or 0
+    parked = {
+        event_id
+        for event_ids in OutboxConsumer.objects.values_list("parked_event_ids", flat=True)
+        for event_id in event_ids
+    }
+    cutoff = timezone.now() - timedelta(days=older_than_days)
+    deleted, _ = (
+        OutboxEvent.objects
+        .filter(id__lte=floor, created_at__lt=cutoff)
+        .exclude(id__in=parked)
+        .delete()
+    )
+    return deleted
@@ -0,0 +1,180 @@
+"""
+Idempotency-Key support for state-changing endpoints.
+
+A client that may resend a request (timeout, token refresh) sends the same
+Idempotency-Key header with every attempt. The first attempt runs and its
+response is stored with the key in the same transaction as the request's
+own writes; later attempts get that response back (with an
+Idempotent-Replayed header) instead of running again. A concurrent attempt
+waits on the key's unique index until the first one commits or rolls back.
+Requests that raise (including validation errors), fail with a server
+error or lose a conflict (409) store nothing and can be retried as they are.
+
+    class StockAssignAPIView(APIView):
+        @idempotent
+        def post(self, request): ...
+"""
+import functools
+import hashlib
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+MAX_KEY_LENGTH = 255
+
+
+def _request_hash(request):
+    digest = hashlib.sha256()
+    digest.update(request.method.encode())
+    digest.update(request.get_full_path().encode())
+    digest.update(request.body)
+    return digest.hexdigest()
+
+
+def _replay(record, request_hash):
+    if record.request_hash != request_hash:
+        return Response(
+            {"error": f"{HEADER} was already used for a different request"},
+            status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+        )
+    response = Response(record.response_body, status=record.status_code)
+    response[REPLAYED_HEADER] = "true"
+    return response
+
+
+def _key_too_long():
+    return Response(
+        {"error": f"{HEADER} must be at most {MAX_KEY_LENGTH} characters"},
+        status=status.HTTP_400_BAD_REQUEST,
+    )
+
+
+def _claim(user, key, request, request_hash, now):
+    """
+    Insert the key row, or return the live row already holding the key.
+    """
+    from core.models import IdempotencyKey
+
+    record = IdempotencyKey(
+        user=user,
+        key=key,
+        method=request.method,
+        path=request.path[:255],
+        request_hash=request_hash,
+        status_code=0,
+        created_at=now,
+        expires_at=now + timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL_SECONDS),
+    )
+    for _ in range(2):
+        try:
+            with transaction.atomic():
+                record.save(force_insert=True)
+            return record, None
+        except IntegrityError:
+            existing = IdempotencyKey.objects.filter(user=user, key=key).first()
+            if existing is None:
+                continue
+            if existing.expires_at > now:
+                return None, existing
+            # Expired: the key may be used afresh
+            existing.delete()
+    raise IntegrityError(f"Could not claim {HEADER} {key!r}")
+
+
+def idempotent(view_method):
+    """
+    Make an APIView handler honour the Idempotency-Key header. Requests
+    without the header, and anonymous ones, run as before.
+    """
+    @functools.wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if not key or not request.user.is_authenticated:
+            return view_method(self, request, *args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            return _key_too_long()
+
+        request_hash = _request_hash(request)
+        with transaction.atomic():
+            record, existing = _claim(request.user, key, request, request_hash, timezone.now())
+            if existing is not None:
+                return _replay(existing, request_hash)
+
+            response = view_method(self, request, *args, **kwargs)
+            if response.status_code >= 500 or response.status_code == status.HTTP_409_CONFLICT:
+                # Roll back the request and the key together so a retry runs
+                # again: a conflict (e.g. a lost compare-and-swap) is transient
+                transaction.set_rollback(True)
+                return response
+
+            record.status_code = response.status_code
+            record.response_body = response.data
+            record.save(update_fields=["status_code", "response_body"])
+        return response
+
+    return wrapper
+
+
+def idempotent_in_steps(view_method):
+    """
+    @idempotent for handlers that commit in several transactions of their
+    own (e.g. chunked imports), so they cannot run in one transaction with
+    the key. The key is committed before the handler runs: an attempt
+    arriving meanwhile gets 409, later ones the stored response. A handler
+    that raises part way stores a 500 with the key, since the steps it
+    committed must not be applied again by a retry.
+    """
+    @functools.wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if not key or not request.user.is_authenticated:
+            return view_method(self, request, *args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            return _key_too_long()
+
+        request_hash = _request_hash(request)
+        with transaction.atomic():
+            record, existing = _claim(request.user, key, request, request_hash, timezone.now())
+        if existing is not None:
+            if existing.status_code == 0 and existing.request_hash == request_hash:
+                return Response(
+                    {"error": f"A request with this {HEADER} is still being processed"},
+                    status=status.HTTP_409_CONFLICT,
+                )
+            return _replay(existing, request_hash)
+
+        try:
+            response = view_method(self, request, *args, **kwargs)
+        except Exception:
+            record.status_code = status.HTTP_500_INTERNAL_SERVER_ERROR
+            record.response_body = {
+                "error": "The request stopped part way; check what was applied before sending it again"
+            }
+            record.save(update_fields=["status_code", "response_body"])
+            raise
+
+        record.status_code = response.status_code
+        record.response_body = response.data
+        record.save(update_fields=["status_code", "response_body"])
+        return response
+
+    return wrapper
+
+
+def prune_idempotency_keys():
+    """
+    Delete expired keys.
+
+    Returns:
+        Number of keys deleted.
+    """
+    from core.models import IdempotencyKey
+
+    deleted, _ = IdempotencyKey.objects.filter(expires_at__lte=timezone.now()).delete()
+    return deleted
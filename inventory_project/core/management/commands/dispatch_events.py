@@ -0,0 +1,95 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.events import dispatch_events, prune_outbox, replay, subscribers
+from core.models import OutboxConsumer
+
+
+class Command(BaseCommand):
+    help = "Deliver outbox domain events to their subscribers"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument(
+            "--gap-seconds",
+            type=int,
+            default=60,
+            help="How long a missing event id is waited for before it is skipped",
+        )
+        parser.add_argument(
+            "--max-attempts",
+            type=int,
+            help="Passes an event may fail before it is parked (default OUTBOX_MAX_ATTEMPTS)",
+        )
+        parser.add_argument(
+            "--consumer",
+            action="append",
+            dest="consumers",
+            help="Only deliver to this subscriber (repeatable)",
+        )
+        parser.add_argument(
+            "--replay-from",
+            type=int,
+            metavar="EVENT_ID",
+            help="Rewind the --consumer subscribers to just after this event id first",
+        )
+        parser.add_argument(
+            "--prune-days",
+            type=int,
+            help="Afterwards, delete handled events older than this many days",
+        )
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Keep polling instead of exiting after one pass",
+        )
+        parser.add_argument("--interval", type=float, default=2.0, help="Seconds between polls with --loop")
+
+    def handle(self, *args, **options):
+        names = options["consumers"]
+        if names:
+            unknown = set(names) - set(subscribers())
+            if unknown:
+                raise CommandError(f"Unknown subscriber(s): {', '.join(sorted(unknown))}")
+
+        if options["replay_from"] is not None:
+            if not names:
+                raise CommandError("--replay-from needs --consumer")
+            for name in names:
+                replay(name, options["replay_from"])
+
+        totals = {}
+        while True:
+            handled = dispatch_events(
+                batch_size=options["batch_size"],
+                gap_seconds=options["gap_seconds"],
+                names=names,
+                max_attempts=options["max_attempts"],
+            )
+            for name, count in handled.items():
+                totals[name] = totals.get(name, 0) + count
+
+            if not options["loop"]:
+                break
+            time.sleep(options["interval"])
+
+        if options["prune_days"] is not None:
+            pruned = prune_outbox(options["prune_days"])
+            self.stdout.write(f"Pruned {pruned} outbox event(s)")
+
+        consumers = OutboxConsumer.objects.exclude(stuck_event_id=None, parked_event_ids=[])
+        if names:
+            consumers = consumers.filter(name__in=names)
+        for consumer in consumers.order_by("name"):
+            if consumer.stuck_event_id is not None:
+                self.stdout.write(self.style.WARNING(
+                    f"{consumer.name} is stuck on event {consumer.stuck_event_id} "
+                    f"({consumer.failed_attempts} failed attempt(s)): {consumer.last_error}"
+                ))
+            if consumer.parked_event_ids:
+                parked = ", ".join(str(event_id) for event_id in consumer.parked_event_ids)
+                self.stdout.write(self.style.WARNING(f"{consumer.name} parked event(s): {parked}"))
+
+        summary = ", ".join(f"{name}: {count}" for name, count in sorted(totals.items())) or "no subscribers"
+        self.stdout.write(self.style.SUCCESS(f"Events dispatched ({summary})"))
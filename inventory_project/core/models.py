@@ -1,3 +1,87 @@
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
+from django.utils import timezone
 
-# Shared base models and utilities will go here
+
+class OutboxEvent(models.Model):
+    """
+    Domain event written in the transaction that caused it (see core.events).
+    Append-only: consumers track their own position in OutboxConsumer.
+    """
+    event_type = models.CharField(max_length=64)
+    payload = models.JSONField(default=dict)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = 'core_outbox_event'
+        indexes = [
+            models.Index(fields=["created_at"]),
+            models.Index(fields=["event_type", "id"]),
+        ]
+
+    def __str__(self):
+        return f"{self.id} {self.event_type}"
+
+    @property
+    def event(self):
+        """The payload as its typed event class."""
+        from core.events import load_event
+        return load_event(self.event_type, self.payload)
+
+
+class OutboxConsumer(models.Model):
+    """
+    Delivery position of one subscriber. Events up to last_event_id have
+    been handled, except the ids in pending_gaps that had not committed yet;
+    resetting it replays the outbox to that subscriber. Events it kept failing
+    on were skipped and are listed in parked_event_ids.
+    """
+    name = models.CharField(max_length=100, unique=True)
+    last_event_id = models.BigIntegerField(default=0)
+    pending_gaps = models.JSONField(default=dict, blank=True)
+    # The event the consumer is failing on, and how many passes in a row it failed
+    stuck_event_id = models.BigIntegerField(null=True, blank=True)
+    failed_attempts = models.PositiveIntegerField(default=0)
+    # Events skipped after failing OUTBOX_MAX_ATTEMPTS times
+    parked_event_ids = models.JSONField(default=list, blank=True)
+    last_error = models.TextField(blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'core_outbox_consumer'
+
+    def __str__(self):
+        return f"{self.name} @ {self.last_event_id}"
+
+
+class IdempotencyKey(models.Model):
+    """
+    The stored response of a state-changing request sent with an
+    Idempotency-Key header (see core.idempotency). Written in the request's
+    own transaction, so it exists exactly when the request's effects do.
+    """
+    user = models.ForeignKey(
+        "accounts.User",
+        on_delete=models.CASCADE,
+        related_name="idempotency_keys"
+    )
+    key = models.CharField(max_length=255)
+    method = models.CharField(max_length=10)
+    path = models.CharField(max_length=255)
+    request_hash = models.CharField(max_length=64)
+    status_code = models.PositiveSmallIntegerField()
+    response_body = models.JSONField(null=True, encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(default=timezone.now)
+    expires_at = models.DateTimeField()
+
+    class Meta:
+        db_table = 'core_idempotency_key'
+        constraints = [
+            models.UniqueConstraint(fields=["user", "key"], name="idempotency_key_unique_per_user"),
+        ]
+        indexes = [
+            models.Index(fields=["expires_at"]),
+        ]
+
+    def __str__(self):
+        return f"{self.key} {self.method} {self.path} -> {self.status_code}"
@@ -1,4 +1,13 @@
+import base64
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
 from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 from core.constants import DEFAULT_PAGE_SIZE
 
 
@@ -6,3 +15,120 @@ class StandardResultsSetPagination(PageNumberPagination):
     page_size = DEFAULT_PAGE_SIZE
     page_size_query_param = 'page_size'
     max_page_size = 1000
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError(f"Cannot encode {type(value).__name__} in a cursor")
+
+
+def encode_cursor(values):
+    """
+    Encode a list of keyset values into an opaque, URL-safe token.
+    """
+    raw = json.dumps(values, default=_json_default, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token):
+    """
+    Decode a token produced by encode_cursor. Raises NotFound if malformed.
+    """
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+    except (ValueError, TypeError):
+        raise NotFound("Invalid cursor")
+    if not isinstance(values, list):
+        raise NotFound("Invalid cursor")
+    return values
+
+
+def wants_cursor_pagination(params):
+    """
+    Cursor mode is opt-in: ?pagination=cursor or an explicit cursor token.
+    """
+    return params.get("pagination") == "cursor" or bool(params.get("cursor"))
+
+
+class KeysetPagination:
+    """
+    Opt-in cursor pagination over a (sort-key, id) keyset.
+
+    Each page is a single indexed range query regardless of depth and no
+    COUNT(*) is issued. The cursor is opaque to clients; it carries the
+    ordering and the sort-key/id of the last row served.
+    """
+    page_size = DEFAULT_PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+    cursor_query_param = 'cursor'
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except (TypeError, ValueError):
+            size = self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def paginate_queryset(self, queryset, request, ordering="-id"):
+        """
+        Args:
+            ordering: A single field (optionally "-" prefixed); "id" is
+                      appended in the same direction as the tie-breaker.
+        """
+        self.request = request
+        self.ordering = ordering
+        descending = ordering.startswith("-")
+        field = ordering.lstrip("-")
+        direction = "-" if descending else ""
+
+        token = request.query_params.get(self.cursor_query_param)
+        if token:
+            values = decode_cursor(token)
+            if len(values) != 3 or values[0] != ordering:
+                raise NotFound("Cursor does not match the requested ordering")
+            _, sort_value, last_id = values
+            op = "lt" if descending else "gt"
+
+            if field == "id":
+                queryset = queryset.filter(**{f"id__{op}": last_id})
+            else:
+                queryset = queryset.filter(
+                    Q(**{f"{field}__{op}": sort_value})
+                    | Q(**{field: sort_value, f"id__{op}": last_id})
+                )
+
+        order_by = [ordering] if field == "id" else [ordering, f"{direction}id"]
+        page_size = self.get_page_size(request)
+        rows = list(queryset.order_by(*order_by)[:page_size + 1])
+
+        self.has_next = len(rows) > page_size
+        rows = rows[:page_size]
+        self.next_cursor = None
+        if self.has_next:
+            last = rows[-1]
+            self.next_cursor = encode_cursor([ordering, self._value(last, field), last.id])
+        return rows
+
+    def _value(self, obj, field):
+        value = obj
+        for part in field.split("__"):
+            value = getattr(value, part)
+        return value
+
+    def get_next_link(self):
+        if not self.next_cursor:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_response(self, data):
+        return Response({
+            "next": self.get_next_link(),
+            "next_cursor": self.next_cursor,
+            "results": data,
+        })
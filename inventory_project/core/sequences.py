@@ -0,0 +1,59 @@
+"""
+Reading an append-only table in id order while writers are still committing.
+
+Ids are handed out when a row is inserted, not when its transaction
+commits, so after a reader has seen id 12 the row with id 11 can still
+appear. A position that jumps to the highest id seen would skip it for
+good. Instead, the ids missing below the position are kept as gaps and
+picked up once their rows commit. A gap that never fills is an insert that
+rolled back (or a skipped sequence value) and is dropped after gap_seconds.
+"""
+import time
+
+# Most gaps one reader keeps; a larger hole is a rolled back bulk insert
+MAX_GAPS = 10000
+
+
+def scan(queryset, position, gaps, batch_size, gap_seconds):
+    """
+    Find the rows of queryset (ids and created_at) to read next.
+
+    Args:
+        position: Highest id read so far.
+        gaps: {str(id): epoch seconds first missed} below position, as
+            returned by the previous scan.
+
+    Returns:
+        (filled, position, gaps, more): the rows to read are the gap ids in
+        filled plus every id above the old position up to the new one.
+        more is True when the batch was full.
+    """
+    now = time.time()
+    filled = []
+    if gaps:
+        filled = sorted(queryset.filter(id__in=[int(key) for key in gaps]).values_list("id", flat=True))
+        found = {str(row_id) for row_id in filled}
+        gaps = {
+            key: missed for key, missed in gaps.items()
+            if key not in found and now - missed < gap_seconds
+        }
+    else:
+        gaps = {}
+
+    rows = list(
+        queryset
+        .filter(id__gt=position)
+        .order_by("id")
+        .values_list("id", "created_at")[:batch_size]
+    )
+    expected = position + 1
+    for row_id, created_at in rows:
+        # A hole before an old row is not a transaction still in flight
+        if row_id > expected and now - created_at.timestamp() < gap_seconds:
+            for missing in range(expected, min(row_id, expected + MAX_GAPS - len(gaps))):
+                gaps[str(missing)] = now
+        expected = row_id + 1
+
+    if rows:
+        position = rows[-1][0]
+    return filled, position, gaps, len(rows) == batch_size
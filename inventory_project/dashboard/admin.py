@@ -1,3 +1,11 @@
 from django.contrib import admin
+from dashboard.models import WarehouseStockSummary
 
-# Register your models here.
+
+@admin.register(WarehouseStockSummary)
+class WarehouseStockSummaryAdmin(admin.ModelAdmin):
+    list_display = ['warehouse', 'total_units', 'total_value', 'distinct_products', 'low_stock_count', 'updated_at']
+    readonly_fields = [
+        'warehouse', 'total_units', 'total_value', 'distinct_products', 'low_stock_count', 'active_low_stock_count',
+        'pending_purchase_count', 'pending_transfer_count', 'updated_at',
+    ]
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from dashboard.models import WarehouseStockSummary
+from dashboard.services.summary import refresh_warehouse_summaries
+from warehouses.models import Warehouse
+
+
+class Command(BaseCommand):
+    help = "Recompute every warehouse's dashboard summary from scratch"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=200)
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        warehouse_ids = list(Warehouse.objects.order_by("id").values_list("id", flat=True))
+
+        for i in range(0, len(warehouse_ids), batch_size):
+            with transaction.atomic():
+                refresh_warehouse_summaries(warehouse_ids[i:i + batch_size])
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Rebuilt {WarehouseStockSummary.objects.count()} warehouse summaries"
+            )
+        )
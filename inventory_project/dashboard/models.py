@@ -1,3 +1,30 @@
 from django.db import models
 
-# Dashboard models will go here
+
+class WarehouseStockSummary(models.Model):
+    """
+    Precomputed dashboard figures for one warehouse.
+    Kept in step with Product price, LowStockThreshold and request status
+    changes by dashboard.signals and with stock writes by dashboard.subscribers;
+    rebuilt with rebuild_dashboard_summary.
+    """
+    warehouse = models.OneToOneField(
+        "warehouses.Warehouse",  # String reference
+        on_delete=models.CASCADE,
+        related_name="stock_summary"
+    )
+    total_units = models.BigIntegerField(default=0)
+    total_value = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+    distinct_products = models.PositiveIntegerField(default=0)
+    low_stock_count = models.PositiveIntegerField(default=0)
+    # Active products only, as the global dashboard counts them
+    active_low_stock_count = models.PositiveIntegerField(default=0)
+    pending_purchase_count = models.PositiveIntegerField(default=0)
+    pending_transfer_count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'dashboard_warehouse_stock_summary'
+
+    def __str__(self):
+        return f"Summary for {self.warehouse_id}"
@@ -0,0 +1,141 @@
+import threading
+from contextlib import contextmanager
+
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.utils import timezone
+
+from core.constants import RequestStatus
+from dashboard.models import WarehouseStockSummary
+from purchases.models import PurchaseRequest
+from transfers.models import TransferRequest
+from warehouses.services.metrics import warehouse_metrics
+
+SUMMARY_FIELDS = [
+    "total_units",
+    "total_value",
+    "distinct_products",
+    "low_stock_count",
+    "active_low_stock_count",
+    "pending_purchase_count",
+    "pending_transfer_count",
+]
+
+_local = threading.local()
+
+
+def _pending_counts(queryset, field, warehouse_ids):
+    rows = (
+        queryset
+        .filter(status=RequestStatus.PENDING, **{f"{field}__in": warehouse_ids})
+        .values(field)
+        .annotate(n=Count("id"))
+        .order_by()
+    )
+    return {row[field]: row["n"] for row in rows}
+
+
+def refresh_warehouse_summaries(warehouse_ids):
+    """
+    Recompute the summary rows of the given warehouses.
+
+    Uses a fixed number of grouped queries whatever the number of warehouses,
+    and runs in the caller's transaction so the summary commits (or rolls
+    back) with the change that triggered it.
+
+    The summary rows are locked (in warehouse order) before aggregating, so
+    concurrent refreshes of a warehouse run one after the other and the
+    later one aggregates a snapshot that includes the earlier one's writes.
+    """
+    warehouse_ids = sorted({wid for wid in warehouse_ids if wid})
+    if not warehouse_ids:
+        return
+
+    with transaction.atomic():
+        WarehouseStockSummary.objects.bulk_create(
+            [WarehouseStockSummary(warehouse_id=wid) for wid in warehouse_ids],
+            ignore_conflicts=True,
+        )
+        summaries = list(
+            WarehouseStockSummary.objects
+            .select_for_update()
+            .filter(warehouse_id__in=warehouse_ids)
+            .order_by("warehouse_id")
+        )
+
+        metrics = warehouse_metrics(warehouse_ids)
+        purchases = _pending_counts(PurchaseRequest.objects, "warehouse_id", warehouse_ids)
+        outgoing = _pending_counts(TransferRequest.objects, "source_warehouse_id", warehouse_ids)
+        incoming = _pending_counts(TransferRequest.objects, "destination_warehouse_id", warehouse_ids)
+
+        now = timezone.now()
+        for summary in summaries:
+            wid = summary.warehouse_id
+            stats = metrics[wid]
+            summary.total_units = stats["total_quantity"]
+            summary.total_value = stats["total_value"]
+            summary.distinct_products = stats["product_count"]
+            summary.low_stock_count = stats["low_stock_count"]
+            summary.active_low_stock_count = stats["active_low_stock_count"]
+            summary.pending_purchase_count = purchases.get(wid, 0)
+            summary.pending_transfer_count = outgoing.get(wid, 0) + incoming.get(wid, 0)
+            # bulk_update skips auto_now, so pass updated_at explicitly
+            summary.updated_at = now
+        WarehouseStockSummary.objects.bulk_update(summaries, SUMMARY_FIELDS + ["updated_at"])
+
+
+def mark_warehouses_dirty(*warehouse_ids):
+    """
+    Refresh the summaries of the given warehouses now, or at the end of the
+    enclosing deferred_summary_refresh() block if there is one.
+    """
+    pending = getattr(_local, "pending", None)
+    if pending is not None:
+        pending.update(wid for wid in warehouse_ids if wid)
+        return
+    refresh_warehouse_summaries(warehouse_ids)
+
+
+@contextmanager
+def deferred_summary_refresh():
+    """
+    Batch summary refreshes for bulk writes: every warehouse touched inside
+    the block is recomputed once when it exits. Use inside the transaction
+    doing the writes.
+    """
+    if getattr(_local, "pending", None) is not None:
+        # Nested: the outermost block flushes
+        yield
+        return
+
+    _local.pending = set()
+    try:
+        yield
+        warehouse_ids = _local.pending
+    finally:
+        _local.pending = None
+    refresh_warehouse_summaries(warehouse_ids)
+
+
+def get_warehouse_summary(warehouse_id):
+    """
+    Summary row for one warehouse, built on first access.
+    """
+    summary = WarehouseStockSummary.objects.filter(warehouse_id=warehouse_id).first()
+    if summary is None:
+        refresh_warehouse_summaries([warehouse_id])
+        summary = WarehouseStockSummary.objects.get(warehouse_id=warehouse_id)
+    return summary
+
+
+def get_global_summary():
+    """
+    Totals across all warehouse summaries (one row per warehouse). Low stock
+    only counts active products, like the low-stock widget next to it.
+    """
+    totals = WarehouseStockSummary.objects.aggregate(
+        total_units=Sum("total_units"),
+        low_stock_count=Sum("active_low_stock_count"),
+        pending_purchase_count=Sum("pending_purchase_count"),
+    )
+    return {key: value or 0 for key, value in totals.items()}
@@ -0,0 +1,51 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from dashboard.services.summary import mark_warehouses_dirty
+from inventory.models import Product, Stock, LowStockThreshold
+from purchases.models import PurchaseRequest
+from transfers.models import TransferRequest
+from warehouses.models import Warehouse
+
+
+@receiver(post_save, sender=LowStockThreshold)
+@receiver(post_delete, sender=LowStockThreshold)
+@receiver(post_save, sender=PurchaseRequest)
+@receiver(post_delete, sender=PurchaseRequest)
+def refresh_summary_for_warehouse(sender, instance, **kwargs):
+    """
+    Keep the warehouse's dashboard summary in step with its thresholds and
+    pending purchase requests. Stock writes arrive as StockChanged events
+    (dashboard.subscribers).
+    """
+    mark_warehouses_dirty(instance.warehouse_id)
+
+
+@receiver(post_save, sender=TransferRequest)
+@receiver(post_delete, sender=TransferRequest)
+def refresh_summary_for_transfer(sender, instance, **kwargs):
+    mark_warehouses_dirty(instance.source_warehouse_id, instance.destination_warehouse_id)
+
+
+@receiver(post_save, sender=Product)
+def refresh_summary_for_product(sender, instance, created, update_fields=None, **kwargs):
+    """
+    A price change revalues every warehouse holding the product; an
+    activation change moves it in or out of the active low-stock count.
+    """
+    if created or (update_fields is not None and not {"price", "is_active"} & set(update_fields)):
+        return
+
+    warehouse_ids = (
+        Stock.objects
+        .filter(product=instance)
+        .values_list("warehouse_id", flat=True)
+        .distinct()
+    )
+    mark_warehouses_dirty(*warehouse_ids)
+
+
+@receiver(post_save, sender=Warehouse)
+def create_summary_for_warehouse(sender, instance, created, **kwargs):
+    if created:
+        mark_warehouses_dirty(instance.id)
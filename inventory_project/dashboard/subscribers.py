@@ -0,0 +1,21 @@
+from core.events import STOCK_EVENTS, WarehouseDeleted, stock_changes, subscriber
+from dashboard.models import WarehouseStockSummary
+from dashboard.services.summary import refresh_warehouse_summaries
+
+
+@subscriber("dashboard_summary", *STOCK_EVENTS, WarehouseDeleted)
+def refresh_summaries(records):
+    """
+    Recompute each touched warehouse once per batch, however many stock
+    writes the batch holds. Deleted warehouses drop their summary.
+    """
+    changed = {change.warehouse_id for change in stock_changes(records)}
+    deleted = {
+        record.event.warehouse_id
+        for record in records
+        if record.event_type == WarehouseDeleted.__name__
+    }
+
+    refresh_warehouse_summaries(changed - deleted)
+    if deleted:
+        WarehouseStockSummary.objects.filter(warehouse_id__in=deleted).delete()
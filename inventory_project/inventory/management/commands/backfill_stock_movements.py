@@ -0,0 +1,113 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.constants import MovementKind, RequestStatus
+from inventory.models import StockMovement
+from inventory.services.ledger import build_movement, record_movements
+from purchases.models import PurchaseApproval, PurchaseRequest
+from transfers.models import TransferApproval, TransferRequest
+
+
+class Command(BaseCommand):
+    help = "Populate the StockMovement ledger from historical purchase and transfer approvals"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+
+        # Safe to re-run: documents already in the ledger are skipped
+        purchases_done = set(
+            StockMovement.objects
+            .filter(source_type=PurchaseRequest._meta.model_name)
+            .values_list("source_id", flat=True)
+        )
+        transfers_done = set(
+            StockMovement.objects
+            .filter(source_type=TransferRequest._meta.model_name)
+            .values_list("source_id", flat=True)
+        )
+
+        purchase_approvals = (
+            PurchaseApproval.objects
+            .filter(decision=RequestStatus.APPROVED)
+            .select_related("purchase_request")
+            .order_by("id")
+        )
+
+        pending = []
+        purchase_count = 0
+        for pa in purchase_approvals.iterator(chunk_size=batch_size):
+            pr = pa.purchase_request
+            if pr.id in purchases_done:
+                continue
+            purchases_done.add(pr.id)
+
+            pending.append(build_movement(
+                warehouse_id=pr.warehouse_id,
+                product_id=pr.product_id,
+                quantity_change=-pr.quantity,
+                kind=MovementKind.PURCHASE,
+                actor=pa.approver,
+                source=pr,
+                created_at=pa.created_at,
+            ))
+            purchase_count += 1
+
+            if len(pending) >= batch_size:
+                self._flush(pending)
+
+        transfer_approvals = (
+            TransferApproval.objects
+            .filter(decision=RequestStatus.APPROVED)
+            .select_related("transfer_request")
+            .order_by("id")
+        )
+
+        transfer_count = 0
+        for ta in transfer_approvals.iterator(chunk_size=batch_size):
+            tr = ta.transfer_request
+            if tr.id in transfers_done:
+                continue
+            transfers_done.add(tr.id)
+
+            pending.append(build_movement(
+                warehouse_id=tr.source_warehouse_id,
+                product_id=tr.product_id,
+                quantity_change=-tr.quantity,
+                kind=MovementKind.TRANSFER_OUT,
+                actor=ta.approver,
+                counterpart_warehouse_id=tr.destination_warehouse_id,
+                source=tr,
+                created_at=ta.created_at,
+            ))
+            pending.append(build_movement(
+                warehouse_id=tr.destination_warehouse_id,
+                product_id=tr.product_id,
+                quantity_change=tr.quantity,
+                kind=MovementKind.TRANSFER_IN,
+                actor=ta.approver,
+                counterpart_warehouse_id=tr.source_warehouse_id,
+                source=tr,
+                created_at=ta.created_at,
+            ))
+            transfer_count += 1
+
+            if len(pending) >= batch_size:
+                self._flush(pending)
+
+        self._flush(pending)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Backfilled {purchase_count} purchases and {transfer_count} transfers"
+            )
+        )
+
+    def _flush(self, pending):
+        if not pending:
+            return
+        with transaction.atomic():
+            record_movements(pending)
+        pending.clear()
@@ -0,0 +1,54 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+
+from inventory.models import Stock
+from inventory.services.stock import batched_stock_changes
+
+
+class Command(BaseCommand):
+    help = (
+        "Merge duplicate (warehouse, product) stock rows into the oldest one. "
+        "Run before migrating to the stock_unique_warehouse_product constraint."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true", help="Only list the duplicates")
+
+    def handle(self, *args, **options):
+        groups = list(
+            Stock.objects
+            .values("warehouse_id", "product_id")
+            .annotate(rows=Count("id"))
+            .filter(rows__gt=1)
+            .order_by("warehouse_id", "product_id")
+        )
+
+        removed = 0
+        for group in groups:
+            if options["dry_run"]:
+                self.stdout.write(
+                    f"warehouse {group['warehouse_id']} product {group['product_id']}: {group['rows']} rows"
+                )
+                continue
+
+            with transaction.atomic(), batched_stock_changes():
+                rows = list(
+                    Stock.objects
+                    .select_for_update()
+                    .filter(warehouse_id=group["warehouse_id"], product_id=group["product_id"])
+                    .order_by("id")
+                )
+                keeper, extras = rows[0], rows[1:]
+
+                Stock.objects.filter(id__in=[row.id for row in extras]).delete()
+                keeper.quantity = sum(row.quantity for row in rows)
+                keeper.save(update_fields=["quantity", "updated_at"])
+            removed += len(extras)
+
+        if options["dry_run"]:
+            self.stdout.write(self.style.WARNING(f"{len(groups)} duplicated stock(s) found"))
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f"Merged {len(groups)} duplicated stock(s), removed {removed} row(s)"
+            ))
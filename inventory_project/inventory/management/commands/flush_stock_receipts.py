@@ -0,0 +1,43 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from inventory.services.receipts import flush_stock_receipts, receipt_flush_lag
+
+
+class Command(BaseCommand):
+    help = "Apply buffered stock receipts to stock, one upsert per (warehouse, product)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--limit", type=int, default=5000, help="Receipts per flush")
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Keep flushing instead of exiting after the journal is empty",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=settings.STOCK_RECEIPT_FLUSH_INTERVAL_MS / 1000,
+            help="Seconds between flushes with --loop",
+        )
+
+    def handle(self, *args, **options):
+        applied = written = 0
+        while True:
+            receipts, rows = flush_stock_receipts(limit=options["limit"])
+            applied += receipts
+            written += rows
+            if receipts == options["limit"]:
+                # More waiting: go again straight away
+                continue
+            if not options["loop"]:
+                break
+            time.sleep(options["interval"])
+
+        lag = receipt_flush_lag()
+        self.stdout.write(self.style.SUCCESS(
+            f"Applied {applied} receipt(s) to {written} stock row(s); "
+            f"{lag['pending_receipts']} pending, lag {lag['lag_seconds']:.3f}s"
+        ))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from inventory.services.stock_stripes import MAX_STRIPES, set_stock_stripes
+
+
+class Command(BaseCommand):
+    help = (
+        "Split the units of a (warehouse, product) stock over several stripe rows; "
+        "--stripes 0 turns it back into a plain row."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--warehouse", type=int, required=True, help="Warehouse id")
+        parser.add_argument("--product", type=int, required=True, help="Product id")
+        parser.add_argument("--stripes", type=int, required=True, help=f"0 to {MAX_STRIPES}")
+
+    def handle(self, *args, **options):
+        try:
+            stock = set_stock_stripes(options["warehouse"], options["product"], options["stripes"])
+        except ValueError as exc:
+            raise CommandError(str(exc))
+        self.stdout.write(self.style.SUCCESS(
+            f"Stock {stock.id}: {stock.quantity} unit(s) over {stock.stripe_count} stripe(s)"
+        ))
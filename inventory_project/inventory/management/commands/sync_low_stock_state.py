@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from inventory.models import Stock
+from inventory.services.low_stock_state import ENTERED_LOW, RECOVERED, evaluate_low_stock
+from warehouses.services.low_stock import with_thresholds
+
+
+class Command(BaseCommand):
+    help = "Bring the low-stock state table in line with current stock, without sending alerts"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        rows = (
+            with_thresholds(Stock.objects.order_by("id"))
+            .values_list("warehouse_id", "product_id", "quantity", "low_threshold")
+        )
+
+        entered = recovered = 0
+        batch = []
+        for row in rows.iterator(chunk_size=batch_size):
+            batch.append(row)
+            if len(batch) >= batch_size:
+                e, r = self._apply(batch)
+                entered, recovered = entered + e, recovered + r
+
+        e, r = self._apply(batch)
+        entered, recovered = entered + e, recovered + r
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Low-stock state synced: {entered} went low, {recovered} recovered")
+        )
+
+    def _apply(self, batch):
+        entered = recovered = 0
+        with transaction.atomic():
+            for warehouse_id, product_id, quantity, threshold in batch:
+                transition, _ = evaluate_low_stock(warehouse_id, product_id, quantity, threshold)
+                entered += transition == ENTERED_LOW
+                recovered += transition == RECOVERED
+        batch.clear()
+        return entered, recovered
@@ -1,5 +1,6 @@
 from django.db import models
 from django.utils import timezone
+from core.constants import MovementKind
 
 
 class Product(models.Model):
@@ -23,6 +24,13 @@ class Product(models.Model):
 class Stock(models.Model):
     """
     Stock levels for products in warehouses.
+
+    Remembers the quantity it was loaded (or last saved) with, so signal
+    receivers get the old and new value without re-reading the row.
+
+    A striped row (stripe_count > 0) also keeps its units split over
+    StockStripe rows; quantity is always their total. See
+    inventory.services.stock_stripes.
     """
     product = models.ForeignKey(
         Product,
@@ -37,13 +45,124 @@ class Stock(models.Model):
     quantity = models.IntegerField(default=0)
     created_at = models.DateTimeField(default=timezone.now)
     updated_at = models.DateTimeField(auto_now=True)
+    # Bumped by every quantity write; see core.concurrency
+    version = models.PositiveIntegerField(default=0)
+    # 0 for a plain row
+    stripe_count = models.PositiveSmallIntegerField(default=0)
 
     class Meta:
         db_table = 'warehouses_stock'  # Preserve existing table name
+        constraints = [
+            models.CheckConstraint(
+                condition=models.Q(quantity__gte=0),
+                name="stock_quantity_non_negative",
+            ),
+            # Run dedupe_stock before migrating an existing database
+            models.UniqueConstraint(
+                fields=["warehouse", "product"],
+                name="stock_unique_warehouse_product",
+            ),
+        ]
 
     def __str__(self):
         return f"{self.product.name} @ {self.warehouse.name}: {self.quantity}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Absent when quantity was deferred
+        instance._loaded_quantity = instance.__dict__.get("quantity")
+        return instance
+
+    @property
+    def previous_quantity(self):
+        """
+        Quantity as loaded from or last saved to the database; None for
+        unsaved rows and rows loaded without the quantity column.
+        """
+        return getattr(self, "_loaded_quantity", None)
+
+    @property
+    def quantity_changed(self):
+        return self.previous_quantity is None or self.quantity != self.previous_quantity
+
+    def mark_quantity_saved(self):
+        self._loaded_quantity = self.quantity
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        # post_save receivers have seen the old value by now
+        update_fields = kwargs.get("update_fields")
+        if update_fields is None or "quantity" in update_fields:
+            self.mark_quantity_saved()
+
+
+class StockStripe(models.Model):
+    """
+    One slice of a striped stock's units. Each change of the stock also
+    goes to one stripe picked at random.
+    """
+    stock = models.ForeignKey(
+        Stock,
+        on_delete=models.CASCADE,
+        related_name="stripes"
+    )
+    index = models.PositiveSmallIntegerField()
+    quantity = models.IntegerField(default=0)
+
+    class Meta:
+        db_table = 'inventory_stock_stripe'
+        constraints = [
+            models.CheckConstraint(
+                condition=models.Q(quantity__gte=0),
+                name="stock_stripe_quantity_non_negative",
+            ),
+            models.UniqueConstraint(
+                fields=["stock", "index"],
+                name="stock_stripe_unique_index",
+            ),
+        ]
+
+    def __str__(self):
+        return f"Stock {self.stock_id} stripe {self.index}: {self.quantity}"
+
+
+class StockReceipt(models.Model):
+    """
+    Journal of buffered stock increments not yet applied to Stock.
+    Receiving docks append here instead of rewriting the stock row per scan;
+    the flusher folds the rows into one upsert per (warehouse, product) and
+    deletes them (see inventory.services.receipts).
+    """
+    warehouse = models.ForeignKey(
+        "warehouses.Warehouse",  # String reference
+        on_delete=models.CASCADE,
+        related_name="stock_receipts"
+    )
+    product = models.ForeignKey(
+        Product,
+        on_delete=models.CASCADE,
+        related_name="stock_receipts"
+    )
+    quantity = models.PositiveIntegerField()
+    actor = models.ForeignKey(
+        "accounts.User",  # String reference
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        related_name="stock_receipts"
+    )
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = 'inventory_stock_receipt'
+        indexes = [
+            models.Index(fields=["warehouse", "product"], name="stock_receipt_key_idx"),
+        ]
+
+    def __str__(self):
+        return f"+{self.quantity} of product {self.product_id} @ warehouse {self.warehouse_id}"
+
 
 class LowStockThreshold(models.Model):
     """
@@ -67,3 +186,111 @@ class LowStockThreshold(models.Model):
 
     def __str__(self):
         return f"{self.warehouse} - {self.product} ({self.threshold_quantity})"
+
+
+class StockMovement(models.Model):
+    """
+    Append-only ledger of signed stock quantity changes.
+    Every stock mutation writes one row per (warehouse, product) it touches.
+    """
+    KIND_CHOICES = MovementKind.CHOICES
+
+    warehouse = models.ForeignKey(
+        "warehouses.Warehouse",  # String reference
+        on_delete=models.PROTECT,
+        related_name="stock_movements"
+    )
+    product = models.ForeignKey(
+        Product,
+        on_delete=models.PROTECT,
+        related_name="stock_movements"
+    )
+    quantity_change = models.IntegerField()
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    actor = models.ForeignKey(
+        "accounts.User",  # String reference
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        related_name="stock_movements"
+    )
+    # Other warehouse involved in transfers / relocations
+    counterpart_warehouse = models.ForeignKey(
+        "warehouses.Warehouse",  # String reference
+        null=True,
+        blank=True,
+        on_delete=models.PROTECT,
+        related_name="+"
+    )
+    # Source document, e.g. ("purchaserequest", 14)
+    source_type = models.CharField(max_length=32, blank=True)
+    source_id = models.PositiveBigIntegerField(null=True, blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = 'inventory_stock_movement'
+        indexes = [
+            models.Index(fields=['created_at']),
+            models.Index(fields=['warehouse', 'created_at']),
+            models.Index(fields=['product', 'warehouse', 'created_at']),
+            models.Index(fields=['source_type', 'source_id']),
+        ]
+
+    def save(self, *args, **kwargs):
+        if self.pk is not None and not self._state.adding:
+            raise ValueError("StockMovement entries are append-only")
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return f"{self.kind} {self.quantity_change:+d} {self.product_id}@{self.warehouse_id}"
+
+
+class LowStockState(models.Model):
+    """
+    Persisted low-stock state per (warehouse, product).
+    Rows exist once a stock has first gone low; alerts fire only when
+    is_low flips (see inventory.services.low_stock_state).
+    """
+    warehouse = models.ForeignKey(
+        "warehouses.Warehouse",  # String reference
+        on_delete=models.CASCADE,
+        related_name="low_stock_states"
+    )
+    product = models.ForeignKey(
+        Product,
+        on_delete=models.CASCADE,
+        related_name="low_stock_states"
+    )
+    is_low = models.BooleanField(default=False)
+    quantity = models.IntegerField(default=0)  # Quantity at the last evaluation
+    threshold = models.PositiveIntegerField(default=0)  # Effective threshold at the last evaluation
+    entered_low_at = models.DateTimeField(null=True, blank=True)
+    recovered_at = models.DateTimeField(null=True, blank=True)
+    total_low_seconds = models.BigIntegerField(default=0)  # Closed low periods only
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'inventory_low_stock_state'
+        constraints = [
+            models.UniqueConstraint(
+                fields=["warehouse", "product"],
+                name="uniq_low_stock_state",
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["is_low", "warehouse"]),
+            models.Index(fields=["is_low", "entered_low_at"]),
+        ]
+
+    def __str__(self):
+        state = "LOW" if self.is_low else "OK"
+        return f"{self.warehouse_id}/{self.product_id}: {state}"
+
+    def time_low(self, now=None):
+        """
+        Total time spent low, including the current period if still low.
+        """
+        seconds = self.total_low_seconds
+        if self.is_low and self.entered_low_at:
+            seconds += int(((now or timezone.now()) - self.entered_low_at).total_seconds())
+        return seconds
@@ -0,0 +1,54 @@
+from django.utils import timezone
+
+from inventory.models import StockMovement
+
+
+def build_movement(
+    *,
+    warehouse_id,
+    product_id,
+    quantity_change,
+    kind,
+    actor=None,
+    counterpart_warehouse_id=None,
+    source=None,
+    created_at=None,
+):
+    """
+    Returns an unsaved StockMovement.
+
+    Args:
+        source: Model instance the movement originates from (purchase request,
+                transfer request, warehouse). Stored as (model_name, pk).
+    """
+    return StockMovement(
+        warehouse_id=warehouse_id,
+        product_id=product_id,
+        quantity_change=quantity_change,
+        kind=kind,
+        actor=actor,
+        counterpart_warehouse_id=counterpart_warehouse_id,
+        source_type=source._meta.model_name if source is not None else "",
+        source_id=source.pk if source is not None else None,
+        created_at=created_at or timezone.now(),
+    )
+
+
+def record_movement(**kwargs):
+    """
+    Append a single ledger entry. Call inside the transaction that
+    mutates the stock so both commit (or roll back) together.
+    """
+    movement = build_movement(**kwargs)
+    movement.save()
+    return movement
+
+
+def record_movements(movements, batch_size=500):
+    """
+    Append several unsaved movements (see build_movement) in one INSERT per batch.
+    """
+    movements = list(movements)
+    if not movements:
+        return []
+    return StockMovement.objects.bulk_create(movements, batch_size=batch_size)
@@ -0,0 +1,125 @@
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F, OuterRef, Subquery
+from django.utils import timezone
+
+from core.constants import DEFAULT_LOW_STOCK_HYSTERESIS
+from inventory.models import LowStockState, Stock
+from warehouses.services.low_stock import effective_threshold
+
+ENTERED_LOW = "ENTERED_LOW"
+RECOVERED = "RECOVERED"
+
+
+def get_hysteresis():
+    return getattr(settings, "LOW_STOCK_HYSTERESIS", DEFAULT_LOW_STOCK_HYSTERESIS)
+
+
+def next_transition(is_low, quantity, threshold, hysteresis):
+    """
+    ENTERED_LOW when quantity reaches the threshold, RECOVERED only once it
+    climbs above threshold + hysteresis, otherwise None.
+    """
+    if not is_low and quantity <= threshold:
+        return ENTERED_LOW
+    if is_low and quantity > threshold + hysteresis:
+        return RECOVERED
+    return None
+
+
+def _locked_state(warehouse_id, product_id):
+    return (
+        LowStockState.objects
+        .select_for_update()
+        .filter(warehouse_id=warehouse_id, product_id=product_id)
+        .first()
+    )
+
+
+def evaluate_low_stock(warehouse_id, product_id, quantity, threshold=None, now=None):
+    """
+    Fold the current quantity into the persisted state of (warehouse, product).
+    Called from the low_stock_state event subscriber for stock writes and
+    inside the transaction that changed a threshold.
+
+    Returns:
+        (transition, state): transition is ENTERED_LOW, RECOVERED or None;
+        state is None for stocks that have never been low.
+    """
+    if threshold is None:
+        threshold = effective_threshold(warehouse_id, product_id)
+    now = now or timezone.now()
+
+    state = _locked_state(warehouse_id, product_id)
+    if state is None:
+        if quantity > threshold:
+            return None, None
+        try:
+            with transaction.atomic():
+                state = LowStockState.objects.create(
+                    warehouse_id=warehouse_id,
+                    product_id=product_id,
+                    is_low=True,
+                    quantity=quantity,
+                    threshold=threshold,
+                    entered_low_at=now,
+                )
+            return ENTERED_LOW, state
+        except IntegrityError:
+            # Created concurrently: fall through and evaluate against it
+            state = _locked_state(warehouse_id, product_id)
+
+    transition = next_transition(state.is_low, quantity, threshold, get_hysteresis())
+    state.quantity = quantity
+    state.threshold = threshold
+
+    if transition == ENTERED_LOW:
+        state.is_low = True
+        state.entered_low_at = now
+        state.recovered_at = None
+    elif transition == RECOVERED:
+        state.is_low = False
+        state.recovered_at = now
+        if state.entered_low_at:
+            state.total_low_seconds += int((now - state.entered_low_at).total_seconds())
+
+    state.save()
+    return transition, state
+
+
+def currently_low(warehouse_id=None):
+    """
+    States currently low, furthest below threshold first, annotated with the
+    matching stock_id.
+    """
+    stock_id = Stock.objects.filter(
+        warehouse_id=OuterRef("warehouse_id"), product_id=OuterRef("product_id")
+    ).values("id")[:1]
+
+    qs = (
+        LowStockState.objects
+        .filter(is_low=True)
+        .select_related("product", "warehouse")
+        .annotate(stock_id=Subquery(stock_id), shortfall=F("quantity") - F("threshold"))
+    )
+    if warehouse_id:
+        qs = qs.filter(warehouse_id=warehouse_id)
+    return qs.order_by("shortfall", "entered_low_at", "id")
+
+
+def low_state_item(state, now=None):
+    """
+    Dashboard widget entry for a LowStockState from currently_low().
+    """
+    return {
+        "stock_id": state.stock_id,
+        "product": state.product.name,
+        "product_id": state.product_id,
+        "warehouse": state.warehouse.name,
+        "warehouse_id": state.warehouse_id,
+        "quantity": state.quantity,
+        "threshold": state.threshold,
+        "status": "low",
+        "low_since": state.entered_low_at,
+        "time_low_seconds": state.time_low(now),
+    }
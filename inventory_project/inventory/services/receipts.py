@@ -0,0 +1,137 @@
+"""
+Buffered (write-behind) stock receipts.
+
+While receiving, the same product can be scanned in many times a second.
+In buffered mode each scan appends a StockReceipt row (no stock row is
+touched, so scans never wait on each other) and the flusher applies the
+journal every few hundred milliseconds: all pending units of a
+(warehouse, product) in one upsert, with one ledger entry per actor.
+
+Stock reads that go through with_pending_receipts() add the pending units,
+so a receiver sees their scans straight away.
+"""
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Count, Min, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from core.constants import MovementKind
+from inventory.models import Stock, StockReceipt
+from inventory.services.ledger import build_movement, record_movements
+from inventory.services.stock import batched_stock_changes, bulk_increase_stock
+
+
+def _pending(warehouse_ref, product_ref):
+    return Coalesce(
+        Subquery(
+            StockReceipt.objects
+            .filter(warehouse_id=warehouse_ref, product_id=product_ref)
+            .values("warehouse_id", "product_id")
+            .annotate(total=Sum("quantity"))
+            .values("total")
+        ),
+        0,
+    )
+
+
+def with_pending_receipts(queryset):
+    """
+    Annotate a Stock queryset with pending_quantity, the units still in the
+    receipt journal.
+    """
+    return queryset.annotate(
+        pending_quantity=_pending(OuterRef("warehouse_id"), OuterRef("product_id"))
+    )
+
+
+def buffer_receipt(warehouse_id, product_id, quantity, actor=None):
+    """
+    Journal quantity units for the flusher to add.
+
+    Returns:
+        The quantity including everything still buffered for the pair.
+    """
+    # An empty stock row for reads to merge the pending units into.
+    # bulk_create sends no signals, so no StockChanged(0) is published for it.
+    Stock.objects.bulk_create(
+        [Stock(warehouse_id=warehouse_id, product_id=product_id, quantity=0)],
+        ignore_conflicts=True,
+    )
+    StockReceipt.objects.create(
+        warehouse_id=warehouse_id,
+        product_id=product_id,
+        quantity=quantity,
+        actor=actor,
+    )
+    # One statement, so a flush committing in between is not counted twice
+    stored, pending = (
+        with_pending_receipts(Stock.objects.filter(warehouse_id=warehouse_id, product_id=product_id))
+        .values_list("quantity", "pending_quantity")
+        .get()
+    )
+    return stored + pending
+
+
+@transaction.atomic
+def flush_stock_receipts(limit=5000, warehouse_id=None, skip_locked=True):
+    """
+    Apply up to limit journalled receipts, oldest first (only those of
+    warehouse_id if given). Rows another flusher is applying are skipped,
+    so flushers can run side by side; with skip_locked=False they are
+    waited for instead, so none is missed.
+
+    Returns:
+        (receipts applied, stock rows written)
+    """
+    receipts = StockReceipt.objects.select_for_update(skip_locked=skip_locked).select_related("actor")
+    if warehouse_id is not None:
+        receipts = receipts.filter(warehouse_id=warehouse_id)
+    receipts = list(receipts.order_by("id")[:limit])
+    if not receipts:
+        return 0, 0
+
+    now = timezone.now()
+    by_actor = defaultdict(int)
+    actors = {}
+    for receipt in receipts:
+        by_actor[(receipt.warehouse_id, receipt.product_id, receipt.actor_id)] += receipt.quantity
+        actors[receipt.actor_id] = receipt.actor
+
+    with batched_stock_changes():
+        written = bulk_increase_stock(
+            (warehouse_id, product_id, quantity)
+            for (warehouse_id, product_id, _), quantity in by_actor.items()
+        )
+        record_movements(
+            build_movement(
+                warehouse_id=warehouse_id,
+                product_id=product_id,
+                quantity_change=quantity,
+                kind=MovementKind.ASSIGN,
+                actor=actors[actor_id],
+                created_at=now,
+            )
+            for (warehouse_id, product_id, actor_id), quantity in by_actor.items()
+        )
+    StockReceipt.objects.filter(id__in=[receipt.id for receipt in receipts]).delete()
+    return len(receipts), len(written)
+
+
+def receipt_flush_lag():
+    """
+    How far the flusher is behind.
+
+    Returns:
+        {"pending_receipts", "pending_units", "lag_seconds"}: lag_seconds is
+        the age of the oldest unapplied receipt, 0 when there is none.
+    """
+    stats = StockReceipt.objects.aggregate(
+        pending_receipts=Count("id"),
+        pending_units=Coalesce(Sum("quantity"), 0),
+        oldest=Min("created_at"),
+    )
+    oldest = stats.pop("oldest")
+    stats["lag_seconds"] = (timezone.now() - oldest).total_seconds() if oldest else 0.0
+    return stats
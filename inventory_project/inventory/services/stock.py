@@ -0,0 +1,430 @@
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from functools import reduce
+from operator import or_
+
+from django.db import connection, transaction
+from django.db.models import Case, F, IntegerField, Q, Value, When
+from django.utils import timezone
+
+from core.concurrency import ConcurrentUpdate
+from core.events import StockBatchChanged, StockChanged, publish
+from inventory.models import Stock
+from inventory.services.stock_stripes import apply_striped_delta, spread_stripes
+
+_local = threading.local()
+
+
+class InsufficientStock(Exception):
+    """
+    A decrement would take the stock below zero (or there is no stock row).
+    """
+
+    def __init__(self, warehouse_id, product_id, requested):
+        self.warehouse_id = warehouse_id
+        self.product_id = product_id
+        self.requested = requested
+        super().__init__(
+            f"Insufficient stock of product {product_id} in warehouse {warehouse_id} "
+            f"(requested {requested})"
+        )
+
+
+def record_stock_change(warehouse_id, product_id, quantity, previous_quantity=None):
+    """
+    Publish a StockChanged event now, or fold it into the enclosing
+    batched_stock_changes() block if there is one.
+    """
+    pending = getattr(_local, "pending", None)
+    if pending is None:
+        publish(StockChanged(warehouse_id, product_id, quantity, previous_quantity))
+        return
+
+    key = (warehouse_id, product_id)
+    if key in pending:
+        # Keep the quantity from before the block, take the latest one
+        previous_quantity = pending[key][1]
+    pending[key] = (quantity, previous_quantity)
+
+
+@contextmanager
+def batched_stock_changes():
+    """
+    Collect every stock change made inside the block (saves, deletes and
+    bulk_update_quantities) into one StockBatchChanged event, published when
+    the block exits. Use inside the transaction doing the writes.
+    """
+    if getattr(_local, "pending", None) is not None:
+        # Nested: the outermost block publishes
+        yield
+        return
+
+    _local.pending = {}
+    try:
+        yield
+        pending = _local.pending
+    finally:
+        _local.pending = None
+
+    changes = [
+        [warehouse_id, product_id, quantity, previous_quantity]
+        for (warehouse_id, product_id), (quantity, previous_quantity) in pending.items()
+        if quantity != previous_quantity
+    ]
+    if len(changes) == 1:
+        publish(StockChanged(*changes[0]))
+    elif changes:
+        publish(StockBatchChanged(changes))
+
+
+def bulk_update_quantities(stocks, batch_size=500):
+    """
+    Write the quantity of many loaded Stock rows in bulk (no per-row save or
+    signals) and publish their changes as one event.
+
+    Each row is only written if its version is still the one loaded, so a
+    quantity changed by someone else in the meantime is never overwritten.
+    Lock the rows (lock_stock_rows) to rule that out; otherwise be ready to
+    retry. Striped rows get their stripes re-spread to the new quantity.
+
+    Returns:
+        Number of rows whose quantity changed.
+
+    Raises:
+        ConcurrentUpdate: some row was modified since it was loaded; nothing
+            is written when the caller's transaction rolls back.
+    """
+    changed = [stock for stock in stocks if stock.quantity_changed]
+    if not changed:
+        return 0
+
+    striped = [stock for stock in changed if stock.stripe_count]
+    now = timezone.now()
+    with batched_stock_changes():
+        for start in range(0, len(changed), batch_size):
+            batch = changed[start:start + batch_size]
+            quantity = Case(
+                *[When(pk=stock.pk, then=Value(stock.quantity)) for stock in batch],
+                output_field=IntegerField(),
+            )
+            updated = (
+                Stock.objects
+                .filter(reduce(or_, (Q(pk=stock.pk, version=stock.version) for stock in batch)))
+                .update(quantity=quantity, version=F("version") + 1, updated_at=now)
+            )
+            if updated != len(batch):
+                raise ConcurrentUpdate(Stock, [stock.pk for stock in batch], 1)
+        spread_stripes(
+            {stock.id: stock.quantity for stock in striped},
+            {stock.id: stock.stripe_count for stock in striped},
+        )
+
+        for stock in changed:
+            stock.version += 1
+            stock.updated_at = now
+            record_stock_change(
+                stock.warehouse_id, stock.product_id, stock.quantity, stock.previous_quantity
+            )
+            stock.mark_quantity_saved()
+    return len(changed)
+
+
+# ---------------------------------------------------------
+# Atomic quantity changes
+# ---------------------------------------------------------
+def _stock_row(warehouse_id, product_id):
+    return Stock.objects.filter(warehouse_id=warehouse_id, product_id=product_id)
+
+
+def _apply_delta(warehouse_id, product_id, delta):
+    """
+    UPDATE quantity = quantity + delta in one statement, guarded by
+    quantity >= -delta for decrements. No row is read or locked first.
+    Striped rows also put the delta into one of their stripes.
+
+    Returns:
+        The new quantity, or None when no row matched.
+    """
+    row = _stock_row(warehouse_id, product_id)
+    guarded = row.filter(quantity__gte=-delta) if delta < 0 else row
+    if not guarded.update(
+        quantity=F("quantity") + delta,
+        version=F("version") + 1,
+        updated_at=timezone.now(),
+    ):
+        return None
+
+    # The UPDATE holds the row lock until commit, so this reads our own result
+    stock_id, quantity, stripe_count = row.values_list("id", "quantity", "stripe_count").get()
+    if stripe_count:
+        apply_striped_delta(stock_id, stripe_count, quantity, delta)
+
+    record_stock_change(warehouse_id, product_id, quantity, quantity - delta)
+    return quantity
+
+
+def decrease_stock(warehouse_id, product_id, quantity):
+    """
+    Take quantity units out of a stock row.
+
+    Returns:
+        The new quantity.
+
+    Raises:
+        InsufficientStock: fewer than quantity units, or no stock row.
+    """
+    new_quantity = _apply_delta(warehouse_id, product_id, -quantity)
+    if new_quantity is None:
+        raise InsufficientStock(warehouse_id, product_id, quantity)
+    return new_quantity
+
+
+def _supports_upsert():
+    features = connection.features
+    return features.supports_update_conflicts_with_target and features.can_return_rows_from_bulk_insert
+
+
+def _upsert_increase(warehouse_id, product_id, quantity):
+    """
+    INSERT the row or add to it in one statement (PostgreSQL, SQLite 3.35+),
+    relying on the (warehouse, product) unique constraint.
+    """
+    table = connection.ops.quote_name(Stock._meta.db_table)
+    now = connection.ops.adapt_datetimefield_value(timezone.now())
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            INSERT INTO {table} (warehouse_id, product_id, quantity, version, stripe_count, created_at, updated_at)
+            VALUES (%s, %s, %s, 0, 0, %s, %s)
+            ON CONFLICT (warehouse_id, product_id)
+            DO UPDATE SET quantity = {table}.quantity + EXCLUDED.quantity,
+                          version = {table}.version + 1,
+                          updated_at = EXCLUDED.updated_at
+            WHERE {table}.stripe_count = 0
+            RETURNING quantity
+            """,
+            [warehouse_id, product_id, quantity, now, now],
+        )
+        row = cursor.fetchone()
+
+    if row is None:
+        # Striped: the delta goes to a stripe as well
+        return _apply_delta(warehouse_id, product_id, quantity)
+    new_quantity = row[0]
+
+    record_stock_change(warehouse_id, product_id, new_quantity, new_quantity - quantity)
+    return new_quantity
+
+
+def increase_stock(warehouse_id, product_id, quantity):
+    """
+    Add quantity units to a stock row, creating the row if needed.
+
+    Returns:
+        The new quantity.
+    """
+    if _supports_upsert():
+        return _upsert_increase(warehouse_id, product_id, quantity)
+
+    new_quantity = _apply_delta(warehouse_id, product_id, quantity)
+    if new_quantity is not None:
+        return new_quantity
+
+    stock, created = Stock.objects.get_or_create(
+        warehouse_id=warehouse_id,
+        product_id=product_id,
+        defaults={"quantity": quantity},
+    )
+    if created:
+        return stock.quantity
+    # Created concurrently between the UPDATE and the INSERT
+    return _apply_delta(warehouse_id, product_id, quantity)
+
+
+def _upsert_increase_many(increments):
+    """
+    Multi-row form of _upsert_increase: one INSERT ... ON CONFLICT for all
+    the given (warehouse_id, product_id) -> quantity increments.
+    """
+    table = connection.ops.quote_name(Stock._meta.db_table)
+    now = connection.ops.adapt_datetimefield_value(timezone.now())
+    placeholders = ", ".join(["(%s, %s, %s, 0, 0, %s, %s)"] * len(increments))
+    params = []
+    for (warehouse_id, product_id), quantity in increments:
+        params += [warehouse_id, product_id, quantity, now, now]
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            INSERT INTO {table} (warehouse_id, product_id, quantity, version, stripe_count, created_at, updated_at)
+            VALUES {placeholders}
+            ON CONFLICT (warehouse_id, product_id)
+            DO UPDATE SET quantity = {table}.quantity + EXCLUDED.quantity,
+                          version = {table}.version + 1,
+                          updated_at = EXCLUDED.updated_at
+            WHERE {table}.stripe_count = 0
+            RETURNING warehouse_id, product_id, quantity
+            """,
+            params,
+        )
+        rows = cursor.fetchall()
+
+    added = dict(increments)
+    result = {}
+    for warehouse_id, product_id, new_quantity in rows:
+        key = (warehouse_id, product_id)
+        result[key] = new_quantity
+        record_stock_change(warehouse_id, product_id, new_quantity, new_quantity - added[key])
+
+    # Striped rows return nothing from the upsert; the delta goes to a stripe as well
+    for key, quantity in increments:
+        if key not in result:
+            result[key] = _apply_delta(key[0], key[1], quantity)
+    return result
+
+
+def bulk_increase_stock(increments, batch_size=500):
+    """
+    Add to many stock rows, creating the missing ones.
+
+    Increments for the same (warehouse_id, product_id) are summed first, and
+    rows are written in key order so concurrent bulk calls lock them in the
+    same order. With upsert support this is one statement per batch_size
+    rows; otherwise it falls back to increase_stock() per row.
+
+    Args:
+        increments: iterable of (warehouse_id, product_id, quantity).
+
+    Returns:
+        {(warehouse_id, product_id): new quantity}
+    """
+    totals = defaultdict(int)
+    for warehouse_id, product_id, quantity in increments:
+        totals[(warehouse_id, product_id)] += quantity
+    ordered = sorted(totals.items())
+
+    result = {}
+    with batched_stock_changes():
+        if not _supports_upsert():
+            for (warehouse_id, product_id), quantity in ordered:
+                result[(warehouse_id, product_id)] = increase_stock(warehouse_id, product_id, quantity)
+            return result
+
+        for start in range(0, len(ordered), batch_size):
+            result.update(_upsert_increase_many(ordered[start:start + batch_size]))
+    return result
+
+
+def transfer_stock(source_warehouse_id, destination_warehouse_id, product_id, quantity):
+    """
+    Move quantity units between warehouses as one stock change event.
+
+    Rows are updated in warehouse id order, so transfers running in
+    opposite directions cannot deadlock. A failed decrement rolls the
+    increment back (savepoint) and raises.
+
+    Returns:
+        (new source quantity, new destination quantity)
+
+    Raises:
+        InsufficientStock: the source has fewer than quantity units.
+    """
+    with transaction.atomic(), batched_stock_changes():
+        if destination_warehouse_id < source_warehouse_id:
+            destination = increase_stock(destination_warehouse_id, product_id, quantity)
+            source = decrease_stock(source_warehouse_id, product_id, quantity)
+        else:
+            source = decrease_stock(source_warehouse_id, product_id, quantity)
+            destination = increase_stock(destination_warehouse_id, product_id, quantity)
+    return source, destination
+
+
+# ---------------------------------------------------------
+# Multi-row changes under explicit locks
+# ---------------------------------------------------------
+def _keys_q(keys):
+    return reduce(or_, (Q(warehouse_id=w, product_id=p) for w, p in sorted(keys)))
+
+
+def lock_stock_rows(keys):
+    """
+    SELECT ... FOR UPDATE the existing stock rows of the given
+    (warehouse_id, product_id) keys, in (warehouse, product) order. Every
+    batch locks in this one global order, so batches sharing rows wait for
+    each other instead of deadlocking. Use inside a transaction.
+
+    Returns:
+        {(warehouse_id, product_id): Stock}; missing rows are absent.
+    """
+    if not keys:
+        return {}
+    return {
+        (stock.warehouse_id, stock.product_id): stock
+        for stock in (
+            Stock.objects
+            .select_for_update()
+            .filter(_keys_q(keys))
+            .order_by("warehouse_id", "product_id")
+        )
+    }
+
+
+def apply_stock_deltas(deltas):
+    """
+    Add a net delta to many stock rows with a single CASE UPDATE, creating
+    missing rows first, and record the changes (one event per enclosing
+    batch). Lock the existing rows with lock_stock_rows() and check that no
+    delta takes a row below zero before calling: the non-negative check
+    constraint rejects the whole statement otherwise. Striped rows have
+    their stripes re-spread to the new quantity.
+
+    Args:
+        deltas: {(warehouse_id, product_id): quantity change}
+
+    Returns:
+        {(warehouse_id, product_id): new quantity}
+    """
+    deltas = {key: delta for key, delta in deltas.items() if delta}
+    if not deltas:
+        return {}
+
+    now = timezone.now()
+    match = _keys_q(deltas)
+    existing = set(
+        Stock.objects.filter(match).values_list("warehouse_id", "product_id")
+    )
+    missing = sorted(key for key in deltas if key not in existing)
+    if missing:
+        Stock.objects.bulk_create(
+            [Stock(warehouse_id=w, product_id=p, quantity=0) for w, p in missing],
+            ignore_conflicts=True,
+        )
+
+    change = Case(
+        *[When(warehouse_id=w, product_id=p, then=Value(delta)) for (w, p), delta in deltas.items()],
+        default=Value(0),
+        output_field=IntegerField(),
+    )
+    Stock.objects.filter(match).update(
+        quantity=F("quantity") + change,
+        version=F("version") + 1,
+        updated_at=now,
+    )
+
+    result = {}
+    striped_totals, stripe_counts = {}, {}
+    with batched_stock_changes():
+        for stock_id, warehouse_id, product_id, quantity, stripe_count in (
+            Stock.objects
+            .filter(match)
+            .values_list("id", "warehouse_id", "product_id", "quantity", "stripe_count")
+        ):
+            key = (warehouse_id, product_id)
+            result[key] = quantity
+            record_stock_change(warehouse_id, product_id, quantity, quantity - deltas[key])
+            if stripe_count:
+                striped_totals[stock_id] = quantity
+                stripe_counts[stock_id] = stripe_count
+    spread_stripes(striped_totals, stripe_counts)
+    return result
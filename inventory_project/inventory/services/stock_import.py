@@ -0,0 +1,245 @@
+"""
+Bulk stock assignment: many (product, warehouse, quantity) lines in one call.
+
+Lines come from a JSON array or an uploaded CSV / JSON-lines file, read as a
+stream. They are checked and applied chunk by chunk, each chunk in its own
+transaction with one batched upsert, one ledger INSERT and one stock change
+event, and every line gets an entry in the returned report.
+"""
+import csv
+import json
+import logging
+from itertools import islice
+
+from django.db import transaction
+
+from core.constants import MovementKind
+from inventory.models import Product
+from inventory.services.ledger import build_movement, record_movements
+from inventory.services.stock import batched_stock_changes, bulk_increase_stock
+from warehouses.models import Warehouse
+
+logger = logging.getLogger(__name__)
+
+LINE_FIELDS = ("product_id", "warehouse_id", "quantity")
+
+DEFAULT_CHUNK_SIZE = 1000
+
+STATUS_ASSIGNED = "ASSIGNED"
+STATUS_REJECTED = "REJECTED"
+STATUS_FAILED = "FAILED"
+
+
+class ImportFormatError(ValueError):
+    """
+    The upload cannot be read at all (unknown format, missing CSV columns).
+    """
+
+
+# ---------------------------------------------------------
+# Reading
+# ---------------------------------------------------------
+def _text_lines(upload):
+    for number, line in enumerate(upload, start=1):
+        if number == 1:
+            line = line.removeprefix(b"\xef\xbb\xbf")
+        yield line.decode("utf-8", "replace")
+
+
+def _csv_rows(upload):
+    reader = csv.DictReader(_text_lines(upload))
+    missing = [field for field in LINE_FIELDS if field not in (reader.fieldnames or ())]
+    if missing:
+        raise ImportFormatError(f"CSV header is missing: {', '.join(missing)}")
+    # Line numbers count the header, as a spreadsheet shows them
+    for row in reader:
+        yield reader.line_num, row
+
+
+def _jsonl_rows(upload):
+    for number, line in enumerate(_text_lines(upload), start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield number, json.loads(line)
+        except ValueError:
+            yield number, None
+
+
+def read_upload(upload):
+    """
+    Iterate (line number, raw row) over an uploaded .csv or .jsonl/.ndjson
+    file without loading it whole. Unparseable rows come through as None.
+    """
+    name = (upload.name or "").lower()
+    if name.endswith(".csv"):
+        return _csv_rows(upload)
+    if name.endswith((".jsonl", ".ndjson")):
+        return _jsonl_rows(upload)
+    raise ImportFormatError("Upload a .csv or .jsonl file")
+
+
+def read_items(items):
+    """
+    (line number, raw row) over a JSON array of line objects.
+    """
+    return enumerate(items, start=1)
+
+
+def _parse_line(raw):
+    """
+    Returns:
+        (warehouse_id, product_id, quantity)
+
+    Raises:
+        ValueError: with the message reported for the line.
+    """
+    if not isinstance(raw, dict):
+        raise ValueError("Not a product_id / warehouse_id / quantity record")
+    values = []
+    for field in ("warehouse_id", "product_id", "quantity"):
+        value = raw.get(field)
+        if isinstance(value, str):
+            value = value.strip()
+        try:
+            values.append(int(value))
+        except (TypeError, ValueError):
+            raise ValueError(f"{field} must be an integer")
+    if values[2] < 1:
+        raise ValueError("quantity must be at least 1")
+    return tuple(values)
+
+
+# ---------------------------------------------------------
+# Applying
+# ---------------------------------------------------------
+class _Checks:
+    """
+    Warehouse permission and product existence, looked up once per id for
+    the whole import, a chunk's new ids in one query each.
+    """
+
+    def __init__(self, allowed_warehouse_ids):
+        self.allowed_warehouse_ids = allowed_warehouse_ids
+        self.warehouse_errors = {}
+        self.known_products = {}
+
+    def load(self, warehouse_ids, product_ids):
+        new_warehouses = warehouse_ids - self.warehouse_errors.keys()
+        if new_warehouses:
+            live = set(
+                Warehouse.objects
+                .filter(id__in=new_warehouses, is_deleted=False)
+                .values_list("id", flat=True)
+            )
+            for warehouse_id in new_warehouses:
+                if warehouse_id not in live:
+                    error = "Warehouse not found"
+                elif self.allowed_warehouse_ids is not None and warehouse_id not in self.allowed_warehouse_ids:
+                    error = "You do not have permission to assign stock to this warehouse"
+                else:
+                    error = None
+                self.warehouse_errors[warehouse_id] = error
+
+        new_products = product_ids - self.known_products.keys()
+        if new_products:
+            existing = set(Product.objects.filter(id__in=new_products).values_list("id", flat=True))
+            for product_id in new_products:
+                self.known_products[product_id] = product_id in existing
+
+    def error(self, warehouse_id, product_id):
+        return self.warehouse_errors[warehouse_id] or (
+            None if self.known_products[product_id] else "Product not found"
+        )
+
+
+def _apply_chunk(chunk, checks, actor, results):
+    parsed = []
+    for line, raw in chunk:
+        try:
+            parsed.append((line, _parse_line(raw)))
+        except ValueError as exc:
+            results.append({"line": line, "status": STATUS_REJECTED, "error": str(exc)})
+
+    checks.load({w for _, (w, _p, _q) in parsed}, {p for _, (_w, p, _q) in parsed})
+
+    accepted = []
+    for line, (warehouse_id, product_id, quantity) in parsed:
+        error = checks.error(warehouse_id, product_id)
+        if error:
+            results.append({"line": line, "status": STATUS_REJECTED, "error": error})
+        else:
+            accepted.append((line, warehouse_id, product_id, quantity))
+    if not accepted:
+        return
+
+    try:
+        with transaction.atomic(), batched_stock_changes():
+            quantities = bulk_increase_stock((w, p, q) for _, w, p, q in accepted)
+            record_movements(
+                build_movement(
+                    warehouse_id=warehouse_id,
+                    product_id=product_id,
+                    quantity_change=quantity,
+                    kind=MovementKind.ASSIGN,
+                    actor=actor,
+                )
+                for _, warehouse_id, product_id, quantity in accepted
+            )
+    except Exception as exc:
+        logger.exception("Bulk stock assignment chunk failed at line %s", accepted[0][0])
+        for line, *_ in accepted:
+            results.append({"line": line, "status": STATUS_FAILED, "error": str(exc)})
+        return
+
+    for line, warehouse_id, product_id, quantity in accepted:
+        results.append({
+            "line": line,
+            "status": STATUS_ASSIGNED,
+            "warehouse_id": warehouse_id,
+            "product_id": product_id,
+            "quantity": quantity,
+            # Stock after the whole chunk, which may include later lines for the same row
+            "stock_quantity": quantities[(warehouse_id, product_id)],
+        })
+
+
+def assign_stock_lines(rows, actor=None, allowed_warehouse_ids=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Assign stock for every valid line of rows, chunk_size lines per transaction.
+
+    A line that fails validation is rejected on its own; a chunk that fails
+    to write is rolled back as a whole and its lines reported as failed,
+    while the other chunks still commit.
+
+    Args:
+        rows: iterable of (line number, raw row), see read_items / read_upload.
+        allowed_warehouse_ids: warehouses the actor may assign to, None for all.
+
+    Returns:
+        {"total", "assigned", "rejected", "failed", "results": [per-line entries]}
+
+    Raises:
+        ImportFormatError: the upload cannot be read.
+    """
+    checks = _Checks(allowed_warehouse_ids)
+    results = []
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            break
+        _apply_chunk(chunk, checks, actor, results)
+
+    results.sort(key=lambda entry: entry["line"])
+    counts = {STATUS_ASSIGNED: 0, STATUS_REJECTED: 0, STATUS_FAILED: 0}
+    for entry in results:
+        counts[entry["status"]] += 1
+    return {
+        "total": len(results),
+        "assigned": counts[STATUS_ASSIGNED],
+        "rejected": counts[STATUS_REJECTED],
+        "failed": counts[STATUS_FAILED],
+        "results": results,
+    }
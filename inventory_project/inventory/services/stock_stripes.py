@@ -0,0 +1,116 @@
+"""
+Striped stock rows for very hot (warehouse, product) pairs.
+
+A striped Stock also keeps its units split over stripe_count StockStripe
+rows. Stock.quantity stays the exact total: every change updates the stock
+row (quantity and version) first, then puts the same delta into one stripe
+picked at random, all in one transaction. A decrement the picked stripe
+cannot cover locks all the stripes and spreads the new total evenly again
+(rebalancing). Batch writes re-spread the stripes of the rows they change.
+
+Lock order: stock row first, then its stripes in index order.
+"""
+import random
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Value, When
+from django.utils import timezone
+
+from inventory.models import Stock, StockStripe
+
+MAX_STRIPES = 64
+
+
+def _shares(total, stripe_count):
+    share, extra = divmod(total, stripe_count)
+    return [share + 1 if index < extra else share for index in range(stripe_count)]
+
+
+def spread_stripes(totals, stripe_counts):
+    """
+    Set the stripes of each stock to an even split of its total, in one
+    UPDATE. The stripes must be locked.
+
+    Args:
+        totals: {stock_id: total}
+        stripe_counts: {stock_id: stripe_count}
+    """
+    if not totals:
+        return
+    whens = []
+    for stock_id, total in totals.items():
+        share, extra = divmod(total, stripe_counts[stock_id])
+        whens.append(When(stock_id=stock_id, index__lt=extra, then=Value(share + 1)))
+        whens.append(When(stock_id=stock_id, then=Value(share)))
+    StockStripe.objects.filter(stock_id__in=totals).update(
+        quantity=Case(*whens, output_field=IntegerField())
+    )
+
+
+def lock_stripes(stock_ids):
+    """
+    SELECT ... FOR UPDATE every stripe of the given stocks, in (stock, index)
+    order. Lock the stock rows first.
+
+    Returns:
+        {stock_id: stripe total}; stocks without stripes are absent.
+    """
+    totals = defaultdict(int)
+    rows = (
+        StockStripe.objects
+        .select_for_update()
+        .filter(stock_id__in=stock_ids)
+        .order_by("stock_id", "index")
+        .values_list("stock_id", "quantity")
+    )
+    for stock_id, quantity in rows:
+        totals[stock_id] += quantity
+    return dict(totals)
+
+
+def apply_striped_delta(stock_id, stripe_count, total, delta):
+    """
+    Put a delta that was just applied to a striped stock row (now holding
+    total units) into one random stripe, rebalancing when that stripe
+    cannot cover a decrement. The stock row must be locked by the caller's
+    UPDATE, so no other writer can touch the stripes until commit.
+    """
+    stripe = StockStripe.objects.filter(stock_id=stock_id, index=random.randrange(stripe_count))
+    guarded = stripe.filter(quantity__gte=-delta) if delta < 0 else stripe
+    if not guarded.update(quantity=F("quantity") + delta):
+        lock_stripes([stock_id])
+        spread_stripes({stock_id: total}, {stock_id: stripe_count})
+
+
+@transaction.atomic
+def set_stock_stripes(warehouse_id, product_id, stripe_count):
+    """
+    Stripe a (warehouse, product) over stripe_count rows, change its
+    stripe count, or turn it back into a plain row with 0. The units are
+    kept and spread evenly; the stock row is created if needed.
+
+    Returns:
+        The Stock.
+    """
+    if not 0 <= stripe_count <= MAX_STRIPES:
+        raise ValueError(f"stripe_count must be between 0 and {MAX_STRIPES}")
+
+    Stock.objects.get_or_create(warehouse_id=warehouse_id, product_id=product_id)
+    stock = Stock.objects.select_for_update().get(warehouse_id=warehouse_id, product_id=product_id)
+    lock_stripes([stock.id])
+
+    StockStripe.objects.filter(stock=stock).delete()
+    if stripe_count:
+        StockStripe.objects.bulk_create([
+            StockStripe(stock=stock, index=index, quantity=share)
+            for index, share in enumerate(_shares(stock.quantity, stripe_count))
+        ])
+
+    Stock.objects.filter(pk=stock.id).update(
+        stripe_count=stripe_count,
+        version=F("version") + 1,
+        updated_at=timezone.now(),
+    )
+    stock.refresh_from_db()
+    return stock
@@ -1,49 +1,56 @@
-from django.db.models.signals import pre_save
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
-from django.contrib.auth import get_user_model
 
 from inventory.models import Stock, LowStockThreshold
+from inventory.services.low_stock_state import ENTERED_LOW, evaluate_low_stock
+from inventory.services.stock import record_stock_change
 
-User = get_user_model()
 
+def _enqueue_alert(state):
+    # Import here to avoid circular dependency
+    from notifications.services.alerts import enqueue_low_stock_alert
+    enqueue_low_stock_alert(state)
 
-@receiver(pre_save, sender=Stock)
-def stock_decrease_low_stock_alert(sender, instance: Stock, **kwargs):
+
+@receiver(post_save, sender=Stock)
+def stock_changed(sender, instance: Stock, created, **kwargs):
     """
-    Check for low stock when stock quantity decreases.
-    Emits a signal that the notifications app can listen to.
+    Record a quantity change in the outbox; low-stock tracking, dashboard
+    summaries and rollups follow from the event instead of adding queries
+    here. The old value comes from the instance, not another SELECT.
     """
-    if not instance.pk:
+    if not created and not instance.quantity_changed:
         return
+    record_stock_change(
+        instance.warehouse_id,
+        instance.product_id,
+        instance.quantity,
+        None if created else instance.previous_quantity,
+    )
 
-    old_stock = Stock.objects.get(pk=instance.pk)
 
-    if instance.quantity >= old_stock.quantity:
+@receiver(post_save, sender=LowStockThreshold)
+@receiver(post_delete, sender=LowStockThreshold)
+def threshold_low_stock_transition(sender, instance: LowStockThreshold, **kwargs):
+    """
+    A threshold change can move an unchanged stock in or out of low. Only
+    a configured threshold alerts: deleting one falls back to the default
+    silently.
+    """
+    quantity = (
+        Stock.objects
+        .filter(warehouse_id=instance.warehouse_id, product_id=instance.product_id)
+        .values_list("quantity", flat=True)
+        .first()
+    )
+    if quantity is None:
         return
 
-    try:
-        threshold = LowStockThreshold.objects.get(
-            warehouse=instance.warehouse,
-            product=instance.product
-        )
-    except LowStockThreshold.DoesNotExist:
-        return
+    transition, state = evaluate_low_stock(instance.warehouse_id, instance.product_id, quantity)
+    if transition == ENTERED_LOW and kwargs["signal"] is post_save:
+        _enqueue_alert(state)
+
 
-    if instance.quantity <= threshold.threshold_quantity:
-        # Import here to avoid circular dependency
-        from notifications.signals import send_low_stock_notification
-        
-        low_stock_items = [{
-            "warehouse": instance.warehouse.name,
-            "product": instance.product.name,
-            "current_qty": instance.quantity,
-            "threshold": threshold.threshold_quantity,
-        }]
-
-        recipients = (
-            User.objects
-            .filter(role__name__in=["ADMIN", "MANAGER"])
-            .values_list("email", flat=True)
-        )
-
-        send_low_stock_notification(list(recipients), low_stock_items)
+@receiver(post_delete, sender=Stock)
+def stock_deleted(sender, instance: Stock, **kwargs):
+    record_stock_change(instance.warehouse_id, instance.product_id, None, instance.quantity)
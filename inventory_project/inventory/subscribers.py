@@ -0,0 +1,44 @@
+from core.constants import DEFAULT_LOW_STOCK_THRESHOLD
+from core.events import STOCK_EVENTS, stock_changes, subscriber
+from inventory.models import LowStockState, LowStockThreshold
+from inventory.services.low_stock_state import ENTERED_LOW, evaluate_low_stock
+
+
+@subscriber("low_stock_state", *STOCK_EVENTS)
+def track_low_stock(records):
+    """
+    Move each (warehouse, product) of the batch to its latest quantity and
+    queue an alert when it goes low. Delivery happens in process_low_stock_alerts.
+
+    Stocks without a configured LowStockThreshold are tracked against the
+    default (for the dashboards) but never alert.
+    """
+    # Import here to avoid circular dependency
+    from notifications.services.alerts import enqueue_low_stock_alert
+
+    latest = {}
+    for change in stock_changes(records):
+        latest[(change.warehouse_id, change.product_id)] = change.quantity
+
+    thresholds = {
+        (t.warehouse_id, t.product_id): t.threshold_quantity
+        for t in LowStockThreshold.objects.filter(
+            warehouse_id__in={key[0] for key in latest},
+            product_id__in={key[1] for key in latest},
+        )
+    }
+
+    for (warehouse_id, product_id), quantity in latest.items():
+        if quantity is None:
+            LowStockState.objects.filter(warehouse_id=warehouse_id, product_id=product_id).delete()
+            continue
+
+        configured = thresholds.get((warehouse_id, product_id))
+        transition, state = evaluate_low_stock(
+            warehouse_id,
+            product_id,
+            quantity,
+            threshold=DEFAULT_LOW_STOCK_THRESHOLD if configured is None else configured,
+        )
+        if transition == ENTERED_LOW and configured is not None:
+            enqueue_low_stock_alert(state)
@@ -14,6 +14,7 @@ from pathlib import Path
 from datetime import timedelta
 import os
 from dotenv import load_dotenv
+from corsheaders.defaults import default_headers
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -73,6 +74,9 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
 ]
 CORS_ALLOW_ALL_ORIGINS = True
+# Clients send Idempotency-Key on state-changing requests (see core.idempotency)
+CORS_ALLOW_HEADERS = (*default_headers, "idempotency-key")
+CORS_EXPOSE_HEADERS = ["Idempotent-Replayed"]
 ROOT_URLCONF = 'inventory_project.urls'
 
 TEMPLATES = [
@@ -178,3 +182,22 @@ EMAIL_USE_TLS = os.getenv("EMAIL_USE_TLS") == "True"
 EMAIL_HOST_USER = os.getenv("EMAIL_HOST_USER")
 EMAIL_HOST_PASSWORD = os.getenv("EMAIL_HOST_PASSWORD")
 DEFAULT_FROM_EMAIL = os.getenv("DEFAULT_FROM_EMAIL")
+
+# Low-stock alerts fire when quantity drops to the threshold and re-arm only
+# once it climbs above threshold + LOW_STOCK_HYSTERESIS
+LOW_STOCK_HYSTERESIS = int(os.getenv("LOW_STOCK_HYSTERESIS", "0"))
+
+# Alert window for recipients without a preference: IMMEDIATE, HOURLY or DAILY
+LOW_STOCK_DIGEST_WINDOW = os.getenv("LOW_STOCK_DIGEST_WINDOW", "IMMEDIATE")
+
+# How long claimed purchase requests stay reserved for the staff member who claimed them
+PURCHASE_CLAIM_LEASE_SECONDS = int(os.getenv("PURCHASE_CLAIM_LEASE_SECONDS", "300"))
+
+# How long a response stays replayable for its Idempotency-Key
+IDEMPOTENCY_KEY_TTL_SECONDS = int(os.getenv("IDEMPOTENCY_KEY_TTL_SECONDS", "86400"))
+
+# How often flush_stock_receipts --loop applies buffered stock receipts
+STOCK_RECEIPT_FLUSH_INTERVAL_MS = int(os.getenv("STOCK_RECEIPT_FLUSH_INTERVAL_MS", "250"))
+
+# Passes in a row an outbox event may fail for one subscriber before it is parked
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "5"))
@@ -12,6 +12,7 @@ urlpatterns = [
     path("api/", include("accounts.urls")),
     path("api/", include("roles.urls")),
     path("api/", include("warehouses.urls")),
+    path("api/", include("reports.urls")),
 ]
 
 # ✅ THEN append static URLs
@@ -1,3 +1,16 @@
 from django.contrib import admin
+from notifications.models import AlertDigestPreference, LowStockAlertEvent
 
-# Register your models here.
+
+@admin.register(LowStockAlertEvent)
+class LowStockAlertEventAdmin(admin.ModelAdmin):
+    list_display = ['warehouse', 'product', 'quantity', 'threshold', 'status', 'created_at', 'sent_at']
+    list_filter = ['status']
+    readonly_fields = ['warehouse', 'product', 'quantity', 'threshold', 'created_at', 'sent_at']
+
+
+@admin.register(AlertDigestPreference)
+class AlertDigestPreferenceAdmin(admin.ModelAdmin):
+    list_display = ['user', 'window', 'last_sent_at', 'failed_attempts', 'retry_at']
+    list_filter = ['window']
+    readonly_fields = ['last_event_id', 'last_sent_at', 'failed_attempts', 'retry_at', 'last_error']
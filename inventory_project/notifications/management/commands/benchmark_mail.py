@@ -0,0 +1,66 @@
+import time
+
+from django.core.mail import get_connection
+from django.core.management.base import BaseCommand
+
+from notifications.services.mailer import BatchMailer
+from notifications.services.smtp_sink import SMTPSink
+from warehouses.services.email_alerts import build_low_stock_email
+
+
+class Command(BaseCommand):
+    help = "Benchmark batched low-stock mail delivery against an in-process SMTP sink"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--messages", type=int, default=500)
+        parser.add_argument("--batch-size", type=int, default=50)
+        parser.add_argument("--items", type=int, default=10, help="Alert lines per message")
+        parser.add_argument(
+            "--compare",
+            action="store_true",
+            help="Also time one connection per message (the old .send() path)",
+        )
+
+    def _messages(self, count, items):
+        alert_items = [
+            {"warehouse": f"Warehouse {i % 5}", "product": f"Product {i}", "current_qty": i % 4, "threshold": 10}
+            for i in range(items)
+        ]
+        return [
+            build_low_stock_email([f"recipient{n}@example.com"], alert_items)
+            for n in range(count)
+        ]
+
+    def handle(self, *args, **options):
+        messages = self._messages(options["messages"], options["items"])
+
+        with SMTPSink() as sink:
+            def connection():
+                return get_connection(
+                    "django.core.mail.backends.smtp.EmailBackend",
+                    host=sink.host, port=sink.port,
+                    username="", password="", use_tls=False, use_ssl=False,
+                )
+
+            with BatchMailer(connection=connection(), batch_size=options["batch_size"]) as mailer:
+                failures = mailer.send(messages)
+
+            stats = mailer.stats.as_dict()
+            self.stdout.write(
+                f"batched: {stats['sent']} sent, {len(failures)} failed, "
+                f"{stats['connections']} connection(s), {stats['seconds']}s, "
+                f"{stats['throughput']} msg/s"
+            )
+
+            if options["compare"]:
+                started = time.monotonic()
+                for message in messages:
+                    message.connection = connection()
+                    message.send(fail_silently=False)
+                seconds = time.monotonic() - started
+                self.stdout.write(
+                    f"per-message: {len(messages)} sent, {len(messages)} connection(s), "
+                    f"{seconds:.3f}s, {len(messages) / seconds if seconds else 0:.1f} msg/s"
+                )
+
+            self.stdout.write(self.style.SUCCESS(f"Sink received {sink.message_count} message(s)"))
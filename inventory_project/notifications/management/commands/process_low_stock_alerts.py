@@ -0,0 +1,43 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from notifications.services.alerts import deliver_alert_digests
+
+
+class Command(BaseCommand):
+    help = "Deliver pending low-stock alert events as per-recipient digests (outbox worker)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=200, help="Recipients per transaction")
+        parser.add_argument(
+            "--settle-seconds",
+            type=int,
+            default=5,
+            help="Leave events younger than this for the next pass",
+        )
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Keep polling instead of exiting after one pass",
+        )
+        parser.add_argument("--interval", type=float, default=5.0, help="Seconds between polls with --loop")
+
+    def handle(self, *args, **options):
+        total_sent = total_failed = 0
+
+        while True:
+            sent, failed = deliver_alert_digests(
+                batch_size=options["batch_size"],
+                settle_seconds=options["settle_seconds"],
+            )
+            total_sent += sent
+            total_failed += failed
+
+            if not options["loop"]:
+                break
+            time.sleep(options["interval"])
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Low-stock alerts: {total_sent} sent, {total_failed} failed")
+        )
@@ -1,3 +1,78 @@
+from django.conf import settings
 from django.db import models
+from django.utils import timezone
 
-# Notifications models will go here
+
+class LowStockAlertEvent(models.Model):
+    """
+    Outbox row for a low-stock alert.
+    Written in the transaction that moved the stock into low state and
+    delivered afterwards, per recipient, by the process_low_stock_alerts worker.
+    """
+    STATUS_PENDING = "PENDING"
+    STATUS_SENT = "SENT"
+
+    STATUS_CHOICES = [
+        (STATUS_PENDING, "Pending"),
+        (STATUS_SENT, "Sent"),  # Every recipient's digest has covered it
+    ]
+
+    warehouse = models.ForeignKey(
+        "warehouses.Warehouse",  # String reference
+        on_delete=models.CASCADE,
+        related_name="low_stock_alert_events"
+    )
+    product = models.ForeignKey(
+        "inventory.Product",  # String reference
+        on_delete=models.CASCADE,
+        related_name="low_stock_alert_events"
+    )
+    quantity = models.IntegerField()
+    threshold = models.PositiveIntegerField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    created_at = models.DateTimeField(default=timezone.now)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'notifications_low_stock_alert_event'
+        indexes = [
+            models.Index(fields=["created_at"]),
+            models.Index(fields=["status", "id"]),
+        ]
+
+    def __str__(self):
+        return f"Low stock {self.warehouse_id}/{self.product_id} ({self.status})"
+
+
+class AlertDigestPreference(models.Model):
+    """
+    How often one user receives low-stock alerts, and how far their
+    digests have read the LowStockAlertEvent outbox.
+    """
+    WINDOW_IMMEDIATE = "IMMEDIATE"
+    WINDOW_HOURLY = "HOURLY"
+    WINDOW_DAILY = "DAILY"
+
+    WINDOW_CHOICES = [
+        (WINDOW_IMMEDIATE, "Immediate"),
+        (WINDOW_HOURLY, "Hourly digest"),
+        (WINDOW_DAILY, "Daily digest"),
+    ]
+
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="alert_digest_preference",
+    )
+    window = models.CharField(max_length=20, choices=WINDOW_CHOICES, default=WINDOW_IMMEDIATE)
+    last_event_id = models.BigIntegerField(default=0)  # Outbox events up to this id are delivered
+    last_sent_at = models.DateTimeField(null=True, blank=True)
+    failed_attempts = models.PositiveIntegerField(default=0)
+    retry_at = models.DateTimeField(null=True, blank=True)  # Not retried before this time
+    last_error = models.TextField(blank=True)
+
+    class Meta:
+        db_table = 'notifications_alert_digest_preference'
+
+    def __str__(self):
+        return f"{self.user_id}: {self.window}"
@@ -0,0 +1,276 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Max, Min, Q
+from django.utils import timezone
+
+from core.constants import UserRole
+from notifications.models import AlertDigestPreference, LowStockAlertEvent
+from notifications.services.mailer import BatchMailer
+from warehouses.models import Warehouse
+from warehouses.services.email_alerts import DEFAULT_SUBJECT, build_low_stock_email
+
+User = get_user_model()
+
+RECIPIENT_ROLES = [UserRole.ADMIN, UserRole.MANAGER]
+
+RETRY_BASE_SECONDS = 60
+MAX_RETRY_SECONDS = 3600
+
+WINDOWS = {
+    AlertDigestPreference.WINDOW_IMMEDIATE: timedelta(0),
+    AlertDigestPreference.WINDOW_HOURLY: timedelta(hours=1),
+    AlertDigestPreference.WINDOW_DAILY: timedelta(days=1),
+}
+
+SUBJECTS = {
+    AlertDigestPreference.WINDOW_IMMEDIATE: DEFAULT_SUBJECT,
+    AlertDigestPreference.WINDOW_HOURLY: "Hourly Low Stock Digest",
+    AlertDigestPreference.WINDOW_DAILY: "Daily Low Stock Digest",
+}
+
+
+def enqueue_low_stock_alert(state):
+    """
+    Record a low-stock alert for delivery. Call in the transaction that
+    changed the stock: the event commits (or rolls back) with it.
+    """
+    return LowStockAlertEvent.objects.create(
+        warehouse_id=state.warehouse_id,
+        product_id=state.product_id,
+        quantity=state.quantity,
+        threshold=state.threshold,
+    )
+
+
+# ---------------------------------------------------------
+# Recipients
+# ---------------------------------------------------------
+def _recipient_users():
+    return User.objects.filter(role__name__in=RECIPIENT_ROLES).exclude(email="")
+
+
+def recipient_scopes():
+    """
+    Everyone who receives low-stock alerts, in two queries.
+
+    Returns:
+        {user_id: (email, warehouse_ids)}; warehouse_ids is None for admins
+        (every warehouse) and the set of managed warehouses for managers.
+    """
+    managed = {}
+    for warehouse_id, user_id in (
+        Warehouse.objects
+        .filter(is_deleted=False, manager__isnull=False)
+        .values_list("id", "manager__user_id")
+    ):
+        managed.setdefault(user_id, set()).add(warehouse_id)
+
+    return {
+        user_id: (email, None if role == UserRole.ADMIN else managed.get(user_id, set()))
+        for user_id, email, role in _recipient_users().values_list("id", "email", "role__name")
+    }
+
+
+def scoped_items(items_by_warehouse, warehouse_ids):
+    """
+    The alert items one recipient sees, from items grouped by warehouse id.
+    """
+    if warehouse_ids is None:
+        return [item for items in items_by_warehouse.values() for item in items]
+    return [
+        item
+        for warehouse_id in sorted(warehouse_ids)
+        for item in items_by_warehouse.get(warehouse_id, ())
+    ]
+
+
+# ---------------------------------------------------------
+# Digest delivery
+# ---------------------------------------------------------
+def _ensure_preferences(user_ids):
+    """
+    Give new recipients a preference row. They start at the oldest event
+    still pending, not at the beginning of the outbox history.
+    """
+    existing = set(
+        AlertDigestPreference.objects
+        .filter(user_id__in=user_ids)
+        .values_list("user_id", flat=True)
+    )
+    missing = [user_id for user_id in user_ids if user_id not in existing]
+    if not missing:
+        return
+
+    oldest = (
+        LowStockAlertEvent.objects
+        .filter(status=LowStockAlertEvent.STATUS_PENDING)
+        .aggregate(first=Min("id"))["first"]
+    )
+    start = oldest - 1 if oldest else (LowStockAlertEvent.objects.aggregate(top=Max("id"))["top"] or 0)
+
+    AlertDigestPreference.objects.bulk_create(
+        [
+            AlertDigestPreference(
+                user_id=user_id,
+                window=settings.LOW_STOCK_DIGEST_WINDOW,
+                last_event_id=start,
+            )
+            for user_id in missing
+        ],
+        ignore_conflicts=True,
+    )
+
+
+def _due_q(now):
+    """
+    Preferences whose digest window has elapsed and that are not backing off.
+    """
+    due = Q(last_sent_at__isnull=True)
+    for window, span in WINDOWS.items():
+        due |= Q(window=window, last_sent_at__lte=now - span)
+    return due & (Q(retry_at__isnull=True) | Q(retry_at__lte=now))
+
+
+def _collect_items(after_id, upper_id):
+    """
+    Latest event per (warehouse, product) in (after_id, upper_id], grouped by
+    warehouse id. Repeated alerts for one item collapse into a single line, so
+    the work follows the number of distinct items rather than events.
+    """
+    latest_ids = (
+        LowStockAlertEvent.objects
+        .filter(id__gt=after_id, id__lte=upper_id)
+        .values("warehouse_id", "product_id")
+        .annotate(last_id=Max("id"))
+        .values("last_id")
+    )
+    events = (
+        LowStockAlertEvent.objects
+        .filter(id__in=latest_ids)
+        .select_related("warehouse", "product")
+        .order_by("warehouse_id", "product_id")
+    )
+
+    grouped = {}
+    for event in events:
+        grouped.setdefault(event.warehouse_id, []).append({
+            "event_id": event.id,
+            "warehouse": event.warehouse.name,
+            "product": event.product.name,
+            "current_qty": event.quantity,
+            "threshold": event.threshold,
+        })
+    return grouped
+
+
+def _mark_failed(preference, exc, now):
+    preference.failed_attempts += 1
+    preference.last_error = str(exc)[:2000]
+    # Exponential backoff: 1, 2, 4, 8 minutes... capped at an hour
+    delay = min(RETRY_BASE_SECONDS * 2 ** (preference.failed_attempts - 1), MAX_RETRY_SECONDS)
+    preference.retry_at = now + timedelta(seconds=delay)
+
+
+def _mark_delivered(now):
+    """
+    Flag events that every current recipient's digest has covered.
+    """
+    floor = (
+        AlertDigestPreference.objects
+        .filter(user__in=_recipient_users())
+        .aggregate(low=Min("last_event_id"))["low"]
+    )
+    if floor:
+        LowStockAlertEvent.objects.filter(
+            status=LowStockAlertEvent.STATUS_PENDING, id__lte=floor
+        ).update(status=LowStockAlertEvent.STATUS_SENT, sent_at=now)
+
+
+def deliver_alert_digests(batch_size=200, settle_seconds=5):
+    """
+    One delivery pass: every recipient whose window (immediate, hourly or
+    daily) is due gets a single message covering the events since their
+    last one, restricted to the warehouses they may see.
+
+    Recipients are handled in batches of batch_size, each locked for this
+    worker (rows held by another worker are skipped) and served by one
+    grouped outbox query. All messages of the pass go through one
+    BatchMailer. Events newer than settle_seconds are left for the next
+    pass so in-flight transactions can commit.
+
+    Returns:
+        (sent, failed) message counts.
+    """
+    now = timezone.now()
+    upper = (
+        LowStockAlertEvent.objects
+        .filter(created_at__lte=now - timedelta(seconds=settle_seconds))
+        .aggregate(top=Max("id"))["top"]
+    )
+    if upper is None:
+        return 0, 0
+
+    scopes = recipient_scopes()
+    _ensure_preferences(list(scopes))
+
+    sent = failed = 0
+    last_user_id = 0
+    with BatchMailer() as mailer:
+        while True:
+            with transaction.atomic():
+                preferences = list(
+                    AlertDigestPreference.objects
+                    .select_for_update(skip_locked=True, of=("self",))
+                    .filter(_due_q(now), user__in=_recipient_users())
+                    .filter(user_id__gt=last_user_id, last_event_id__lt=upper)
+                    .order_by("user_id")[:batch_size]
+                )
+                if not preferences:
+                    break
+                last_user_id = preferences[-1].user_id
+
+                grouped = _collect_items(min(p.last_event_id for p in preferences), upper)
+
+                outgoing = {}
+                for preference in preferences:
+                    email, warehouse_ids = scopes.get(preference.user_id, ("", set()))
+                    items = [
+                        item for item in scoped_items(grouped, warehouse_ids)
+                        if item["event_id"] > preference.last_event_id
+                    ]
+                    message = build_low_stock_email(
+                        [email] if email else [], items, subject=SUBJECTS[preference.window]
+                    )
+                    if message is not None:
+                        outgoing[id(message)] = (message, preference)
+
+                errors = {
+                    id(message): exc
+                    for message, exc in mailer.send(message for message, _ in outgoing.values())
+                }
+                outcome = {preference.pk: key for key, (_, preference) in outgoing.items()}
+
+                for preference in preferences:
+                    key = outcome.get(preference.pk)
+                    if key in errors:
+                        _mark_failed(preference, errors[key], now)
+                        failed += 1
+                        continue
+                    if key is not None:
+                        preference.last_sent_at = now
+                        sent += 1
+                    preference.last_event_id = upper
+                    preference.failed_attempts = 0
+                    preference.retry_at = None
+                    preference.last_error = ""
+
+                AlertDigestPreference.objects.bulk_update(
+                    preferences,
+                    ["last_event_id", "last_sent_at", "failed_attempts", "retry_at", "last_error"],
+                )
+
+    _mark_delivered(now)
+    return sent, failed
@@ -0,0 +1,171 @@
+import logging
+import smtplib
+import time
+
+from django.core.mail import get_connection
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 50
+DEFAULT_MAX_RETRIES = 3
+DEFAULT_BACKOFF_SECONDS = 1.0
+
+
+def is_permanent_failure(exc):
+    """
+    True for errors retrying cannot fix: the server rejected this message
+    (5xx, refused recipients). Anything else, e.g. a dropped connection or a
+    4xx, is treated as transient.
+    """
+    if isinstance(exc, smtplib.SMTPRecipientsRefused):
+        return True
+    if isinstance(exc, smtplib.SMTPResponseException):
+        return exc.smtp_code >= 500
+    return False
+
+
+class MailStats:
+    """
+    Counters for one BatchMailer.
+    """
+
+    def __init__(self):
+        self.sent = 0
+        self.failed = 0
+        self.batches = 0
+        self.retries = 0
+        self.connections = 0
+        self.seconds = 0.0
+
+    @property
+    def throughput(self):
+        """Messages sent per second of sending time."""
+        return self.sent / self.seconds if self.seconds else 0.0
+
+    def as_dict(self):
+        return {
+            "sent": self.sent,
+            "failed": self.failed,
+            "batches": self.batches,
+            "retries": self.retries,
+            "connections": self.connections,
+            "seconds": round(self.seconds, 3),
+            "throughput": round(self.throughput, 1),
+        }
+
+
+class BatchMailer:
+    """
+    Sends many messages over one reused mail connection, in batches.
+
+    A transient error closes the connection and retries the rest of the
+    batch after an exponential backoff (backoff_seconds, x2, x4...), up to
+    max_retries per batch; messages already accepted are not sent again.
+    A permanent rejection fails only that message.
+
+    Usage:
+        with BatchMailer() as mailer:
+            failures = mailer.send(messages)
+        mailer.stats.as_dict()
+    """
+
+    def __init__(
+        self,
+        connection=None,
+        batch_size=DEFAULT_BATCH_SIZE,
+        max_retries=DEFAULT_MAX_RETRIES,
+        backoff_seconds=DEFAULT_BACKOFF_SECONDS,
+        sleep=time.sleep,
+    ):
+        self.connection = connection or get_connection()
+        self.batch_size = max(1, batch_size)
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.sleep = sleep
+        self.stats = MailStats()
+        self._open = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _ensure_open(self):
+        if not self._open:
+            self.connection.open()
+            self._open = True
+            self.stats.connections += 1
+
+    def close(self):
+        if self._open:
+            try:
+                self.connection.close()
+            except Exception:
+                # Closing a connection the server already dropped
+                pass
+            self._open = False
+
+    def _send_batch(self, batch, failures):
+        retries = 0
+        position = 0
+
+        while position < len(batch):
+            message = batch[position]
+            try:
+                self._ensure_open()
+                self.connection.send_messages([message])
+            except Exception as exc:
+                if is_permanent_failure(exc):
+                    failures.append((message, exc))
+                    self.stats.failed += 1
+                    position += 1
+                    continue
+
+                self.close()
+                if retries >= self.max_retries:
+                    logger.warning("Mail batch gave up after %s retries: %s", retries, exc)
+                    for unsent in batch[position:]:
+                        failures.append((unsent, exc))
+                    self.stats.failed += len(batch) - position
+                    return
+
+                delay = self.backoff_seconds * 2 ** retries
+                retries += 1
+                self.stats.retries += 1
+                logger.info("Mail batch retry %s in %.1fs: %s", retries, delay, exc)
+                self.sleep(delay)
+                continue
+
+            self.stats.sent += 1
+            position += 1
+
+    def send(self, messages):
+        """
+        Send messages in batches over the shared connection.
+
+        Returns:
+            List of (message, exception) for messages that were not sent.
+        """
+        messages = [m for m in messages if m is not None]
+        failures = []
+        started = time.monotonic()
+
+        for start in range(0, len(messages), self.batch_size):
+            self.stats.batches += 1
+            self._send_batch(messages[start:start + self.batch_size], failures)
+
+        self.stats.seconds += time.monotonic() - started
+        return failures
+
+
+def send_messages(messages, **options):
+    """
+    Send messages through a short-lived BatchMailer.
+
+    Returns:
+        (failures, stats) as returned by BatchMailer.send() and its MailStats.
+    """
+    with BatchMailer(**options) as mailer:
+        failures = mailer.send(messages)
+    return failures, mailer.stats
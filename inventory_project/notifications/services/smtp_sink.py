@@ -0,0 +1,102 @@
+"""
+In-process SMTP sink for local testing and benchmarks.
+
+Speaks just enough SMTP for Django's smtp backend (no TLS, no auth),
+accepts every message and only counts it, so mail throughput can be
+measured without a real server:
+
+    with SMTPSink() as sink:
+        connection = get_connection(
+            "django.core.mail.backends.smtp.EmailBackend",
+            host=sink.host, port=sink.port, use_tls=False, username="", password="",
+        )
+        ...
+        sink.message_count
+"""
+import socketserver
+import threading
+
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+
+    def _reply(self, line):
+        self.wfile.write(line.encode("ascii") + b"\r\n")
+
+    def _read_data(self):
+        while True:
+            line = self.rfile.readline()
+            if not line or line in (b".\r\n", b".\n"):
+                return bool(line)
+
+    def handle(self):
+        sink = self.server.sink
+        sink._count("connections")
+        self._reply("220 sink ESMTP ready")
+
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode("ascii", "replace").strip().upper()
+            verb = command.split(" ", 1)[0]
+
+            if verb == "EHLO":
+                self.wfile.write(b"250-sink\r\n250-8BITMIME\r\n250 SMTPUTF8\r\n")
+            elif verb in ("HELO", "MAIL", "RSET", "NOOP"):
+                self._reply("250 OK")
+            elif verb == "RCPT":
+                sink._count("recipients")
+                self._reply("250 OK")
+            elif verb == "DATA":
+                self._reply("354 End data with <CR><LF>.<CR><LF>")
+                if not self._read_data():
+                    return
+                sink._count("messages")
+                self._reply("250 OK queued")
+            elif verb == "QUIT":
+                self._reply("221 Bye")
+                return
+            else:
+                self._reply("502 Command not implemented")
+
+
+class _Server(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class SMTPSink:
+    """
+    SMTP server on a background thread; port 0 picks a free port.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0):
+        self._lock = threading.Lock()
+        self.counts = {"connections": 0, "recipients": 0, "messages": 0}
+        self._server = _Server((host, port), _SMTPHandler)
+        self._server.sink = self
+        self.host, self.port = self._server.server_address[:2]
+        self._thread = None
+
+    def _count(self, key):
+        with self._lock:
+            self.counts[key] += 1
+
+    @property
+    def message_count(self):
+        return self.counts["messages"]
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
@@ -3,9 +3,53 @@ from django.utils import timezone
 from core.constants import RequestStatus
 
 
+class PurchaseOrder(models.Model):
+    """
+    A checkout of several products from one warehouse: the PurchaseRequest
+    rows pointing at it are its lines, placed and decided as a unit.
+    """
+    STATUS_PENDING = RequestStatus.PENDING
+    STATUS_APPROVED = RequestStatus.APPROVED
+    STATUS_REJECTED = RequestStatus.REJECTED
+
+    STATUS_CHOICES = RequestStatus.CHOICES
+
+    viewer = models.ForeignKey(
+        "accounts.User",
+        on_delete=models.CASCADE,
+        related_name="purchase_orders"
+    )
+    warehouse = models.ForeignKey(
+        "warehouses.Warehouse",
+        on_delete=models.CASCADE,
+        related_name="purchase_orders"
+    )
+    status = models.CharField(
+        max_length=20,
+        choices=STATUS_CHOICES,
+        default=STATUS_PENDING
+    )
+    created_at = models.DateTimeField(default=timezone.now)
+    processed_by = models.ForeignKey(
+        "accounts.User",
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        related_name="processed_purchase_orders"
+    )
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = "purchases_purchase_order"
+
+    def __str__(self):
+        return f"PO#{self.id} {self.warehouse} ({self.status})"
+
+
 class PurchaseRequest(models.Model):
     """
-    Purchase request workflow model.
+    Purchase request workflow model. A request that belongs to a
+    PurchaseOrder is one of its lines and is decided with it.
     """
     # Use centralized constants
     STATUS_PENDING = RequestStatus.PENDING
@@ -54,8 +98,41 @@ class PurchaseRequest(models.Model):
         related_name="assigned_purchases"
     )
 
+    order = models.ForeignKey(
+        PurchaseOrder,
+        null=True,
+        blank=True,
+        on_delete=models.CASCADE,
+        related_name="lines"
+    )
+
+    # Bumped by every write; see core.concurrency
+    version = models.PositiveIntegerField(default=0)
+
+    # Work-queue lease: reserved for claimed_by until claim_expires_at
+    claimed_by = models.ForeignKey(
+        "accounts.User",
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        related_name="claimed_purchase_requests"
+    )
+    claim_expires_at = models.DateTimeField(null=True, blank=True)
+
     class Meta:
         db_table = 'warehouses_purchaserequest'  # Preserve existing table name
+        indexes = [
+            # Work queue: a warehouse's pending requests, oldest first
+            models.Index(fields=["warehouse", "status", "created_at"], name="purchase_queue_idx"),
+        ]
+
+    def is_claimed_by_other(self, user, now):
+        return (
+            self.claimed_by_id is not None
+            and self.claimed_by_id != user.id
+            and self.claim_expires_at is not None
+            and self.claim_expires_at > now
+        )
 
     def __str__(self):
         return f"PR#{self.id} {self.product.name} x{self.quantity} ({self.status})"
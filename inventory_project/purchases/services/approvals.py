@@ -0,0 +1,180 @@
+"""
+Deciding many purchase requests in one transaction.
+"""
+from django.db import transaction
+from django.utils import timezone
+
+from core.constants import MovementKind, UserRole
+from core.events import PurchaseDecided, publish
+from dashboard.services.summary import mark_warehouses_dirty
+from inventory.services.ledger import build_movement, record_movements
+from inventory.services.stock import bulk_update_quantities, lock_stock_rows
+from purchases.models import PurchaseApproval, PurchaseRequest
+from roles.models import Staff
+from warehouses.models import Warehouse
+
+APPROVED = "APPROVED"
+REJECTED = "REJECTED"
+
+ERROR_NOT_FOUND = "Purchase request not found"
+ERROR_PROCESSED = "Purchase request already processed"
+ERROR_FORBIDDEN = "You do not have permission to approve this request"
+ERROR_NO_STOCK = "Stock record not found for this product/warehouse"
+ERROR_INSUFFICIENT = "Insufficient stock"
+ERROR_IN_ORDER = "Part of a purchase order; decide the order instead"
+ERROR_CLAIMED = "Claimed by another user"
+
+
+def approvable_warehouse_ids(user):
+    """
+    Warehouses whose purchase requests user may decide: None for admins
+    (all), the managed warehouses for managers, the assigned one for staff.
+    """
+    role = user.role.name
+    if role == UserRole.ADMIN:
+        return None
+    if role == UserRole.MANAGER:
+        return set(Warehouse.objects.filter(manager__user=user).values_list("id", flat=True))
+    if role == UserRole.STAFF and user.is_active:
+        return set(
+            Staff.objects
+            .filter(user=user, warehouse__isnull=False)
+            .values_list("warehouse_id", flat=True)
+        )
+    return set()
+
+
+def _allocate(requests, stocks, errors):
+    """
+    Approve requests against the locked stock, oldest request first per
+    stock row, recording an error for those that cannot be covered.
+    """
+    for pr in requests:
+        if pr.id in errors:
+            continue
+        stock = stocks.get((pr.warehouse_id, pr.product_id))
+        if stock is None:
+            errors[pr.id] = ERROR_NO_STOCK
+        elif stock.quantity < pr.quantity:
+            errors[pr.id] = ERROR_INSUFFICIENT
+        else:
+            stock.quantity -= pr.quantity
+
+
+@transaction.atomic
+def decide_purchase_requests(request_ids, decision, user, partial=False, within_order=False):
+    """
+    Approve or reject many purchase requests at once.
+
+    Requests are locked in id order, then (for approvals) their stock rows
+    in (warehouse, product) order; demand is allocated per stock row and
+    written with one bulk update, one ledger insert, one approval insert and
+    one batch of outbox events.
+
+    Args:
+        partial: decide whatever can be decided and report the rest. When
+                 False the batch is all-or-nothing: if any request cannot be
+                 decided, nothing is written.
+        within_order: the requests are the lines of a purchase order being
+                 decided (see decide_purchase_order); lines are refused
+                 otherwise.
+
+    Returns:
+        (ok, report): ok is False when an all-or-nothing batch was refused.
+        report["results"] has one {"purchase_request_id", "status"[, "error"]}
+        per requested id, in request order.
+    """
+    request_ids = list(dict.fromkeys(request_ids))
+    allowed = approvable_warehouse_ids(user)
+    now = timezone.now()
+
+    requests = list(
+        PurchaseRequest.objects
+        .select_for_update()
+        .filter(id__in=request_ids)
+        .order_by("id")
+    )
+    found = {pr.id: pr for pr in requests}
+
+    errors = {}
+    for request_id in request_ids:
+        pr = found.get(request_id)
+        if pr is None:
+            errors[request_id] = ERROR_NOT_FOUND
+        elif pr.status != PurchaseRequest.STATUS_PENDING:
+            errors[request_id] = ERROR_PROCESSED
+        elif pr.order_id is not None and not within_order:
+            errors[request_id] = ERROR_IN_ORDER
+        elif allowed is not None and pr.warehouse_id not in allowed:
+            errors[request_id] = ERROR_FORBIDDEN
+        elif pr.is_claimed_by_other(user, now):
+            errors[request_id] = ERROR_CLAIMED
+
+    stocks = {}
+    if decision == APPROVED:
+        stocks = lock_stock_rows({
+            (pr.warehouse_id, pr.product_id) for pr in requests if pr.id not in errors
+        })
+        _allocate(requests, stocks, errors)
+
+    ok = partial or not errors
+    decided = [pr for pr in requests if pr.id not in errors] if ok else []
+
+    if decided:
+        new_status = (
+            PurchaseRequest.STATUS_APPROVED if decision == APPROVED else PurchaseRequest.STATUS_REJECTED
+        )
+        for pr in decided:
+            pr.status = new_status
+            pr.processed_by = user
+            pr.processed_at = now
+            pr.version += 1
+
+        if decision == APPROVED:
+            bulk_update_quantities(stocks.values())
+            record_movements(
+                build_movement(
+                    warehouse_id=pr.warehouse_id,
+                    product_id=pr.product_id,
+                    quantity_change=-pr.quantity,
+                    kind=MovementKind.PURCHASE,
+                    actor=user,
+                    source=pr,
+                    created_at=now,
+                )
+                for pr in decided
+            )
+
+        PurchaseRequest.objects.bulk_update(decided, ["status", "processed_by", "processed_at", "version"])
+        # bulk_update sends no post_save: refresh the pending counts here
+        mark_warehouses_dirty(*{pr.warehouse_id for pr in decided})
+        PurchaseApproval.objects.bulk_create([
+            PurchaseApproval(purchase_request=pr, approver=user, decision=decision, created_at=now)
+            for pr in decided
+        ])
+        publish(*(
+            PurchaseDecided(
+                purchase_request_id=pr.id,
+                warehouse_id=pr.warehouse_id,
+                product_id=pr.product_id,
+                quantity=pr.quantity,
+                decision=decision,
+                actor_id=user.id,
+            )
+            for pr in decided
+        ))
+
+    results = []
+    for request_id in request_ids:
+        pr = found.get(request_id)
+        entry = {"purchase_request_id": request_id, "status": pr.status if pr else None}
+        if request_id in errors:
+            entry["error"] = errors[request_id]
+        results.append(entry)
+
+    return ok, {
+        "decision": decision,
+        "decided": len(decided),
+        "failed": len(errors),
+        "results": results,
+    }
@@ -0,0 +1,92 @@
+"""
+Multi-line purchase orders: one header per warehouse, one PurchaseRequest per line.
+"""
+from collections import defaultdict
+
+from django.db import transaction
+from django.utils import timezone
+
+from dashboard.services.summary import mark_warehouses_dirty
+from purchases.models import PurchaseOrder, PurchaseRequest
+from purchases.services.approvals import APPROVED, decide_purchase_requests
+
+ERROR_PROCESSED = "Purchase order already processed"
+
+
+@transaction.atomic
+def create_purchase_orders(user, lines):
+    """
+    Check out a cart: one order per warehouse, all lines in one bulk INSERT.
+    Lines for the same (warehouse, product) are merged.
+
+    Args:
+        lines: [{"product": Product, "warehouse": Warehouse, "quantity": int}, ...]
+
+    Returns:
+        The created orders, by warehouse id.
+    """
+    quantities = defaultdict(int)
+    warehouses = {}
+    products = {}
+    for line in lines:
+        key = (line["warehouse"].id, line["product"].id)
+        quantities[key] += line["quantity"]
+        warehouses[key[0]] = line["warehouse"]
+        products[key[1]] = line["product"]
+
+    now = timezone.now()
+    orders = {
+        warehouse_id: PurchaseOrder(viewer=user, warehouse=warehouse, created_at=now)
+        for warehouse_id, warehouse in sorted(warehouses.items())
+    }
+    PurchaseOrder.objects.bulk_create(orders.values())
+
+    PurchaseRequest.objects.bulk_create([
+        PurchaseRequest(
+            order=orders[warehouse_id],
+            viewer=user,
+            warehouse=warehouses[warehouse_id],
+            product=products[product_id],
+            quantity=quantity,
+            created_at=now,
+        )
+        for (warehouse_id, product_id), quantity in sorted(quantities.items())
+    ])
+    # bulk_create sends no post_save: refresh the pending counts here
+    mark_warehouses_dirty(*orders)
+    return list(orders.values())
+
+
+@transaction.atomic
+def decide_purchase_order(order_id, decision, user):
+    """
+    Approve or reject every line of an order in one transaction, locking
+    its stock rows in one ordered pass; an approval takes all lines or none
+    (see decide_purchase_requests).
+
+    Returns:
+        (ok, report) as decide_purchase_requests, plus the order id and status.
+
+    Raises:
+        PurchaseOrder.DoesNotExist
+    """
+    order = PurchaseOrder.objects.select_for_update().get(id=order_id)
+    if order.status != PurchaseOrder.STATUS_PENDING:
+        return False, {
+            "purchase_order_id": order.id,
+            "status": order.status,
+            "error": ERROR_PROCESSED,
+        }
+
+    line_ids = list(order.lines.order_by("id").values_list("id", flat=True))
+    ok, report = decide_purchase_requests(line_ids, decision, user, within_order=True)
+
+    if ok:
+        order.status = PurchaseOrder.STATUS_APPROVED if decision == APPROVED else PurchaseOrder.STATUS_REJECTED
+        order.processed_by = user
+        order.processed_at = timezone.now()
+        order.save(update_fields=["status", "processed_by", "processed_at"])
+
+    report["purchase_order_id"] = order.id
+    report["status"] = order.status
+    return ok, report
@@ -0,0 +1,84 @@
+"""
+Purchase request work queue.
+
+Staff claim the next pending requests of their warehouse instead of picking
+rows from the list. A claim skips rows another transaction is claiming
+(SKIP LOCKED) and reserves the rest for the claimer until a lease expires,
+so concurrent staff get disjoint requests and approvals stop colliding.
+Expired leases are simply claimable again.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from purchases.models import PurchaseRequest
+
+
+def claimable_q(user, now):
+    """
+    Pending requests that are unclaimed, whose lease ran out, or that user
+    already holds (claiming again renews the lease).
+    """
+    return Q(status=PurchaseRequest.STATUS_PENDING) & (
+        Q(claim_expires_at__isnull=True)
+        | Q(claim_expires_at__lte=now)
+        | Q(claimed_by=user)
+    )
+
+
+@transaction.atomic
+def claim_purchase_requests(user, warehouse_id, limit, lease_seconds=None):
+    """
+    Claim up to limit requests of warehouse_id, oldest first.
+
+    Order lines are left out: a purchase order is decided as a whole.
+
+    Returns:
+        (claimed requests in FIFO order, lease expiry)
+    """
+    if lease_seconds is None:
+        lease_seconds = settings.PURCHASE_CLAIM_LEASE_SECONDS
+    now = timezone.now()
+    expires_at = now + timedelta(seconds=lease_seconds)
+
+    # Served by the (warehouse, status, created_at) index
+    ids = list(
+        PurchaseRequest.objects
+        .select_for_update(skip_locked=True)
+        .filter(claimable_q(user, now), warehouse_id=warehouse_id, order__isnull=True)
+        .order_by("created_at", "id")
+        .values_list("id", flat=True)[:limit]
+    )
+    if not ids:
+        return [], expires_at
+
+    PurchaseRequest.objects.filter(id__in=ids).update(
+        claimed_by=user,
+        claim_expires_at=expires_at,
+        version=F("version") + 1,
+    )
+
+    claimed = (
+        PurchaseRequest.objects
+        .filter(id__in=ids)
+        .select_related("product", "warehouse", "viewer")
+        .order_by("created_at", "id")
+    )
+    return list(claimed), expires_at
+
+
+def release_purchase_requests(user, request_ids):
+    """
+    Give back requests user claimed but will not decide.
+
+    Returns:
+        Number of requests released.
+    """
+    return (
+        PurchaseRequest.objects
+        .filter(id__in=request_ids, claimed_by=user, status=PurchaseRequest.STATUS_PENDING)
+        .update(claimed_by=None, claim_expires_at=None, version=F("version") + 1)
+    )
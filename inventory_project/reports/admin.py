@@ -1,3 +1,8 @@
 from django.contrib import admin
+from reports.models import RollupCheckpoint
 
-# Register your models here.
+
+@admin.register(RollupCheckpoint)
+class RollupCheckpointAdmin(admin.ModelAdmin):
+    list_display = ['name', 'last_movement_id', 'updated_at']
+    readonly_fields = ['name', 'last_movement_id', 'pending_gaps', 'updated_at']
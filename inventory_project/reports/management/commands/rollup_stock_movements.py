@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from reports.services.rollups import rebuild_rollups, run_rollup
+
+
+class Command(BaseCommand):
+    help = "Fold new StockMovement ledger rows into the hourly and daily rollups"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument(
+            "--gap-seconds",
+            type=int,
+            default=300,
+            help="How long a missing ledger id is waited for before it is skipped",
+        )
+        parser.add_argument(
+            "--rebuild",
+            action="store_true",
+            help="Drop the rollups and refold the whole ledger",
+        )
+
+    def handle(self, *args, **options):
+        if options["rebuild"]:
+            rebuild_rollups()
+
+        folded = run_rollup(
+            batch_size=options["batch_size"],
+            gap_seconds=options["gap_seconds"],
+        )
+        self.stdout.write(self.style.SUCCESS(f"Folded {folded} stock movements"))
@@ -1,3 +1,84 @@
 from django.db import models
+from django.utils import timezone
+from core.constants import MovementKind
 
-# Reports models will go here
+
+class MovementRollup(models.Model):
+    """
+    Stock movement totals per (bucket, warehouse, product, kind).
+    Filled incrementally from the StockMovement ledger by rollup_stock_movements.
+    """
+    KIND_CHOICES = MovementKind.CHOICES
+
+    warehouse = models.ForeignKey(
+        "warehouses.Warehouse",  # String reference
+        on_delete=models.CASCADE,
+        related_name="+"
+    )
+    product = models.ForeignKey(
+        "inventory.Product",  # String reference
+        on_delete=models.CASCADE,
+        related_name="+"
+    )
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    quantity_in = models.BigIntegerField(default=0)
+    quantity_out = models.BigIntegerField(default=0)
+    movement_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        abstract = True
+
+    @property
+    def net_change(self):
+        return self.quantity_in - self.quantity_out
+
+
+class HourlyMovementRollup(MovementRollup):
+    bucket = models.DateTimeField()  # Start of the hour
+
+    class Meta:
+        db_table = 'reports_movement_rollup_hourly'
+        constraints = [
+            models.UniqueConstraint(
+                fields=["bucket", "warehouse", "product", "kind"],
+                name="uniq_hourly_rollup_key",
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["bucket"]),
+            models.Index(fields=["warehouse", "bucket"]),
+        ]
+
+
+class DailyMovementRollup(MovementRollup):
+    bucket = models.DateField()
+
+    class Meta:
+        db_table = 'reports_movement_rollup_daily'
+        constraints = [
+            models.UniqueConstraint(
+                fields=["bucket", "warehouse", "product", "kind"],
+                name="uniq_daily_rollup_key",
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["bucket"]),
+            models.Index(fields=["warehouse", "bucket"]),
+        ]
+
+
+class RollupCheckpoint(models.Model):
+    """
+    Position of the rollup job: the last StockMovement id folded in, and
+    the ids below it still waited for (pending_gaps).
+    """
+    name = models.CharField(max_length=64, unique=True)
+    last_movement_id = models.BigIntegerField(default=0)
+    pending_gaps = models.JSONField(default=dict, blank=True)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = 'reports_rollup_checkpoint'
+
+    def __str__(self):
+        return f"{self.name} @ {self.last_movement_id}"
@@ -0,0 +1,245 @@
+from datetime import date, datetime, timedelta
+
+from django.db import transaction
+from django.db.models import Case, Count, F, Q, Sum, Value, When
+from django.db.models.functions import TruncDate, TruncHour, TruncMonth, TruncWeek
+from django.utils import timezone
+
+from core.sequences import scan
+from inventory.models import StockMovement
+from reports.models import DailyMovementRollup, HourlyMovementRollup, RollupCheckpoint
+
+CHECKPOINT_NAME = "stock_movements"
+
+GRANULARITIES = ("hour", "day", "week", "month")
+
+# Upper bound on buckets one trends request may ask for
+MAX_BUCKETS = 2000
+
+ROLLUP_KEY = ("bucket", "warehouse_id", "product_id", "kind")
+
+
+# ---------------------------------------------------------
+# Incremental fold
+# ---------------------------------------------------------
+def _fold(model, trunc, movements):
+    """
+    Add one batch of ledger rows into the rollup table `model`.
+    """
+    rows = (
+        movements
+        .annotate(bucket=trunc)
+        .values(*ROLLUP_KEY)
+        .annotate(
+            add_in=Sum(Case(
+                When(quantity_change__gt=0, then=F("quantity_change")),
+                default=Value(0),
+            )),
+            add_out=Sum(Case(
+                When(quantity_change__lt=0, then=-F("quantity_change")),
+                default=Value(0),
+            )),
+            add_count=Count("id"),
+        )
+        .order_by()
+    )
+    deltas = {tuple(row[k] for k in ROLLUP_KEY): row for row in rows}
+    if not deltas:
+        return
+
+    existing = model.objects.filter(
+        bucket__in={key[0] for key in deltas},
+        warehouse_id__in={key[1] for key in deltas},
+        product_id__in={key[2] for key in deltas},
+    )
+    existing = {
+        (r.bucket, r.warehouse_id, r.product_id, r.kind): r
+        for r in existing
+    }
+
+    to_create, to_update = [], []
+    for key, row in deltas.items():
+        rollup = existing.get(key)
+        if rollup is None:
+            rollup = model(bucket=key[0], warehouse_id=key[1], product_id=key[2], kind=key[3])
+            to_create.append(rollup)
+        else:
+            to_update.append(rollup)
+        rollup.quantity_in += row["add_in"] or 0
+        rollup.quantity_out += row["add_out"] or 0
+        rollup.movement_count += row["add_count"]
+
+    if to_update:
+        model.objects.bulk_update(to_update, ["quantity_in", "quantity_out", "movement_count"])
+    if to_create:
+        model.objects.bulk_create(to_create)
+
+
+def run_rollup(batch_size=5000, gap_seconds=300):
+    """
+    Fold ledger rows past the checkpoint into the hourly and daily rollups.
+
+    Each batch commits together with the advanced checkpoint, so the job
+    can be stopped and re-run at any point. Ids skipped because their
+    transaction had not committed yet are kept on the checkpoint and folded
+    when they show up, for up to gap_seconds (see core.sequences).
+
+    Returns:
+        Number of ledger rows folded.
+    """
+    RollupCheckpoint.objects.get_or_create(name=CHECKPOINT_NAME)
+
+    folded = 0
+    more = True
+    while more:
+        with transaction.atomic():
+            # Locking the checkpoint keeps concurrent runs from double counting
+            checkpoint = RollupCheckpoint.objects.select_for_update().get(name=CHECKPOINT_NAME)
+
+            filled, position, gaps, more = scan(
+                StockMovement.objects.all(),
+                checkpoint.last_movement_id,
+                checkpoint.pending_gaps,
+                batch_size,
+                gap_seconds,
+            )
+            if not filled and position == checkpoint.last_movement_id:
+                if gaps != checkpoint.pending_gaps:
+                    checkpoint.pending_gaps = gaps
+                    checkpoint.save(update_fields=["pending_gaps"])
+                break
+
+            movements = StockMovement.objects.filter(
+                Q(id__in=filled) | Q(id__gt=checkpoint.last_movement_id, id__lte=position)
+            )
+            _fold(HourlyMovementRollup, TruncHour("created_at"), movements)
+            _fold(DailyMovementRollup, TruncDate("created_at"), movements)
+            folded += movements.count()
+
+            checkpoint.last_movement_id = position
+            checkpoint.pending_gaps = gaps
+            checkpoint.updated_at = timezone.now()
+            checkpoint.save(update_fields=["last_movement_id", "pending_gaps", "updated_at"])
+    return folded
+
+
+def rebuild_rollups():
+    """
+    Drop all rollups and reset the checkpoint; the next run_rollup refolds the ledger.
+    """
+    with transaction.atomic():
+        HourlyMovementRollup.objects.all().delete()
+        DailyMovementRollup.objects.all().delete()
+        RollupCheckpoint.objects.filter(name=CHECKPOINT_NAME).delete()
+
+
+# ---------------------------------------------------------
+# Reads
+# ---------------------------------------------------------
+def _bucket_starts(start, end, granularity):
+    """
+    Every bucket start between the dates start and end (inclusive).
+    """
+    if granularity == "hour":
+        current = timezone.make_aware(datetime.combine(start, datetime.min.time()))
+        stop = timezone.make_aware(datetime.combine(end + timedelta(days=1), datetime.min.time()))
+        step = timedelta(hours=1)
+    elif granularity == "day":
+        current, stop, step = start, end + timedelta(days=1), timedelta(days=1)
+    elif granularity == "week":
+        current = start - timedelta(days=start.weekday())
+        stop, step = end + timedelta(days=1), timedelta(days=7)
+    else:
+        current = start.replace(day=1)
+        buckets = []
+        while current <= end:
+            buckets.append(current)
+            current = date(current.year + current.month // 12, current.month % 12 + 1, 1)
+        return buckets
+
+    buckets = []
+    while current < stop:
+        buckets.append(current)
+        current += step
+    return buckets
+
+
+def bucket_count(start, end, granularity):
+    days = (end - start).days + 1
+    return {
+        "hour": days * 24,
+        "day": days,
+        "week": days // 7 + 2,
+        "month": (end.year - start.year) * 12 + end.month - start.month + 1,
+    }[granularity]
+
+
+def movement_trends(start, end, granularity="day", warehouse_ids=None, product_id=None, kinds=None):
+    """
+    Incoming, outgoing and net quantities per bucket, read from the rollups only.
+
+    Args:
+        start, end: Dates (inclusive).
+        granularity: One of GRANULARITIES; week and month re-bucket the daily rollup.
+        warehouse_ids: Optional iterable limiting the warehouses included.
+
+    Returns:
+        List of {"bucket", "incoming", "outgoing", "net_change"} in bucket order,
+        with zeros for empty buckets.
+    """
+    if granularity == "hour":
+        qs = HourlyMovementRollup.objects.filter(
+            bucket__gte=timezone.make_aware(datetime.combine(start, datetime.min.time())),
+            bucket__lt=timezone.make_aware(datetime.combine(end + timedelta(days=1), datetime.min.time())),
+        )
+        bucket = F("bucket")
+    else:
+        qs = DailyMovementRollup.objects.filter(bucket__gte=start, bucket__lte=end)
+        bucket = {
+            "day": F("bucket"),
+            "week": TruncWeek("bucket"),
+            "month": TruncMonth("bucket"),
+        }[granularity]
+
+    if warehouse_ids is not None:
+        qs = qs.filter(warehouse_id__in=list(warehouse_ids))
+    if product_id:
+        qs = qs.filter(product_id=product_id)
+    if kinds:
+        qs = qs.filter(kind__in=kinds)
+
+    rows = (
+        qs.annotate(period=bucket)
+        .values("period")
+        .annotate(incoming=Sum("quantity_in"), outgoing=Sum("quantity_out"))
+        .order_by()
+    )
+    totals = {}
+    for row in rows:
+        period = row["period"]
+        if isinstance(period, datetime) and granularity != "hour":
+            period = period.date()
+        totals[period] = (row["incoming"] or 0, row["outgoing"] or 0)
+
+    result = []
+    for period in _bucket_starts(start, end, granularity):
+        incoming, outgoing = totals.get(period, (0, 0))
+        result.append({
+            "bucket": period.isoformat(),
+            "incoming": incoming,
+            "outgoing": outgoing,
+            "net_change": incoming - outgoing,
+        })
+    return result
+
+
+def movement_totals(since, kinds, warehouse_id=None, side="in"):
+    """
+    Sum of quantity_in (side="in") or quantity_out (side="out") for the given
+    kinds since a date, read from the daily rollup.
+    """
+    qs = DailyMovementRollup.objects.filter(bucket__gte=since, kind__in=kinds)
+    if warehouse_id:
+        qs = qs.filter(warehouse_id=warehouse_id)
+    field = "quantity_in" if side == "in" else "quantity_out"
+    return qs.aggregate(total=Sum(field))["total"] or 0
@@ -0,0 +1,12 @@
+from core.events import STOCK_EVENTS, subscriber
+from reports.services.rollups import run_rollup
+
+
+@subscriber("movement_rollups", *STOCK_EVENTS)
+def fold_new_movements(records):
+    """
+    Stock moved: fold the new ledger rows into the rollups. The movements
+    committed with the events, so they are folded now; run_rollup keeps its
+    own checkpoint, so the scheduled rollup job can still run alongside.
+    """
+    run_rollup()
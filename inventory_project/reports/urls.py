@@ -0,0 +1,7 @@
+from django.urls import path
+
+from reports.views import StockTrendsAPIView
+
+urlpatterns = [
+    path("reports/stock-trends/", StockTrendsAPIView.as_view(), name="report-stock-trends"),
+]
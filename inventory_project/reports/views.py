@@ -1,3 +1,82 @@
-from django.shortcuts import render
+from django.utils.dateparse import parse_date
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
 
-# Reports views will go here
+from core.constants import MovementKind
+from reports.services.rollups import GRANULARITIES, MAX_BUCKETS, bucket_count, movement_trends
+from roles.models import Role
+from warehouses.models import Warehouse
+
+
+class StockTrendsAPIView(APIView):
+    """
+    GET /api/reports/stock-trends/?granularity=day&start_date=YYYY-MM-DD&end_date=YYYY-MM-DD
+
+    Optional: warehouse_id, product_id, kind (repeatable MovementKind).
+    Permissions: ADMIN (any warehouse) or MANAGER (own warehouses only).
+
+    Reads the movement rollups only, so cost follows the number of buckets.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        user = request.user
+        if user.role.name not in [Role.ADMIN, Role.MANAGER]:
+            return Response({"error": "Forbidden"}, status=403)
+
+        granularity = request.query_params.get("granularity", "day")
+        if granularity not in GRANULARITIES:
+            return Response(
+                {"error": f"granularity must be one of {', '.join(GRANULARITIES)}"},
+                status=400,
+            )
+
+        start = parse_date(request.query_params.get("start_date") or "")
+        end = parse_date(request.query_params.get("end_date") or "")
+        if not start or not end:
+            return Response({"error": "start_date and end_date are required (YYYY-MM-DD)"}, status=400)
+        if start > end:
+            return Response({"error": "start_date must be before end_date"}, status=400)
+        if bucket_count(start, end, granularity) > MAX_BUCKETS:
+            return Response({"error": f"Range too large for {granularity} granularity"}, status=400)
+
+        kinds = request.query_params.getlist("kind")
+        if any(kind not in dict(MovementKind.CHOICES) for kind in kinds):
+            return Response({"error": "Invalid kind"}, status=400)
+
+        warehouse_id = request.query_params.get("warehouse_id")
+        product_id = request.query_params.get("product_id")
+        if (warehouse_id and not warehouse_id.isdigit()) or (product_id and not product_id.isdigit()):
+            return Response({"error": "warehouse_id and product_id must be integers"}, status=400)
+
+        # Warehouse scope
+        if user.role.name == Role.ADMIN:
+            warehouse_ids = [int(warehouse_id)] if warehouse_id else None
+        else:
+            managed = set(
+                Warehouse.objects.filter(manager__user=user).values_list("id", flat=True)
+            )
+            if warehouse_id:
+                if int(warehouse_id) not in managed:
+                    return Response({"error": "Not your warehouse"}, status=403)
+                warehouse_ids = [int(warehouse_id)]
+            else:
+                warehouse_ids = managed
+
+        buckets = movement_trends(
+            start,
+            end,
+            granularity=granularity,
+            warehouse_ids=warehouse_ids,
+            product_id=product_id,
+            kinds=kinds,
+        )
+
+        return Response({
+            "granularity": granularity,
+            "labels": [b["bucket"] for b in buckets],
+            "incoming": [b["incoming"] for b in buckets],
+            "outgoing": [b["outgoing"] for b in buckets],
+            "net_changes": [b["net_change"] for b in buckets],
+        })
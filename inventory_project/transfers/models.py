@@ -3,9 +3,60 @@ from django.utils import timezone
 from core.constants import RequestStatus
 
 
+class TransferDocument(models.Model):
+    """
+    One transfer between two warehouses with many product lines (the
+    TransferRequest rows pointing at it), requested and decided as a unit.
+    """
+    STATUS_PENDING = RequestStatus.PENDING
+    STATUS_APPROVED = RequestStatus.APPROVED
+    STATUS_REJECTED = RequestStatus.REJECTED
+
+    STATUS_CHOICES = RequestStatus.CHOICES
+
+    source_warehouse = models.ForeignKey(
+        "warehouses.Warehouse",
+        on_delete=models.CASCADE,
+        related_name="transfer_document_sources"
+    )
+    destination_warehouse = models.ForeignKey(
+        "warehouses.Warehouse",
+        on_delete=models.CASCADE,
+        related_name="transfer_document_destinations"
+    )
+    status = models.CharField(
+        max_length=20,
+        choices=STATUS_CHOICES,
+        default=STATUS_PENDING
+    )
+    created_at = models.DateTimeField(default=timezone.now)
+    requested_by = models.ForeignKey(
+        "accounts.User",
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        related_name="transfer_documents"
+    )
+    approved_by = models.ForeignKey(
+        "accounts.User",
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        related_name="approved_transfer_documents"
+    )
+    approved_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = "transfers_transfer_document"
+
+    def __str__(self):
+        return f"TD#{self.id} {self.source_warehouse} → {self.destination_warehouse} ({self.status})"
+
+
 class TransferRequest(models.Model):
     """
-    Transfer request workflow model.
+    Transfer request workflow model. A request that belongs to a
+    TransferDocument is one of its lines and is decided with it.
     """
     # Use centralized constants
     STATUS_PENDING = RequestStatus.PENDING
@@ -53,6 +104,17 @@ class TransferRequest(models.Model):
     )
     approved_at = models.DateTimeField(null=True, blank=True)
 
+    # Bumped by every write; see core.concurrency
+    version = models.PositiveIntegerField(default=0)
+
+    document = models.ForeignKey(
+        TransferDocument,
+        null=True,
+        blank=True,
+        on_delete=models.CASCADE,
+        related_name="lines"
+    )
+
     class Meta:
         db_table = 'warehouses_transferrequest'  # Preserve existing table name
 
@@ -0,0 +1,202 @@
+"""
+Deciding many transfer requests in one transaction.
+"""
+from collections import defaultdict
+
+from django.db import transaction
+from django.utils import timezone
+
+from core.constants import MovementKind, UserRole
+from core.events import TransferDecided, publish
+from dashboard.services.summary import mark_warehouses_dirty
+from inventory.services.ledger import build_movement, record_movements
+from inventory.services.stock import apply_stock_deltas, lock_stock_rows
+from transfers.models import TransferApproval, TransferRequest
+from warehouses.models import Warehouse
+
+APPROVED = "APPROVED"
+REJECTED = "REJECTED"
+
+ERROR_NOT_FOUND = "Transfer request not found"
+ERROR_PROCESSED = "Transfer request already processed"
+ERROR_FORBIDDEN = "Only the Admin or Source Warehouse Manager can approve this request"
+ERROR_INSUFFICIENT = "Insufficient stock"
+ERROR_IN_DOCUMENT = "Part of a transfer document; decide the document instead"
+
+
+def approvable_warehouse_ids(user):
+    """
+    Source warehouses whose transfer requests user may decide: None for
+    admins (all), the managed warehouses for managers, none otherwise.
+    """
+    role = user.role.name
+    if role == UserRole.ADMIN:
+        return None
+    if role == UserRole.MANAGER:
+        return set(Warehouse.objects.filter(manager__user=user).values_list("id", flat=True))
+    return set()
+
+
+def _allocate(requests, stocks, errors):
+    """
+    Approve requests in id order against running per-row balances, so
+    stock moved in by an earlier transfer of the batch can fund a later one.
+
+    Returns:
+        {(warehouse_id, product_id): net delta} of the approved requests.
+    """
+    balance = {key: stock.quantity for key, stock in stocks.items()}
+    deltas = defaultdict(int)
+    for tr in requests:
+        if tr.id in errors:
+            continue
+        source = (tr.source_warehouse_id, tr.product_id)
+        destination = (tr.destination_warehouse_id, tr.product_id)
+        if balance.get(source, 0) < tr.quantity:
+            errors[tr.id] = ERROR_INSUFFICIENT
+            continue
+        balance[source] -= tr.quantity
+        balance[destination] = balance.get(destination, 0) + tr.quantity
+        deltas[source] -= tr.quantity
+        deltas[destination] += tr.quantity
+    return deltas
+
+
+def _movements(tr, user, now):
+    return [
+        build_movement(
+            warehouse_id=tr.source_warehouse_id,
+            product_id=tr.product_id,
+            quantity_change=-tr.quantity,
+            kind=MovementKind.TRANSFER_OUT,
+            actor=user,
+            counterpart_warehouse_id=tr.destination_warehouse_id,
+            source=tr,
+            created_at=now,
+        ),
+        build_movement(
+            warehouse_id=tr.destination_warehouse_id,
+            product_id=tr.product_id,
+            quantity_change=tr.quantity,
+            kind=MovementKind.TRANSFER_IN,
+            actor=user,
+            counterpart_warehouse_id=tr.source_warehouse_id,
+            source=tr,
+            created_at=now,
+        ),
+    ]
+
+
+@transaction.atomic
+def decide_transfer_requests(request_ids, decision, user, partial=False, within_document=False):
+    """
+    Approve or reject many transfer requests at once.
+
+    Requests are locked in id order, then every source and destination stock
+    row they touch in one global (warehouse, product) order. The net change
+    per row is applied with one set-based UPDATE, and approvals, ledger
+    entries and outbox events are written in bulk.
+
+    Args:
+        partial: decide whatever can be decided and report the rest. When
+                 False the batch is all-or-nothing: if any request cannot be
+                 decided, nothing is written.
+        within_document: the requests are the lines of a transfer document
+                 being decided (see decide_transfer_document); lines are
+                 refused otherwise.
+
+    Returns:
+        (ok, report): ok is False when an all-or-nothing batch was refused.
+        report["results"] has one {"transfer_request_id", "status"[, "error"]}
+        per requested id, in request order.
+    """
+    request_ids = list(dict.fromkeys(request_ids))
+    allowed = approvable_warehouse_ids(user)
+
+    requests = list(
+        TransferRequest.objects
+        .select_for_update()
+        .filter(id__in=request_ids)
+        .order_by("id")
+    )
+    found = {tr.id: tr for tr in requests}
+
+    errors = {}
+    for request_id in request_ids:
+        tr = found.get(request_id)
+        if tr is None:
+            errors[request_id] = ERROR_NOT_FOUND
+        elif tr.status != TransferRequest.STATUS_PENDING:
+            errors[request_id] = ERROR_PROCESSED
+        elif tr.document_id is not None and not within_document:
+            errors[request_id] = ERROR_IN_DOCUMENT
+        elif allowed is not None and tr.source_warehouse_id not in allowed:
+            errors[request_id] = ERROR_FORBIDDEN
+
+    deltas = {}
+    if decision == APPROVED:
+        touched = set()
+        for tr in requests:
+            if tr.id not in errors:
+                touched.add((tr.source_warehouse_id, tr.product_id))
+                touched.add((tr.destination_warehouse_id, tr.product_id))
+        deltas = _allocate(requests, lock_stock_rows(touched), errors)
+
+    ok = partial or not errors
+    decided = [tr for tr in requests if tr.id not in errors] if ok else []
+
+    if decided:
+        now = timezone.now()
+        new_status = (
+            TransferRequest.STATUS_APPROVED if decision == APPROVED else TransferRequest.STATUS_REJECTED
+        )
+        for tr in decided:
+            tr.status = new_status
+            tr.approved_by = user
+            tr.approved_at = now
+            tr.version += 1
+
+        if decision == APPROVED:
+            apply_stock_deltas(deltas)
+            record_movements(
+                movement for tr in decided for movement in _movements(tr, user, now)
+            )
+
+        TransferRequest.objects.bulk_update(decided, ["status", "approved_by", "approved_at", "version"])
+        # bulk_update sends no post_save: refresh the pending counts here
+        mark_warehouses_dirty(*{
+            warehouse_id
+            for tr in decided
+            for warehouse_id in (tr.source_warehouse_id, tr.destination_warehouse_id)
+        })
+        TransferApproval.objects.bulk_create([
+            TransferApproval(transfer_request=tr, approver=user, decision=decision, created_at=now)
+            for tr in decided
+        ])
+        publish(*(
+            TransferDecided(
+                transfer_request_id=tr.id,
+                source_warehouse_id=tr.source_warehouse_id,
+                destination_warehouse_id=tr.destination_warehouse_id,
+                product_id=tr.product_id,
+                quantity=tr.quantity,
+                decision=decision,
+                actor_id=user.id,
+            )
+            for tr in decided
+        ))
+
+    results = []
+    for request_id in request_ids:
+        tr = found.get(request_id)
+        entry = {"transfer_request_id": request_id, "status": tr.status if tr else None}
+        if request_id in errors:
+            entry["error"] = errors[request_id]
+        results.append(entry)
+
+    return ok, {
+        "decision": decision,
+        "decided": len(decided),
+        "failed": len(errors),
+        "results": results,
+    }
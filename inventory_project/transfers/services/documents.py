@@ -0,0 +1,79 @@
+"""
+Multi-line transfer documents: one header, one TransferRequest per line.
+"""
+from django.db import transaction
+from django.utils import timezone
+
+from dashboard.services.summary import mark_warehouses_dirty
+from transfers.models import TransferDocument, TransferRequest
+from transfers.services.approvals import APPROVED, decide_transfer_requests
+
+ERROR_PROCESSED = "Transfer document already processed"
+
+
+@transaction.atomic
+def create_transfer_document(user, source_warehouse, destination_warehouse, lines):
+    """
+    Create a document and its lines (one bulk INSERT).
+
+    Args:
+        lines: [{"product": Product, "quantity": int}, ...]
+    """
+    document = TransferDocument.objects.create(
+        source_warehouse=source_warehouse,
+        destination_warehouse=destination_warehouse,
+        requested_by=user,
+    )
+    now = document.created_at
+    TransferRequest.objects.bulk_create([
+        TransferRequest(
+            document=document,
+            product=line["product"],
+            source_warehouse=source_warehouse,
+            destination_warehouse=destination_warehouse,
+            quantity=line["quantity"],
+            requested_by=user,
+            created_at=now,
+        )
+        for line in lines
+    ])
+    # bulk_create sends no post_save: refresh the pending counts here
+    mark_warehouses_dirty(source_warehouse.id, destination_warehouse.id)
+    return document
+
+
+@transaction.atomic
+def decide_transfer_document(document_id, decision, user):
+    """
+    Approve or reject every line of a document in one transaction; an
+    approval moves all lines or none (see decide_transfer_requests).
+
+    Returns:
+        (ok, report) as decide_transfer_requests, plus the document id and
+        status.
+
+    Raises:
+        TransferDocument.DoesNotExist
+    """
+    document = TransferDocument.objects.select_for_update().get(id=document_id)
+    if document.status != TransferDocument.STATUS_PENDING:
+        return False, {
+            "transfer_document_id": document.id,
+            "status": document.status,
+            "error": ERROR_PROCESSED,
+        }
+
+    line_ids = list(document.lines.order_by("id").values_list("id", flat=True))
+    ok, report = decide_transfer_requests(line_ids, decision, user, within_document=True)
+
+    if ok:
+        document.status = (
+            TransferDocument.STATUS_APPROVED if decision == APPROVED else TransferDocument.STATUS_REJECTED
+        )
+        document.approved_by = user
+        document.approved_at = timezone.now()
+        document.save(update_fields=["status", "approved_by", "approved_at"])
+
+    report["transfer_document_id"] = document.id
+    report["status"] = document.status
+    return ok, report
@@ -1,36 +1,31 @@
 from django.core.management.base import BaseCommand
+
+from notifications.services.alerts import recipient_scopes, scoped_items
+from notifications.services.mailer import send_messages
+from warehouses.services.email_alerts import build_low_stock_email
 from warehouses.services.low_stock import get_low_stock_items
-from warehouses.services.email_alerts import send_low_stock_email
-from warehouses.models import Warehouse
+
 
 class Command(BaseCommand):
     help = "Send daily low stock email alerts"
 
     def handle(self, *args, **kwargs):
-        alerts = get_low_stock_items()
-
-        for warehouse in Warehouse.objects.select_related("manager__user"):
-            warehouse_alerts = [
-                a for a in alerts if a["warehouse"] == warehouse
-            ]
-
-            if not warehouse_alerts:
-                continue
-
-            recipients = []
-
-            if warehouse.manager:
-                recipients.append(warehouse.manager.user.email)
-
-            # Admin emails
-            recipients += list(
-                warehouse.created_by.__class__.objects
-                .filter(role__name="ADMIN")
-                .values_list("email", flat=True)
-            )
-
-            recipients = list(set(recipients))
-
-            send_low_stock_email(recipients, warehouse_alerts)
-
-        self.stdout.write(self.style.SUCCESS("Low stock alerts sent"))
+        # Group the live low-stock list once, then give every recipient one
+        # message covering all the warehouses they may see
+        alerts = {}
+        for alert in get_low_stock_items():
+            alerts.setdefault(alert["warehouse"].id, []).append(alert)
+
+        messages = []
+        for email, warehouse_ids in recipient_scopes().values():
+            message = build_low_stock_email([email], scoped_items(alerts, warehouse_ids))
+            if message is not None:
+                messages.append(message)
+
+        failures, stats = send_messages(messages)
+        for message, exc in failures:
+            self.stderr.write(f"Failed to send to {', '.join(message.to)}: {exc}")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Low stock alerts sent to {stats.sent} recipient(s), {stats.failed} failed"
+        ))
@@ -7,8 +7,9 @@ from accounts.models import UserProfile
 from roles.models import Role, Viewer, Staff, Manager, ManagerPromotionRequest
 from warehouses.models import Warehouse, StaffTransferRequest
 from inventory.models import Product, Stock
-from purchases.models import PurchaseRequest, PurchaseApproval
-from transfers.models import TransferRequest, TransferApproval
+from purchases.models import PurchaseOrder, PurchaseRequest, PurchaseApproval
+from transfers.models import TransferDocument, TransferRequest, TransferApproval
+from warehouses.services.low_stock import threshold_status
 
 User = get_user_model()
 
@@ -99,16 +100,24 @@ class ProductReadSerializer(serializers.ModelSerializer):
 class StockReadSerializer(serializers.ModelSerializer):
     product = ProductReadSerializer(read_only=True)
     warehouse = serializers.StringRelatedField()
+    # Includes buffered receipts when the queryset went through with_pending_receipts()
+    quantity = serializers.SerializerMethodField()
 
     class Meta:
         model = Stock
-        fields = "__all__"
+        # version and stripe_count are internal bookkeeping
+        fields = ["id", "product", "warehouse", "quantity", "created_at", "updated_at"]
+
+    def get_quantity(self, obj):
+        return obj.quantity + getattr(obj, "pending_quantity", 0)
 
 
 class StockAssignSerializer(serializers.Serializer):
     product_id = serializers.IntegerField()
     warehouse_id = serializers.IntegerField()
     quantity = serializers.IntegerField(min_value=1)
+    # Journal the units for the receipt flusher instead of writing the stock row
+    buffered = serializers.BooleanField(default=False)
 
 
 # =====================================================
@@ -127,9 +136,67 @@ class PurchaseRequestCreateSerializer(serializers.ModelSerializer):
         )
 
 
+class PurchaseOrderLineSerializer(serializers.Serializer):
+    product = serializers.IntegerField()
+    warehouse = serializers.IntegerField()
+    quantity = serializers.IntegerField(min_value=1)
+
+
+class PurchaseOrderCreateSerializer(serializers.Serializer):
+    lines = PurchaseOrderLineSerializer(many=True, allow_empty=False, max_length=500)
+
+    def validate_lines(self, lines):
+        # One query each for every line's product and warehouse
+        products = Product.objects.in_bulk({line["product"] for line in lines})
+        warehouses = Warehouse.objects.filter(is_deleted=False).in_bulk({line["warehouse"] for line in lines})
+
+        missing_products = sorted({line["product"] for line in lines} - products.keys())
+        if missing_products:
+            raise serializers.ValidationError(f"Products not found: {missing_products}")
+        missing_warehouses = sorted({line["warehouse"] for line in lines} - warehouses.keys())
+        if missing_warehouses:
+            raise serializers.ValidationError(f"Warehouses not found: {missing_warehouses}")
+
+        return [
+            {
+                "product": products[line["product"]],
+                "warehouse": warehouses[line["warehouse"]],
+                "quantity": line["quantity"],
+            }
+            for line in lines
+        ]
+
+
 class PurchaseApprovalSerializer(serializers.Serializer):
-    purchase_request_id = serializers.IntegerField()
+    purchase_request_id = serializers.IntegerField(required=False)
+    purchase_order_id = serializers.IntegerField(required=False)
+    decision = serializers.ChoiceField(choices=["APPROVED", "REJECTED"])
+
+    def validate(self, data):
+        if ("purchase_request_id" in data) == ("purchase_order_id" in data):
+            raise serializers.ValidationError(
+                "Exactly one of purchase_request_id or purchase_order_id is required"
+            )
+        return data
+
+
+class PurchaseClaimSerializer(serializers.Serializer):
+    warehouse_id = serializers.IntegerField(required=False)
+    limit = serializers.IntegerField(min_value=1, max_value=100, default=10)
+
+
+class PurchaseReleaseSerializer(serializers.Serializer):
+    purchase_request_ids = serializers.ListField(
+        child=serializers.IntegerField(), allow_empty=False, max_length=100
+    )
+
+
+class PurchaseBatchApprovalSerializer(serializers.Serializer):
+    purchase_request_ids = serializers.ListField(
+        child=serializers.IntegerField(), allow_empty=False, max_length=1000
+    )
     decision = serializers.ChoiceField(choices=["APPROVED", "REJECTED"])
+    partial = serializers.BooleanField(default=False)
 
 
 class PurchaseRequestReadSerializer(serializers.ModelSerializer):
@@ -142,6 +209,35 @@ class PurchaseRequestReadSerializer(serializers.ModelSerializer):
         fields = "__all__"
 
 
+class PurchaseOrderLineReadSerializer(serializers.ModelSerializer):
+    product = serializers.StringRelatedField()
+
+    class Meta:
+        model = PurchaseRequest
+        fields = ["id", "product", "product_id", "quantity", "status"]
+
+
+class PurchaseOrderReadSerializer(serializers.ModelSerializer):
+    warehouse = serializers.StringRelatedField()
+    viewer_username = serializers.CharField(source="viewer.username", read_only=True)
+    processed_by_username = serializers.CharField(source="processed_by.username", read_only=True, allow_null=True)
+    lines = PurchaseOrderLineReadSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = PurchaseOrder
+        fields = [
+            "id",
+            "warehouse",
+            "warehouse_id",
+            "status",
+            "viewer_username",
+            "created_at",
+            "processed_by_username",
+            "processed_at",
+            "lines",
+        ]
+
+
 # =====================================================
 # TRANSFER REQUESTS
 # =====================================================
@@ -156,10 +252,57 @@ class TransferRequestCreateSerializer(serializers.ModelSerializer):
         ]
 
 
+class TransferDocumentLineSerializer(serializers.Serializer):
+    product_id = serializers.IntegerField()
+    quantity = serializers.IntegerField(min_value=1)
+
+
+class TransferDocumentCreateSerializer(serializers.Serializer):
+    source_warehouse = serializers.PrimaryKeyRelatedField(queryset=Warehouse.objects.filter(is_deleted=False))
+    destination_warehouse = serializers.PrimaryKeyRelatedField(queryset=Warehouse.objects.filter(is_deleted=False))
+    lines = TransferDocumentLineSerializer(many=True, allow_empty=False, max_length=1000)
+
+    def validate(self, data):
+        if data["source_warehouse"] == data["destination_warehouse"]:
+            raise serializers.ValidationError("Source and destination warehouses must differ")
+
+        product_ids = [line["product_id"] for line in data["lines"]]
+        if len(set(product_ids)) != len(product_ids):
+            raise serializers.ValidationError("Each product may appear on one line only")
+
+        # One query for every line's product
+        products = Product.objects.in_bulk(product_ids)
+        missing = [product_id for product_id in product_ids if product_id not in products]
+        if missing:
+            raise serializers.ValidationError(f"Products not found: {missing}")
+
+        data["lines"] = [
+            {"product": products[line["product_id"]], "quantity": line["quantity"]}
+            for line in data["lines"]
+        ]
+        return data
+
+
 class TransferApprovalSerializer(serializers.Serializer):
-    transfer_request_id = serializers.IntegerField()
+    transfer_request_id = serializers.IntegerField(required=False)
+    transfer_document_id = serializers.IntegerField(required=False)
     decision = serializers.ChoiceField(choices=["APPROVED", "REJECTED"])
 
+    def validate(self, data):
+        if ("transfer_request_id" in data) == ("transfer_document_id" in data):
+            raise serializers.ValidationError(
+                "Exactly one of transfer_request_id or transfer_document_id is required"
+            )
+        return data
+
+
+class TransferBatchApprovalSerializer(serializers.Serializer):
+    transfer_request_ids = serializers.ListField(
+        child=serializers.IntegerField(), allow_empty=False, max_length=1000
+    )
+    decision = serializers.ChoiceField(choices=["APPROVED", "REJECTED"])
+    partial = serializers.BooleanField(default=False)
+
 
 class TransferRequestReadSerializer(serializers.ModelSerializer):
     product = serializers.StringRelatedField()
@@ -171,6 +314,38 @@ class TransferRequestReadSerializer(serializers.ModelSerializer):
         fields = "__all__"
 
 
+class TransferDocumentLineReadSerializer(serializers.ModelSerializer):
+    product = serializers.StringRelatedField()
+
+    class Meta:
+        model = TransferRequest
+        fields = ["id", "product", "product_id", "quantity", "status"]
+
+
+class TransferDocumentReadSerializer(serializers.ModelSerializer):
+    source_warehouse = serializers.StringRelatedField()
+    destination_warehouse = serializers.StringRelatedField()
+    requested_by_username = serializers.CharField(source="requested_by.username", read_only=True, allow_null=True)
+    approved_by_username = serializers.CharField(source="approved_by.username", read_only=True, allow_null=True)
+    lines = TransferDocumentLineReadSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = TransferDocument
+        fields = [
+            "id",
+            "source_warehouse",
+            "source_warehouse_id",
+            "destination_warehouse",
+            "destination_warehouse_id",
+            "status",
+            "requested_by_username",
+            "created_at",
+            "approved_by_username",
+            "approved_at",
+            "lines",
+        ]
+
+
 # =====================================================
 # STAFF APPROVAL
 # =====================================================
@@ -418,6 +593,7 @@ class StockDetailSerializer(serializers.ModelSerializer):
     """
     product = ProductReadSerializer(read_only=True)
     warehouse = WarehouseListSerializer(read_only=True)
+    quantity = serializers.SerializerMethodField()
     threshold_status = serializers.SerializerMethodField()
     
     class Meta:
@@ -432,20 +608,12 @@ class StockDetailSerializer(serializers.ModelSerializer):
             "threshold_status",
         ]
     
+    def get_quantity(self, obj):
+        return obj.quantity + getattr(obj, "pending_quantity", 0)
+
     def get_threshold_status(self, obj):
-        """Check if stock is below threshold"""
-        try:
-            threshold = LowStockThreshold.objects.get(
-                warehouse=obj.warehouse,
-                product=obj.product
-            )
-            return {
-                "threshold": threshold.threshold_quantity,
-                "is_low": obj.quantity < threshold.threshold_quantity,
-                "difference": obj.quantity - threshold.threshold_quantity
-            }
-        except LowStockThreshold.DoesNotExist:
-            return None
+        """Check if stock is at or below its effective threshold"""
+        return threshold_status(obj, quantity=self.get_quantity(obj))
 
 
 class PurchaseRequestDetailSerializer(serializers.ModelSerializer):
@@ -473,6 +641,7 @@ class PurchaseRequestDetailSerializer(serializers.ModelSerializer):
             "created_at",
             "processed_by_username",
             "processed_at",
+            "order",
             "approval_history",
         ]
     
@@ -518,6 +687,7 @@ class TransferRequestDetailSerializer(serializers.ModelSerializer):
             "created_at",
             "approved_by_username",
             "approved_at",
+            "document",
             "approval_history",
         ]
     
@@ -1,12 +1,19 @@
 from django.conf import settings
 from django.core.mail import EmailMultiAlternatives
 
+from notifications.services.mailer import send_messages
 
-def send_low_stock_email(recipients, alert_items):
-    if not alert_items or not recipients:
-        return
 
-    subject = "⚠️ Low Stock Alert – Immediate Attention Required"
+DEFAULT_SUBJECT = "⚠️ Low Stock Alert – Immediate Attention Required"
+
+
+def build_low_stock_email(recipients, alert_items, subject=DEFAULT_SUBJECT):
+    """
+    Render the low-stock message without sending it, so callers can send
+    many of them over one connection. Returns None if there is nothing to send.
+    """
+    if not alert_items or not recipients:
+        return None
 
     # -------------------------------------------------
     # Plain text fallback (important for mail clients)
@@ -88,4 +95,14 @@ def send_low_stock_email(recipients, alert_items):
     )
 
     email.attach_alternative(html_message, "text/html")
-    email.send(fail_silently=False)
+    return email
+
+
+def send_low_stock_email(recipients, alert_items):
+    email = build_low_stock_email(recipients, alert_items)
+    if email is None:
+        return
+
+    failures, _ = send_messages([email])
+    if failures:
+        raise failures[0][1]
@@ -1,32 +1,118 @@
+from django.db.models import F, FilteredRelation, IntegerField, Q
+from django.db.models.functions import Coalesce
+
+from core.constants import DEFAULT_LOW_STOCK_THRESHOLD
 from inventory.models import Stock, LowStockThreshold
 
+# Single definition of "low stock": quantity at or below the effective threshold,
+# i.e. the (warehouse, product) LowStockThreshold or DEFAULT_LOW_STOCK_THRESHOLD.
+
+
+def with_thresholds(queryset=None, default_threshold=DEFAULT_LOW_STOCK_THRESHOLD):
+    """
+    Annotate a Stock queryset with `low_threshold` (effective threshold) via a
+    LEFT JOIN on LowStockThreshold and COALESCE to the default.
+    """
+    if queryset is None:
+        queryset = Stock.objects.all()
+
+    return queryset.annotate(
+        configured_threshold=FilteredRelation(
+            "product__low_stock_thresholds",
+            condition=Q(product__low_stock_thresholds__warehouse=F("warehouse")),
+        ),
+        low_threshold=Coalesce(
+            "configured_threshold__threshold_quantity",
+            default_threshold,
+            output_field=IntegerField(),
+        ),
+    )
+
+
+def is_low_q():
+    """
+    Q for rows of a with_thresholds() queryset that are low on stock.
+    """
+    return Q(quantity__lte=F("low_threshold"))
+
+
+def low_stock_queryset(queryset=None, default_threshold=DEFAULT_LOW_STOCK_THRESHOLD):
+    """
+    Low-stock rows, annotated with low_threshold.
+    """
+    return with_thresholds(queryset, default_threshold).filter(is_low_q())
+
+
+def count_low_stock(queryset=None, default_threshold=DEFAULT_LOW_STOCK_THRESHOLD):
+    return low_stock_queryset(queryset, default_threshold).count()
 
-def get_low_stock_items():
+
+def top_low_stock(queryset=None, limit=10, default_threshold=DEFAULT_LOW_STOCK_THRESHOLD):
     """
-    Returns list of low-stock items (live calculated)
+    The `limit` lowest rows relative to their threshold (largest shortfall first).
     """
-    results = []
+    return (
+        low_stock_queryset(queryset, default_threshold)
+        .select_related("product", "warehouse")
+        .annotate(shortfall=F("quantity") - F("low_threshold"))
+        .order_by("shortfall", "id")[:limit]
+    )
+
 
-    thresholds = (
+def effective_threshold(warehouse_id, product_id, default_threshold=DEFAULT_LOW_STOCK_THRESHOLD):
+    """
+    Effective threshold of one (warehouse, product) without loading the stock row.
+    """
+    configured = (
         LowStockThreshold.objects
-        .select_related("warehouse", "product")
+        .filter(warehouse_id=warehouse_id, product_id=product_id)
+        .values_list("threshold_quantity", flat=True)
+        .first()
     )
+    return default_threshold if configured is None else configured
+
 
-    for threshold in thresholds:
-        try:
-            stock = Stock.objects.get(
-                warehouse=threshold.warehouse,
-                product=threshold.product,
-            )
-        except Stock.DoesNotExist:
-            continue
-
-        if stock.quantity <= threshold.threshold_quantity:
-            results.append({
-                "warehouse": threshold.warehouse,
-                "product": threshold.product,
-                "current_qty": stock.quantity,
-                "threshold": threshold.threshold_quantity,
-            })
-
-    return results
+def threshold_status(stock, default_threshold=DEFAULT_LOW_STOCK_THRESHOLD, quantity=None):
+    """
+    Effective threshold of one stock row. Uses `low_threshold` if the
+    instance came from a with_thresholds() queryset, else looks it up.
+    quantity overrides stock.quantity (e.g. to include buffered receipts).
+    """
+    threshold = getattr(stock, "low_threshold", None)
+    if threshold is None:
+        threshold = effective_threshold(stock.warehouse_id, stock.product_id, default_threshold)
+    if quantity is None:
+        quantity = stock.quantity
+
+    return {
+        "threshold": threshold,
+        "is_low": quantity <= threshold,
+        "difference": quantity - threshold,
+    }
+
+
+def get_low_stock_items(warehouse_ids=None):
+    """
+    Returns list of low-stock items (live calculated) in one query. Only
+    stocks with a configured LowStockThreshold are included; the default
+    threshold is for dashboards, not alerts.
+    """
+    queryset = Stock.objects.all()
+    if warehouse_ids is not None:
+        queryset = queryset.filter(warehouse_id__in=list(warehouse_ids))
+
+    rows = (
+        low_stock_queryset(queryset)
+        .filter(configured_threshold__threshold_quantity__isnull=False)
+        .select_related("warehouse", "product")
+        .order_by("warehouse_id", "product_id")
+    )
+    return [
+        {
+            "warehouse": stock.warehouse,
+            "product": stock.product,
+            "current_qty": stock.quantity,
+            "threshold": stock.low_threshold,
+        }
+        for stock in rows
+    ]
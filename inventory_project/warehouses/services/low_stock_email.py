@@ -1,9 +1,11 @@
 from django.conf import settings
-from django.core.mail import send_mail, EmailMultiAlternativeMessage
+from django.core.mail import EmailMultiAlternatives
 from django.contrib.auth import get_user_model
 from datetime import datetime
 from collections import defaultdict
 
+from notifications.services.mailer import send_messages
+
 User = get_user_model()
 
 
@@ -230,11 +232,14 @@ def send_low_stock_email(low_stock_items):
     )
     
     # Send email with both plain text and HTML
-    msg = EmailMultiAlternativeMessage(
+    msg = EmailMultiAlternatives(
         subject=subject,
         body=plain_text,
         from_email=settings.DEFAULT_FROM_EMAIL,
         to=list(recipients),
     )
     msg.attach_alternative(html_content, "text/html")
-    msg.send(fail_silently=False)
+
+    failures, _ = send_messages([msg])
+    if failures:
+        raise failures[0][1]
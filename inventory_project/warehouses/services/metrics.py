@@ -0,0 +1,68 @@
+from decimal import Decimal
+
+from django.db.models import Count, DecimalField, F, Q, Sum
+
+from core.constants import DEFAULT_LOW_STOCK_THRESHOLD
+from inventory.models import Stock
+from warehouses.services.low_stock import is_low_q, with_thresholds
+
+CENTS = Decimal("0.01")
+
+
+def stock_value_expression():
+    return F("quantity") * F("product__price")
+
+
+def empty_metrics():
+    return {
+        "total_quantity": 0,
+        "total_value": Decimal("0.00"),
+        "product_count": 0,
+        "low_stock_count": 0,
+        "active_low_stock_count": 0,
+    }
+
+
+def warehouse_metrics(warehouse_ids, default_threshold=DEFAULT_LOW_STOCK_THRESHOLD):
+    """
+    Stock metrics for a set of warehouses in a single GROUP BY query.
+
+    Returns:
+        {warehouse_id: {"total_quantity", "total_value", "product_count",
+        "low_stock_count", "active_low_stock_count"}} with an entry (zeros)
+        for every requested id.
+    """
+    warehouse_ids = list(warehouse_ids)
+    metrics = {warehouse_id: empty_metrics() for warehouse_id in warehouse_ids}
+    if not warehouse_ids:
+        return metrics
+
+    rows = (
+        with_thresholds(Stock.objects.filter(warehouse_id__in=warehouse_ids), default_threshold)
+        .values("warehouse_id")
+        .annotate(
+            total_quantity=Sum("quantity"),
+            total_value=Sum(
+                stock_value_expression(),
+                output_field=DecimalField(max_digits=20, decimal_places=2),
+            ),
+            product_count=Count("product_id", distinct=True),
+            low_stock_count=Count("id", filter=is_low_q()),
+            active_low_stock_count=Count("id", filter=is_low_q() & Q(product__is_active=True)),
+        )
+        .order_by()
+    )
+
+    for row in rows:
+        metrics[row["warehouse_id"]] = {
+            "total_quantity": row["total_quantity"] or 0,
+            "total_value": (row["total_value"] or Decimal("0")).quantize(CENTS),
+            "product_count": row["product_count"],
+            "low_stock_count": row["low_stock_count"],
+            "active_low_stock_count": row["active_low_stock_count"],
+        }
+    return metrics
+
+
+def single_warehouse_metrics(warehouse_id, default_threshold=DEFAULT_LOW_STOCK_THRESHOLD):
+    return warehouse_metrics([warehouse_id], default_threshold)[warehouse_id]
@@ -1,3 +1,251 @@
+from unittest import mock
+
 from django.test import TestCase
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from core.concurrency import ConcurrentUpdate
+from core.models import IdempotencyKey
+from inventory.models import Product, Stock, StockMovement, StockReceipt, StockStripe
+from inventory.services.receipts import flush_stock_receipts
+from inventory.services.stock import decrease_stock, increase_stock, transfer_stock
+from inventory.services.stock_stripes import set_stock_stripes
+from purchases.models import PurchaseApproval, PurchaseRequest
+from roles.models import Manager, Role, Viewer
+from warehouses.models import Warehouse
+
+
+class WarehouseAPITestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        roles = {name: Role.objects.create(name=name) for name in (Role.ADMIN, Role.MANAGER, Role.VIEWER)}
+
+        def make_user(username, role):
+            return User.objects.create_user(
+                username=username, password="pass", email=f"{username}@example.com", role=roles[role]
+            )
+
+        cls.admin = make_user("admin", Role.ADMIN)
+        cls.manager_user = make_user("manager", Role.MANAGER)
+        cls.viewer = make_user("viewer", Role.VIEWER)
+        Viewer.objects.create(user=cls.viewer)
+
+        manager = Manager.objects.create(user=cls.manager_user)
+        cls.warehouse = Warehouse.objects.create(name="Main", location="North", manager=manager)
+        cls.other_warehouse = Warehouse.objects.create(name="Overflow", location="South")
+        cls.product = Product.objects.create(name="Bolt", sku="BOLT-1", price=5)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.manager_user)
+
+    def set_stock(self, quantity):
+        return Stock.objects.create(warehouse=self.warehouse, product=self.product, quantity=quantity)
+
+    def stock_quantity(self, warehouse=None):
+        return Stock.objects.get(warehouse=warehouse or self.warehouse, product=self.product).quantity
+
+    def purchase_request(self, quantity):
+        return PurchaseRequest.objects.create(
+            viewer=self.viewer, product=self.product, warehouse=self.warehouse, quantity=quantity
+        )
+
+
+# =====================================================
+# PURCHASE APPROVALS
+# =====================================================
+class PurchaseApproveTests(WarehouseAPITestCase):
+    url = "/api/purchase-requests/approve/"
+
+    def test_insufficient_stock_rolls_back_the_decision(self):
+        self.set_stock(2)
+        pr = self.purchase_request(3)
+
+        response = self.client.post(
+            self.url, {"purchase_request_id": pr.id, "decision": "APPROVED"}, format="json"
+        )
+
+        self.assertEqual(response.status_code, 400)
+        pr.refresh_from_db()
+        self.assertEqual(pr.status, PurchaseRequest.STATUS_PENDING)
+        self.assertEqual(self.stock_quantity(), 2)
+        self.assertFalse(PurchaseApproval.objects.exists())
+        self.assertFalse(StockMovement.objects.exists())
+
+    def test_cas_conflict_returns_409_and_stores_no_key(self):
+        self.set_stock(5)
+        pr = self.purchase_request(3)
+
+        with mock.patch(
+            "warehouses.views.cas_update",
+            side_effect=ConcurrentUpdate(PurchaseRequest, pr.id, 3),
+        ):
+            response = self.client.post(
+                self.url,
+                {"purchase_request_id": pr.id, "decision": "APPROVED"},
+                format="json",
+                HTTP_IDEMPOTENCY_KEY="approve-1",
+            )
+
+        self.assertEqual(response.status_code, 409)
+        self.assertFalse(IdempotencyKey.objects.filter(key="approve-1").exists())
+        pr.refresh_from_db()
+        self.assertEqual(pr.status, PurchaseRequest.STATUS_PENDING)
+        self.assertEqual(self.stock_quantity(), 5)
+
+        # The conflict stored nothing, so the same key runs again
+        response = self.client.post(
+            self.url,
+            {"purchase_request_id": pr.id, "decision": "APPROVED"},
+            format="json",
+            HTTP_IDEMPOTENCY_KEY="approve-1",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.stock_quantity(), 2)
+
+
+class PurchaseBatchApproveTests(WarehouseAPITestCase):
+    url = "/api/purchase-requests/approve/batch/"
+
+    def setUp(self):
+        super().setUp()
+        self.set_stock(4)
+        self.covered = self.purchase_request(3)
+        self.uncovered = self.purchase_request(5)
+
+    def post(self, **extra):
+        return self.client.post(
+            self.url,
+            {"purchase_request_ids": [self.covered.id, self.uncovered.id], "decision": "APPROVED", **extra},
+            format="json",
+        )
+
+    def test_all_or_nothing_writes_nothing(self):
+        response = self.post()
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data["decided"], 0)
+        self.assertEqual(response.data["failed"], 1)
+        self.assertEqual(response.data["results"][1]["error"], "Insufficient stock")
+        self.assertEqual(
+            set(PurchaseRequest.objects.values_list("status", flat=True)),
+            {PurchaseRequest.STATUS_PENDING},
+        )
+        self.assertEqual(self.stock_quantity(), 4)
+
+    def test_partial_decides_what_it_can(self):
+        response = self.post(partial=True)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["decided"], 1)
+        self.covered.refresh_from_db()
+        self.uncovered.refresh_from_db()
+        self.assertEqual(self.covered.status, PurchaseRequest.STATUS_APPROVED)
+        self.assertEqual(self.uncovered.status, PurchaseRequest.STATUS_PENDING)
+        self.assertEqual(self.stock_quantity(), 1)
+        self.assertEqual(StockMovement.objects.get().quantity_change, -3)
+
+
+# =====================================================
+# STOCK ASSIGNMENT
+# =====================================================
+class StockAssignIdempotencyTests(WarehouseAPITestCase):
+    url = "/api/stocks/assign/"
+
+    def assign(self, quantity, key="assign-1"):
+        return self.client.post(
+            self.url,
+            {"warehouse_id": self.warehouse.id, "product_id": self.product.id, "quantity": quantity},
+            format="json",
+            HTTP_IDEMPOTENCY_KEY=key,
+        )
+
+    def test_replay_returns_the_stored_response(self):
+        first = self.assign(4)
+        second = self.assign(4)
+
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(second["Idempotent-Replayed"], "true")
+        self.assertEqual(self.stock_quantity(), 4)
+        self.assertEqual(StockMovement.objects.count(), 1)
+
+    def test_key_reused_for_a_different_body_is_422(self):
+        self.assign(4)
+        response = self.assign(5)
+
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(self.stock_quantity(), 4)
+
+
+class BufferedReceiptTests(WarehouseAPITestCase):
+    def receive(self, quantity):
+        return self.client.post(
+            "/api/stocks/assign/",
+            {
+                "warehouse_id": self.warehouse.id,
+                "product_id": self.product.id,
+                "quantity": quantity,
+                "buffered": True,
+            },
+            format="json",
+        )
+
+    def listed_quantity(self):
+        response = self.client.get("/api/stocks/", {"warehouse": self.warehouse.id})
+        self.assertEqual(response.status_code, 200)
+        return response.data["results"][0]["quantity"]
+
+    def test_buffered_receipts_are_read_and_flushed_once(self):
+        self.assertEqual(self.receive(3).data["quantity"], 3)
+        response = self.receive(4)
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data["quantity"], 7)
+
+        self.assertEqual(self.stock_quantity(), 0)
+        self.assertEqual(self.listed_quantity(), 7)
+
+        self.assertEqual(flush_stock_receipts(), (2, 1))
+        self.assertEqual(flush_stock_receipts(), (0, 0))
+
+        self.assertFalse(StockReceipt.objects.exists())
+        self.assertEqual(self.stock_quantity(), 7)
+        self.assertEqual(self.listed_quantity(), 7)
+        self.assertEqual(StockMovement.objects.get().quantity_change, 7)
+
+
+# =====================================================
+# STRIPED STOCK
+# =====================================================
+class StripedStockTests(WarehouseAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.set_stock(10)
+        self.stock = set_stock_stripes(self.warehouse.id, self.product.id, 4)
+        self.version = self.stock.version
+
+    def assert_stripes_match(self, quantity):
+        self.stock.refresh_from_db()
+        stripes = list(StockStripe.objects.filter(stock=self.stock).values_list("quantity", flat=True))
+        self.assertEqual(len(stripes), 4)
+        self.assertEqual(self.stock.quantity, quantity)
+        self.assertEqual(sum(stripes), quantity)
+        self.assertTrue(all(share >= 0 for share in stripes))
+        self.assertGreater(self.stock.version, self.version)
+        self.version = self.stock.version
+
+    def test_stripes_follow_every_change(self):
+        self.assertEqual(increase_stock(self.warehouse.id, self.product.id, 6), 16)
+        self.assert_stripes_match(16)
+
+        self.assertEqual(decrease_stock(self.warehouse.id, self.product.id, 1), 15)
+        self.assert_stripes_match(15)
+
+        # No stripe holds 13 units, so the decrement rebalances
+        self.assertEqual(decrease_stock(self.warehouse.id, self.product.id, 13), 2)
+        self.assert_stripes_match(2)
 
-# Create your tests here.
+        transfer_stock(self.warehouse.id, self.other_warehouse.id, self.product.id, 2)
+        self.assert_stripes_match(0)
+        self.assertEqual(self.stock_quantity(self.other_warehouse), 2)
@@ -13,16 +13,26 @@ from warehouses.views import (
     ProductDeleteAPIView,
     StockListAPIView,
     StockAssignAPIView,
+    StockBulkAssignAPIView,
+    StockReceiptLagAPIView,
 
     # Purchase workflow
     PurchaseRequestCreateAPIView,
     PurchaseApproveAPIView,
+    PurchaseBatchApproveAPIView,
+    PurchaseRequestClaimAPIView,
+    PurchaseRequestReleaseAPIView,
     PurchaseRequestListAPIView,
+    PurchaseOrderListAPIView,
+    PurchaseOrderDetailAPIView,
 
     # Transfer workflow
     TransferRequestCreateAPIView,
     TransferApproveAPIView,
+    TransferBatchApproveAPIView,
     TransferRequestListAPIView,
+    TransferDocumentListAPIView,
+    TransferDocumentDetailAPIView,
 
     # Dashboards & Reports
     AdminDashboardAPIView,
@@ -58,16 +68,26 @@ urlpatterns = [
     path("products/list/", ProductListAPIView.as_view(), name="product-list"),
     path("stocks/", StockListAPIView.as_view(), name="stock-list"),
     path("stocks/assign/", StockAssignAPIView.as_view(), name="stock-assign"),
+    path("stocks/assign/bulk/", StockBulkAssignAPIView.as_view(), name="stock-assign-bulk"),
+    path("stocks/receipts/lag/", StockReceiptLagAPIView.as_view(), name="stock-receipt-lag"),
 
     # Purchase workflow
     path("purchase-requests/", PurchaseRequestCreateAPIView.as_view(), name="purchase-request-create"),
     path("purchase-requests/approve/", PurchaseApproveAPIView.as_view(), name="purchase-request-approve"),
+    path("purchase-requests/approve/batch/", PurchaseBatchApproveAPIView.as_view(), name="purchase-request-approve-batch"),
+    path("purchase-requests/claim/", PurchaseRequestClaimAPIView.as_view(), name="purchase-request-claim"),
+    path("purchase-requests/claim/release/", PurchaseRequestReleaseAPIView.as_view(), name="purchase-request-claim-release"),
     path("purchase-requests/list/", PurchaseRequestListAPIView.as_view(), name="purchase-request-list"),
+    path("purchase-orders/list/", PurchaseOrderListAPIView.as_view(), name="purchase-order-list"),
+    path("purchase-orders/<int:pk>/detail/", PurchaseOrderDetailAPIView.as_view(), name="purchase-order-detail"),
 
     # Transfer workflow
     path("transfer-requests/", TransferRequestCreateAPIView.as_view(), name="transfer-request-create"),
     path("transfer-requests/approve/", TransferApproveAPIView.as_view(), name="transfer-request-approve"),
+    path("transfer-requests/approve/batch/", TransferBatchApproveAPIView.as_view(), name="transfer-request-approve-batch"),
     path("transfer-requests/list/", TransferRequestListAPIView.as_view(), name="transfer-request-list"),
+    path("transfer-documents/list/", TransferDocumentListAPIView.as_view(), name="transfer-document-list"),
+    path("transfer-documents/<int:pk>/detail/", TransferDocumentDetailAPIView.as_view(), name="transfer-document-detail"),
 
     # Dashboards
     path("dashboard/admin/", AdminDashboardAPIView.as_view(), name="dashboard-admin"),
@@ -1,188 +1,309 @@
-from django.db.models import Q
+import heapq
+from itertools import islice
+
+from django.db.models import Case, CharField, F, Q, Value, When
+from django.db.models.functions import Coalesce, Concat, Lower
+from django.utils.dateparse import parse_datetime
 from purchases.models import PurchaseApproval
 from transfers.models import TransferApproval
 from roles.models import StaffApproval, ManagerPromotionRequest, Role
 
+# Orderings accepted by the dashboards' movement history
+ORDERINGS = (
+    "timestamp", "-timestamp",
+    "performed_by", "-performed_by",
+    "event_type", "-event_type",
+)
+DEFAULT_ORDERING = "-timestamp"
+
+
 def _safe_getattr(obj, attr, default=None):
     try:
         return getattr(obj, attr, default)
     except Exception:
         return default
 
-def get_recent_logs(user, warehouse_id=None, limit=20):
+
+def _username_key(field):
+    # Matches the "Unknown" fallback used for performed_by
+    return Coalesce(Lower(field), Value("unknown"), output_field=CharField())
+
+
+def _decision_key(field, prefix):
+    return Case(
+        When(**{f"{field}__istartswith": "APPROV"}, then=Value(f"{prefix}_approved")),
+        default=Value(f"{prefix}_rejected"),
+        output_field=CharField(),
+    )
+
+
+# ---------------------------------------------------------
+# Event builders (one per source table)
+# ---------------------------------------------------------
+def _purchase_event(pa, warehouse_id):
+    pr = pa.purchase_request
+    dec = pa.decision
+
+    # Determine status/type
+    if str(dec).upper().startswith("APPROV"):
+        event_type = "PURCHASE_APPROVED"
+        status = "APPROVED"
+    else:
+        event_type = "PURCHASE_REJECTED"
+        status = "REJECTED"
+
+    return {
+        "event_id": pa.id,
+        "event_type": event_type,
+        "timestamp": pa.created_at, # Approval time
+        "main_text": pr.product.name if pr.product else "Unknown Product",
+        "sub_text": f"Qty: {pr.quantity} • {status}",
+        "performed_by": pa.approver.username if pa.approver else "Unknown",
+        "status": status,
+        "raw_date": pa.created_at,
+        # extra fields for frontend if needed (keeping existing warehouse dashboard structure in mind)
+        "quantity_change": -pr.quantity if status == "APPROVED" else 0,
+        "source_warehouse": pr.warehouse.name if pr.warehouse else None,
+        "destination_warehouse": None,
+    }
+
+
+def _transfer_event(ta, warehouse_id):
+    tr = ta.transfer_request
+    dec = ta.decision
+
+    if str(dec).upper().startswith("APPROV"):
+        event_type = "TRANSFER_APPROVED"
+        status = "APPROVED"
+    else:
+        event_type = "TRANSFER_REJECTED"
+        status = "REJECTED"
+
+    # Quantity change direction depends on warehouse context
+    qty_change = 0
+    if status == "APPROVED":
+        if warehouse_id:
+            if tr.source_warehouse_id == warehouse_id:
+                qty_change = -tr.quantity
+            elif tr.destination_warehouse_id == warehouse_id:
+                qty_change = tr.quantity
+        else:
+            # Global view: net change is 0 globally, but physically it moves.
+            # We can just show the quantity transferred.
+            qty_change = tr.quantity
+
+    return {
+        "event_id": ta.id,
+        "event_type": event_type,
+        "timestamp": ta.created_at,
+        "main_text": tr.product.name if tr.product else "Unknown Product",
+        "sub_text": f"Qty: {tr.quantity} • {status}",
+        "performed_by": ta.approver.username if ta.approver else "Unknown",
+        "status": status,
+        "raw_date": ta.created_at,
+        "quantity_change": qty_change,
+        "source_warehouse": tr.source_warehouse.name if tr.source_warehouse else None,
+        "destination_warehouse": tr.destination_warehouse.name if tr.destination_warehouse else None,
+    }
+
+
+def _staff_event(sa, warehouse_id):
+    staff_name = sa.staff.user.username
+    return {
+        "event_id": sa.id,
+        "event_type": "STAFF_APPROVED",
+        "timestamp": sa.approved_at,
+        "main_text": f"Staff: {staff_name}",
+        "sub_text": "Staff member approved",
+        "performed_by": sa.approved_by.username if sa.approved_by else "Unknown",
+        "status": "APPROVED",
+        "raw_date": sa.approved_at,
+        "quantity_change": 0,
+        "source_warehouse": None,
+        "destination_warehouse": None,
+    }
+
+
+def _promotion_event(mp, warehouse_id):
+    staff_name = mp.staff.user.username
+    status = mp.status
+    return {
+        "event_id": mp.id,
+        "event_type": f"MANAGER_PROMOTION_{status}",
+        "timestamp": mp.approved_at or mp.requested_at,
+        "main_text": f"Manager Promo: {staff_name}",
+        "sub_text": f"Status: {status}",
+        "performed_by": mp.approved_by.username if mp.approved_by else "Unknown",
+        "status": status,
+        "raw_date": mp.approved_at or mp.requested_at,
+        "quantity_change": 0,
+        "source_warehouse": None,
+        "destination_warehouse": None,
+    }
+
+
+# ---------------------------------------------------------
+# Sources
+# ---------------------------------------------------------
+def _sources(warehouse_id):
     """
-    Aggregates logs from Purchase, Transfer, Staff, and Manager activities.
-    Returns a sorted list of dictionaries.
-    
-    Args:
-        user: The user requesting the logs (for permission checks if needed, 
-              though usually checked by view).
-        warehouse_id: If provided, filters logs relevant to that warehouse.
-        limit: Max number of logs to return.
+    Yields (queryset, sort_keys, build_event) per source table.
+    sort_keys maps each ordering field to the SQL expression that
+    reproduces the value the merged stream is sorted on.
     """
-    
-    events = []
-
-    # ---------------------------------------------------------
     # 1. Purchase Approvals
-    # ---------------------------------------------------------
     pa_qs = PurchaseApproval.objects.select_related(
         "purchase_request", "purchase_request__product", "purchase_request__warehouse", "approver"
-    ).all()
-
+    )
     if warehouse_id:
         pa_qs = pa_qs.filter(purchase_request__warehouse_id=warehouse_id)
 
-    for pa in pa_qs:
-        pr = pa.purchase_request
-        dec = pa.decision
-        
-        # Determine status/type
-        if str(dec).upper().startswith("APPROV"):
-            event_type = "PURCHASE_APPROVED"
-            status = "APPROVED"
-        else:
-            event_type = "PURCHASE_REJECTED"
-            status = "REJECTED"
-            
-        events.append({
-            "event_id": pa.id,
-            "event_type": event_type,
-            "timestamp": pa.created_at, # Approval time
-            "main_text": pr.product.name if pr.product else "Unknown Product",
-            "sub_text": f"Qty: {pr.quantity} • {status}",
-            "performed_by": pa.approver.username if pa.approver else "Unknown",
-            "status": status,
-            "raw_date": pa.created_at, 
-            # extra fields for frontend if needed (keeping existing warehouse dashboard structure in mind)
-            "quantity_change": -pr.quantity if status == "APPROVED" else 0,
-            "source_warehouse": pr.warehouse.name if pr.warehouse else None,
-            "destination_warehouse": None,
-        })
-
-    # ---------------------------------------------------------
+    yield pa_qs, {
+        "timestamp": F("created_at"),
+        "performed_by": _username_key("approver__username"),
+        "event_type": _decision_key("decision", "purchase"),
+    }, _purchase_event
+
     # 2. Transfer Approvals
-    # ---------------------------------------------------------
     ta_qs = TransferApproval.objects.select_related(
-        "transfer_request", "transfer_request__product", 
+        "transfer_request", "transfer_request__product",
         "transfer_request__source_warehouse", "transfer_request__destination_warehouse",
         "approver"
-    ).all()
-
+    )
     if warehouse_id:
         # Include if warehouse is source OR destination
         ta_qs = ta_qs.filter(
-            Q(transfer_request__source_warehouse_id=warehouse_id) | 
+            Q(transfer_request__source_warehouse_id=warehouse_id) |
             Q(transfer_request__destination_warehouse_id=warehouse_id)
         )
 
-    for ta in ta_qs:
-        tr = ta.transfer_request
-        dec = ta.decision
-        
-        if str(dec).upper().startswith("APPROV"):
-            event_type = "TRANSFER_APPROVED"
-            status = "APPROVED"
-        else:
-            event_type = "TRANSFER_REJECTED"
-            status = "REJECTED"
-
-        # Quantity change direction depends on warehouse context
-        qty_change = 0
-        if status == "APPROVED":
-            if warehouse_id:
-                if tr.source_warehouse_id == warehouse_id:
-                    qty_change = -tr.quantity
-                elif tr.destination_warehouse_id == warehouse_id:
-                    qty_change = tr.quantity
-            else:
-                # Global view: net change is 0 globally, but physically it moves. 
-                # We can just show the quantity transferred.
-                qty_change = tr.quantity
+    yield ta_qs, {
+        "timestamp": F("created_at"),
+        "performed_by": _username_key("approver__username"),
+        "event_type": _decision_key("decision", "transfer"),
+    }, _transfer_event
 
-        events.append({
-            "event_id": ta.id,
-            "event_type": event_type,
-            "timestamp": ta.created_at,
-            "main_text": tr.product.name if tr.product else "Unknown Product",
-            "sub_text": f"Qty: {tr.quantity} • {status}",
-            "performed_by": ta.approver.username if ta.approver else "Unknown",
-            "status": status,
-            "raw_date": ta.created_at,
-            "quantity_change": qty_change,
-            "source_warehouse": tr.source_warehouse.name if tr.source_warehouse else None,
-            "destination_warehouse": tr.destination_warehouse.name if tr.destination_warehouse else None,
-        })
-
-    # ---------------------------------------------------------
     # 3. Staff Approvals
-    # ---------------------------------------------------------
+    # StaffApproval doesn't directly link to warehouse, so we use the
+    # staff member's current warehouse.
     sa_qs = StaffApproval.objects.select_related(
         "staff", "staff__user", "approved_by"
-    ).all()
-
-    # StaffApproval doesn't directly link to warehouse usually, 
-    # but the Staff might be assigned to a warehouse NOW.
-    # However, at approval time, they might not have been. 
-    # We check `staff.warehouse`.
+    )
     if warehouse_id:
         sa_qs = sa_qs.filter(staff__warehouse_id=warehouse_id)
 
-    for sa in sa_qs:
-        staff_name = sa.staff.user.username
-        events.append({
-            "event_id": sa.id,
-            "event_type": "STAFF_APPROVED",
-            "timestamp": sa.approved_at,
-            "main_text": f"Staff: {staff_name}",
-            "sub_text": "Staff member approved",
-            "performed_by": sa.approved_by.username if sa.approved_by else "Unknown",
-            "status": "APPROVED",
-            "raw_date": sa.approved_at,
-            "quantity_change": 0,
-            "source_warehouse": None,
-            "destination_warehouse": None,
-        })
-
-    # ---------------------------------------------------------
-    # 4. Manager Promotion Requests (Approvals)
-    # ---------------------------------------------------------
-    # specific to promotions that were approved/rejected
+    yield sa_qs, {
+        "timestamp": F("approved_at"),
+        "performed_by": _username_key("approved_by__username"),
+        "event_type": Value("staff_approved", output_field=CharField()),
+    }, _staff_event
+
+    # 4. Manager Promotion Requests (approved/rejected only)
     mp_qs = ManagerPromotionRequest.objects.select_related(
         "staff", "staff__user", "approved_by", "requested_by"
     ).exclude(status="PENDING")
-
-    # Manager promotions don't link to a warehouse directly in the request usually,
-    # unless we infer from the staff's current warehouse.
     if warehouse_id:
-         mp_qs = mp_qs.filter(staff__warehouse_id=warehouse_id)
-
-    for mp in mp_qs:
-        staff_name = mp.staff.user.username
-        status = mp.status
-        event_type = f"MANAGER_PROMOTION_{status}"
-        
-        events.append({
-            "event_id": mp.id,
-            "event_type": event_type,
-            "timestamp": mp.approved_at or mp.requested_at,
-            "main_text": f"Manager Promo: {staff_name}",
-            "sub_text": f"Status: {status}",
-            "performed_by": mp.approved_by.username if mp.approved_by else "Unknown",
-            "status": status,
-            "raw_date": mp.approved_at or mp.requested_at,
-            "quantity_change": 0,
-            "source_warehouse": None,
-            "destination_warehouse": None,
-        })
-
-    # ---------------------------------------------------------
-    # Sort and Limit
-    # ---------------------------------------------------------
-    # Sort by timestamp descending (newest first)
-    # Use raw_date for sorting, filter out None dates just in case
-    events.sort(key=lambda x: x["raw_date"] or x["timestamp"], reverse=True)
-    
-    # Remove raw_date before returning if desired, or keep it.
-    # We'll return the slice.
-    return events[:limit]
+        mp_qs = mp_qs.filter(staff__warehouse_id=warehouse_id)
+
+    yield mp_qs, {
+        "timestamp": Coalesce("approved_at", "requested_at"),
+        "performed_by": _username_key("approved_by__username"),
+        "event_type": Concat(
+            Value("manager_promotion_"), Lower("status"), output_field=CharField()
+        ),
+    }, _promotion_event
+
+
+def _after_filter(field, descending, rank, after):
+    """
+    Q selecting rows that sort strictly after the cursor key
+    (sort_value, event_id, source_rank) in this source.
+    """
+    sort_value, event_id, after_rank = after
+    if field == "timestamp":
+        sort_value = parse_datetime(sort_value)
+    op = "lt" if descending else "gt"
+
+    q = Q(**{f"log_sort_key__{op}": sort_value}) | Q(
+        **{"log_sort_key": sort_value, f"id__{op}": event_id}
+    )
+    # Same sort value and id in another source: rank decides
+    if (rank < after_rank) if descending else (rank > after_rank):
+        q |= Q(log_sort_key=sort_value, id=event_id)
+    return q
+
+
+def _stream(qs, field, sort_key, build_event, warehouse_id, rank, descending, limit, after):
+    """
+    Rows of one source, already ordered and limited by the database.
+    Each item is (merge_key, event).
+    """
+    direction = "-" if descending else ""
+    qs = qs.annotate(log_sort_key=sort_key)
+    if after is not None:
+        qs = qs.filter(_after_filter(field, descending, rank, after))
+    qs = qs.order_by(f"{direction}log_sort_key", f"{direction}id")[:limit]
+
+    for obj in qs:
+        yield (obj.log_sort_key, obj.id, rank), build_event(obj, warehouse_id)
+
+
+def _merged(warehouse_id, ordering, window, after=None):
+    if ordering not in ORDERINGS:
+        ordering = DEFAULT_ORDERING
+
+    descending = ordering.startswith("-")
+    field = ordering.lstrip("-")
+
+    streams = [
+        _stream(qs, field, sort_keys[field], build_event, warehouse_id, rank, descending, window, after)
+        for rank, (qs, sort_keys, build_event) in enumerate(_sources(warehouse_id))
+    ]
+    return heapq.merge(*streams, key=lambda item: item[0], reverse=descending)
+
+
+def get_recent_logs(user, warehouse_id=None, limit=20, ordering=DEFAULT_ORDERING, offset=0):
+    """
+    Aggregates logs from Purchase, Transfer, Staff, and Manager activities.
+    Returns a sorted list of dictionaries.
+
+    Each source is ordered and limited in SQL to offset + limit rows and the
+    streams are merged lazily, so cost grows with page depth rather than
+    with total history.
+
+    Args:
+        user: The user requesting the logs (for permission checks if needed,
+              though usually checked by view).
+        warehouse_id: If provided, filters logs relevant to that warehouse.
+        limit: Max number of logs to return.
+        ordering: One of ORDERINGS; ties are broken by event_id.
+        offset: Number of logs to skip (for pagination).
+    """
+    merged = _merged(warehouse_id, ordering, offset + limit)
+    return [event for _, event in islice(merged, offset, offset + limit)]
+
+
+def get_recent_logs_after(user, warehouse_id=None, limit=20, ordering=DEFAULT_ORDERING, after=None):
+    """
+    Keyset variant of get_recent_logs: returns the `limit` logs that follow
+    the `after` key, independent of how deep the page is.
+
+    Returns:
+        (events, next_key) where next_key is the merge key of the last event
+        as a list [sort_value, event_id, source_rank], or None on the last page.
+    """
+    merged = _merged(warehouse_id, ordering, limit + 1, after)
+    items = list(islice(merged, limit + 1))
+
+    next_key = None
+    if len(items) > limit:
+        items = items[:limit]
+        next_key = list(items[-1][0])
+    return [event for _, event in items], next_key
+
+
+def count_recent_logs(warehouse_id=None):
+    """
+    Total number of log entries get_recent_logs can return for the scope.
+    """
+    return sum(qs.count() for qs, _, _ in _sources(warehouse_id))
@@ -2,7 +2,6 @@ from django.db import transaction, models
 from django.utils import timezone
 from django.utils.dateparse import parse_date
 from django.db.models import Q, Sum
-from django.core.paginator import Paginator
 
 
 # DRF core
@@ -11,7 +10,8 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status, serializers
 from rest_framework.permissions import IsAuthenticated
-from rest_framework.parsers import MultiPartParser, FormParser
+from rest_framework.parsers import JSONParser, MultiPartParser, FormParser
+from rest_framework.exceptions import NotFound
 
 
 # Python stdlib
@@ -20,7 +20,10 @@ from datetime import datetime, timedelta
 from collections import defaultdict
 
 # Core constants
-from core.constants import DEFAULT_LOW_STOCK_THRESHOLD
+from core.constants import DEFAULT_LOW_STOCK_THRESHOLD, MovementKind
+from core.events import PurchaseDecided, StaffAssigned, TransferDecided, WarehouseDeleted, publish
+from core.idempotency import idempotent, idempotent_in_steps
+from core.concurrency import ConcurrentUpdate, cas_update
 
 
 # Project utilities
@@ -64,9 +67,29 @@ from warehouses.permissions import (
 from accounts.models import User, UserProfile
 from roles.models import Role, Viewer, Staff, Manager, StaffApproval, ManagerPromotionRequest
 from warehouses.models import Warehouse, StaffTransferRequest
-from inventory.models import Product, Stock, LowStockThreshold
-from purchases.models import PurchaseRequest, PurchaseApproval
-from transfers.models import TransferRequest, TransferApproval
+from inventory.models import Product, Stock, LowStockThreshold, StockMovement
+from inventory.services.ledger import build_movement, record_movement, record_movements
+from inventory.services.stock import (
+    InsufficientStock,
+    batched_stock_changes,
+    decrease_stock,
+    increase_stock,
+    transfer_stock,
+)
+from inventory.services.receipts import (
+    buffer_receipt,
+    flush_stock_receipts,
+    receipt_flush_lag,
+    with_pending_receipts,
+)
+from inventory.services.stock_import import ImportFormatError, assign_stock_lines, read_items, read_upload
+from purchases.models import PurchaseOrder, PurchaseRequest, PurchaseApproval
+from purchases.services.approvals import decide_purchase_requests
+from purchases.services.orders import create_purchase_orders, decide_purchase_order
+from purchases.services.queue import claim_purchase_requests, release_purchase_requests
+from transfers.models import TransferDocument, TransferRequest, TransferApproval
+from transfers.services.approvals import decide_transfer_requests
+from transfers.services.documents import create_transfer_document, decide_transfer_document
 
 # Serializers
 
@@ -79,9 +102,17 @@ from warehouses.serializers import (
     StockReadSerializer,
     StockAssignSerializer,
     PurchaseRequestCreateSerializer,
+    PurchaseOrderCreateSerializer,
+    PurchaseOrderReadSerializer,
     PurchaseApprovalSerializer,
+    PurchaseBatchApprovalSerializer,
+    PurchaseClaimSerializer,
+    PurchaseReleaseSerializer,
     TransferRequestCreateSerializer,
+    TransferDocumentCreateSerializer,
+    TransferDocumentReadSerializer,
     TransferApprovalSerializer,
+    TransferBatchApprovalSerializer,
     StaffApprovalSerializer,
     ManagerPromotionDecisionSerializer,
     UserListSerializer,
@@ -92,7 +123,15 @@ from warehouses.serializers import (
     WarehouseDeleteConfirmSerializer,
     StaffTransferRequestSerializer,
 )
-from warehouses.utils.logging import get_recent_logs
+from warehouses.services.metrics import (
+    warehouse_metrics, single_warehouse_metrics, stock_value_expression,
+)
+from warehouses.services.low_stock import low_stock_queryset, with_thresholds
+from inventory.services.low_stock_state import currently_low, low_state_item
+from dashboard.services.summary import get_warehouse_summary, get_global_summary, deferred_summary_refresh
+from reports.services.rollups import movement_trends, movement_totals
+from warehouses.utils.logging import get_recent_logs, get_recent_logs_after, count_recent_logs
+from core.pagination import KeysetPagination, wants_cursor_pagination, encode_cursor, decode_cursor
 
 from rest_framework_simplejwt.views import TokenObtainPairView
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
@@ -162,11 +201,6 @@ class WarehouseListAPIView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        try:
-             with open('view_debug.log', 'a') as f:
-                 f.write(f"\n[WarehouseList] User: {request.user}")
-        except: pass
-        
         user = request.user
         
         # 🔒 Filtering logic
@@ -221,58 +255,35 @@ class WarehouseListAPIView(APIView):
         if ordering not in allowed_ordering:
             ordering = "name"
         
-        warehouses = warehouses.order_by(ordering)
+        warehouses = warehouses.select_related("manager__user").order_by(ordering)
 
         # Pagination
         paginator = StandardResultsSetPagination()
         result_page = paginator.paginate_queryset(warehouses, request)
-        
-        data = []
-        # Use result_page if paginated, else warehouses
-        # paginate_queryset returns a list if pagination is active, or None if not? 
-        # Actually paginate_queryset returns the sliced queryset.
-        
-        source = result_page if result_page is not None else warehouses
 
-        for w in source:
-            # Calculate stats
-            stocks = Stock.objects.filter(warehouse=w)
-            total_qty = sum(s.quantity for s in stocks)
-            
-            # Use aggregation for better performance in real app, but loop is fine for small scale
-            # total_value
-            total_value = sum((s.quantity * s.product.price) for s in stocks if s.product.price)
-            
-            # Low stock
-            low_count = 0
-            # Optimization: Fetch thresholds once or optimize this loop? 
-            # For now keeping logic same for safety.
-            thresholds = {t.product_id: t.threshold_quantity for t in LowStockThreshold.objects.filter(warehouse=w)}
-            
-            for s in stocks:
-                threshold = thresholds.get(s.product.id, 10)
-                if s.quantity < threshold:
-                    low_count += 1
+        source = list(result_page if result_page is not None else warehouses)
 
+        # Stats for the whole page in one grouped query
+        metrics = warehouse_metrics(w.id for w in source)
+
+        data = []
+        for w in source:
+            stats = metrics[w.id]
             data.append({
                 "warehouse_id": w.id,
                 "name": w.name,
                 "location": w.location,
-                "total_quantity": total_qty,
-                "total_value": round(total_value, 2),
-                "low_stock_count": low_count,
+                "total_quantity": stats["total_quantity"],
+                "total_value": round(stats["total_value"], 2),
+                "low_stock_count": stats["low_stock_count"],
                  # Include manager info for filtering
                 "manager": w.manager.user.username if w.manager else None,
                 "manager_id": w.manager.id if w.manager else None
             })
 
         if result_page is not None:
-             with open('view_debug.log', 'a') as f:
-                 f.write(f"\n[WarehouseList] Returning Paginated: {len(data)}")
              return paginator.get_paginated_response(data)
 
-        with open('view_debug.log', 'a') as f:
-             f.write(f"\n[WarehouseList] Returning NON-Paginated: {len(data)}")
         return Response(data)
 
 
@@ -320,25 +331,22 @@ class WarehouseDetailAPIView(APIView):
 
         # 3. Stock List
         stock_list = []
-        stocks = Stock.objects.filter(warehouse=warehouse).select_related("product")
-        
-        total_quantity = 0
-        total_value = 0
+        stocks = with_pending_receipts(Stock.objects.filter(warehouse=warehouse).select_related("product"))
 
         for s in stocks:
-            total_quantity += s.quantity
-            val = s.quantity * s.product.price
-            total_value += val
-            
+            quantity = s.quantity + s.pending_quantity
+            val = quantity * s.product.price
             stock_list.append({
                 "id": s.id,
                 "product_name": s.product.name,
                 "sku": s.product.sku,
-                "quantity": s.quantity,
+                "quantity": quantity,
                 "price": str(s.product.price),
                 "value": str(val)
             })
 
+        stats = single_warehouse_metrics(warehouse.id)
+
         data = {
             "id": warehouse.id,
             "name": warehouse.name,
@@ -347,8 +355,8 @@ class WarehouseDetailAPIView(APIView):
             "staffs": staff_list,
             "stocks": stock_list,
             "stats": {
-                "total_quantity": total_quantity,
-                "total_value": str(total_value),
+                "total_quantity": stats["total_quantity"],
+                "total_value": str(stats["total_value"]),
                 "staff_count": len(staff_list)
             }
         }
@@ -497,7 +505,9 @@ class StockListAPIView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        stocks = Stock.objects.filter(product__is_active=True).select_related("product", "warehouse")
+        stocks = with_pending_receipts(
+            Stock.objects.filter(product__is_active=True).select_related("product", "warehouse")
+        )
         
         # 🔒 Filter for Manager: Only stocks in their warehouse
         if request.user.role and request.user.role.name == Role.MANAGER:
@@ -532,18 +542,20 @@ class StockListAPIView(APIView):
         
         low_stock = request.query_params.get("low_stock")
         if low_stock == 'true':
-            # Naive low stock implementation: < 10 or 0
-            stocks = stocks.filter(quantity__lte=10) 
+            stocks = low_stock_queryset(stocks)
 
         # 🔒 Sorting
         ordering = request.query_params.get("ordering", "product__name")
         allowed_ordering = ["product__name", "warehouse__name", "quantity", "-updated_at"]
         if ordering not in allowed_ordering:
             ordering = "product__name"
-        stocks = stocks.order_by(ordering)
-
-        paginator = StandardResultsSetPagination()
-        result_page = paginator.paginate_queryset(stocks, request)
+        if wants_cursor_pagination(request.query_params):
+            paginator = KeysetPagination()
+            result_page = paginator.paginate_queryset(stocks, request, ordering=ordering)
+        else:
+            stocks = stocks.order_by(ordering)
+            paginator = StandardResultsSetPagination()
+            result_page = paginator.paginate_queryset(stocks, request)
         serializer = StockReadSerializer(result_page, many=True)
         return paginator.get_paginated_response(serializer.data)
 
@@ -551,6 +563,8 @@ class StockListAPIView(APIView):
 class StockAssignAPIView(APIView):
     permission_classes = [IsAuthenticated]
 
+    @idempotent
+    @transaction.atomic
     def post(self, request):
         serializer = StockAssignSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
@@ -577,28 +591,101 @@ class StockAssignAPIView(APIView):
         else:
             return Response({"error": "Forbidden"}, status=status.HTTP_403_FORBIDDEN)
 
-        stock, _ = Stock.objects.get_or_create(
-            product_id=serializer.validated_data["product_id"],
-            warehouse_id=target_warehouse_id,
-            defaults={"quantity": 0},
+        product_id = serializer.validated_data["product_id"]
+        if serializer.validated_data["buffered"]:
+            # Receiving dock: the flusher applies it and writes the ledger entry
+            quantity = buffer_receipt(
+                target_warehouse_id,
+                product_id,
+                serializer.validated_data["quantity"],
+                actor=request.user,
+            )
+            return Response(
+                {"status": "STOCK_BUFFERED", "quantity": quantity},
+                status=status.HTTP_202_ACCEPTED,
+            )
+
+        new_quantity = increase_stock(
+            target_warehouse_id, product_id, serializer.validated_data["quantity"]
         )
 
-        stock.quantity += serializer.validated_data["quantity"]
-        stock.save(update_fields=["quantity"])
+        record_movement(
+            warehouse_id=target_warehouse_id,
+            product_id=product_id,
+            quantity_change=serializer.validated_data["quantity"],
+            kind=MovementKind.ASSIGN,
+            actor=request.user,
+        )
 
         return Response(
-            {"status": "STOCK_ASSIGNED", "quantity": stock.quantity},
+            {"status": "STOCK_ASSIGNED", "quantity": new_quantity},
             status=status.HTTP_200_OK,
         )
 
 
+class StockReceiptLagAPIView(APIView):
+    """
+    How far the buffered receipt flusher is behind.
+    """
+    permission_classes = [IsManagerOrAdmin]
+
+    def get(self, request):
+        return Response(receipt_flush_lag(), status=status.HTTP_200_OK)
+
+
+class StockBulkAssignAPIView(APIView):
+    """
+    Assign many lines at once: a JSON array (or {"lines": [...]}) of
+    {product_id, warehouse_id, quantity}, or a multipart "file" upload in
+    CSV (with that header) or JSON-lines. Returns a per-line report.
+    """
+    permission_classes = [IsAuthenticated]
+    parser_classes = [JSONParser, MultiPartParser, FormParser]
+
+    @idempotent_in_steps
+    def post(self, request):
+        if request.user.role.name == Role.ADMIN:
+            allowed_warehouse_ids = None
+        elif request.user.role.name == Role.MANAGER:
+            allowed_warehouse_ids = set(
+                Warehouse.objects.filter(manager__user=request.user).values_list("id", flat=True)
+            )
+        else:
+            return Response({"error": "Forbidden"}, status=status.HTTP_403_FORBIDDEN)
+
+        upload = request.FILES.get("file")
+        try:
+            if upload is not None:
+                rows = read_upload(upload)
+            else:
+                items = request.data.get("lines") if isinstance(request.data, dict) else request.data
+                if not isinstance(items, list):
+                    return Response(
+                        {"error": "Send a JSON array of lines or upload a file"},
+                        status=status.HTTP_400_BAD_REQUEST,
+                    )
+                rows = read_items(items)
+
+            report = assign_stock_lines(
+                rows, actor=request.user, allowed_warehouse_ids=allowed_warehouse_ids
+            )
+        except ImportFormatError as exc:
+            return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(report, status=status.HTTP_200_OK)
+
+
 # =====================================================
 # PURCHASE REQUESTS
 # =====================================================
 class PurchaseRequestCreateAPIView(APIView):
     permission_classes = [IsAuthenticated]
 
+    @idempotent
     def post(self, request):
+        if "lines" in request.data:
+            return self._create_orders(request)
+
         serializer = PurchaseRequestCreateSerializer(
             data=request.data,
             context={"request": request},
@@ -610,16 +697,38 @@ class PurchaseRequestCreateAPIView(APIView):
             status=status.HTTP_201_CREATED,
         )
 
+    def _create_orders(self, request):
+        """
+        Cart checkout: every line in one call, one order per warehouse.
+        """
+        serializer = PurchaseOrderCreateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        orders = create_purchase_orders(request.user, serializer.validated_data["lines"])
+        return Response(
+            {
+                "orders": [
+                    {"purchase_order_id": order.id, "warehouse_id": order.warehouse_id, "status": order.status}
+                    for order in orders
+                ],
+            },
+            status=status.HTTP_201_CREATED,
+        )
+
 
 class PurchaseApproveAPIView(APIView):
     permission_classes = [IsAuthenticated]
 
+    @idempotent
     @transaction.atomic
     def post(self, request):
         serializer = PurchaseApprovalSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
 
-        pr = PurchaseRequest.objects.select_for_update().get(
+        if "purchase_order_id" in serializer.validated_data:
+            return self._decide_order(request, serializer.validated_data)
+
+        # Not locked: the status change below is a compare-and-swap on version
+        pr = PurchaseRequest.objects.get(
             id=serializer.validated_data["purchase_request_id"]
         )
 
@@ -629,6 +738,18 @@ class PurchaseApproveAPIView(APIView):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
+        if pr.order_id is not None:
+            return Response(
+                {"error": f"Part of purchase order {pr.order_id}; decide the order instead"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        if pr.is_claimed_by_other(request.user, timezone.now()):
+            return Response(
+                {"error": "Purchase request is claimed by another user"},
+                status=status.HTTP_409_CONFLICT,
+            )
+
         user = request.user
         warehouse = pr.warehouse
 
@@ -659,34 +780,68 @@ class PurchaseApproveAPIView(APIView):
 
         decision = serializer.validated_data["decision"]
 
-        if decision == "APPROVED":
-            try:
-                stock = Stock.objects.select_for_update().get(
-                    product=pr.product,
-                    warehouse=warehouse
-                )
-            except Stock.DoesNotExist:
-                return Response(
-                    {"error": "Stock record not found for this product/warehouse"},
-                    status=status.HTTP_404_NOT_FOUND,
-                )
+        now = timezone.now()
+        new_status = (
+            PurchaseRequest.STATUS_APPROVED if decision == "APPROVED" else PurchaseRequest.STATUS_REJECTED
+        )
 
-            if stock.quantity < pr.quantity:
+        def decide(current):
+            # Re-checked on every attempt: another writer may have got there first
+            if current.status != PurchaseRequest.STATUS_PENDING or current.is_claimed_by_other(user, now):
+                return None
+            current.status = new_status
+            current.processed_by = user
+            current.processed_at = now
+            return ["status", "processed_by", "processed_at"]
+
+        # Decide first, so only the writer that wins the request touches stock
+        try:
+            decided = cas_update(PurchaseRequest, pr.id, decide)
+        except ConcurrentUpdate:
+            return Response(
+                {"error": "Purchase request was modified concurrently; reload and retry"},
+                status=status.HTTP_409_CONFLICT,
+            )
+        if decided is None:
+            pr.refresh_from_db()
+            if pr.status != PurchaseRequest.STATUS_PENDING:
                 return Response(
-                    {"error": "Insufficient stock"},
+                    {"error": "Purchase request already processed"},
                     status=status.HTTP_400_BAD_REQUEST,
                 )
+            return Response(
+                {"error": "Purchase request is claimed by another user"},
+                status=status.HTTP_409_CONFLICT,
+            )
+        pr = decided
 
-            stock.quantity -= pr.quantity
-            stock.save(update_fields=["quantity"])
-
-            pr.status = PurchaseRequest.STATUS_APPROVED
-        else:
-            pr.status = PurchaseRequest.STATUS_REJECTED
-
-        pr.processed_by = user
-        pr.processed_at = timezone.now()
-        pr.save()
+        if decision == "APPROVED":
+            # One conditional UPDATE; no stock row lock across the checks above
+            try:
+                decrease_stock(warehouse.id, pr.product_id, pr.quantity)
+            except InsufficientStock:
+                if not Stock.objects.filter(product=pr.product, warehouse=warehouse).exists():
+                    response = Response(
+                        {"error": "Stock record not found for this product/warehouse"},
+                        status=status.HTTP_404_NOT_FOUND,
+                    )
+                else:
+                    response = Response(
+                        {"error": "Insufficient stock"},
+                        status=status.HTTP_400_BAD_REQUEST,
+                    )
+                # Undo the decision made above
+                transaction.set_rollback(True)
+                return response
+
+            record_movement(
+                warehouse_id=warehouse.id,
+                product_id=pr.product_id,
+                quantity_change=-pr.quantity,
+                kind=MovementKind.PURCHASE,
+                actor=user,
+                source=pr,
+            )
 
         PurchaseApproval.objects.create(
             purchase_request=pr,
@@ -694,8 +849,124 @@ class PurchaseApproveAPIView(APIView):
             decision=decision,
         )
 
+        publish(PurchaseDecided(
+            purchase_request_id=pr.id,
+            warehouse_id=warehouse.id,
+            product_id=pr.product_id,
+            quantity=pr.quantity,
+            decision=decision,
+            actor_id=user.id,
+        ))
+
         return Response({"status": pr.status}, status=status.HTTP_200_OK)
 
+    def _decide_order(self, request, validated_data):
+        """
+        Approve or reject a whole purchase order (all lines, one transaction).
+        """
+        try:
+            ok, report = decide_purchase_order(
+                validated_data["purchase_order_id"], validated_data["decision"], request.user
+            )
+        except PurchaseOrder.DoesNotExist:
+            return Response({"error": "Purchase order not found"}, status=status.HTTP_404_NOT_FOUND)
+
+        return Response(report, status=status.HTTP_200_OK if ok else status.HTTP_400_BAD_REQUEST)
+
+
+class PurchaseRequestClaimAPIView(APIView):
+    """
+    Claim the next pending purchase requests of a warehouse (FIFO) for a
+    lease. Staff claim for their own warehouse; managers and admins pass
+    warehouse_id. Rows another user holds or is claiming are skipped.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        serializer = PurchaseClaimSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        user = request.user
+        warehouse_id = serializer.validated_data.get("warehouse_id")
+
+        if user.role.name == Role.STAFF:
+            staff = Staff.objects.filter(user=user, warehouse__isnull=False).first()
+            if not (user.is_active and staff):
+                return Response({"error": "You are not assigned to a warehouse"}, status=status.HTTP_403_FORBIDDEN)
+            warehouse_id = staff.warehouse_id
+        elif user.role.name in (Role.ADMIN, Role.MANAGER):
+            if warehouse_id is None:
+                return Response({"error": "warehouse_id is required"}, status=status.HTTP_400_BAD_REQUEST)
+            if user.role.name == Role.MANAGER and not Warehouse.objects.filter(
+                id=warehouse_id, manager__user=user
+            ).exists():
+                return Response({"error": "Forbidden"}, status=status.HTTP_403_FORBIDDEN)
+        else:
+            return Response({"error": "Forbidden"}, status=status.HTTP_403_FORBIDDEN)
+
+        claimed, expires_at = claim_purchase_requests(
+            user, warehouse_id, serializer.validated_data["limit"]
+        )
+        return Response(
+            {
+                "warehouse_id": warehouse_id,
+                "claim_expires_at": expires_at,
+                "results": [
+                    {
+                        "id": pr.id,
+                        "product": pr.product.name,
+                        "product_id": pr.product_id,
+                        "warehouse": pr.warehouse.name,
+                        "quantity": pr.quantity,
+                        "status": pr.status,
+                        "requested_by": pr.viewer.username,
+                        "created_at": pr.created_at,
+                    }
+                    for pr in claimed
+                ],
+            },
+            status=status.HTTP_200_OK,
+        )
+
+
+class PurchaseRequestReleaseAPIView(APIView):
+    """
+    Return claimed purchase requests to the queue before the lease expires.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        serializer = PurchaseReleaseSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        released = release_purchase_requests(
+            request.user, serializer.validated_data["purchase_request_ids"]
+        )
+        return Response({"released": released}, status=status.HTTP_200_OK)
+
+
+class PurchaseBatchApproveAPIView(APIView):
+    """
+    Approve or reject a list of purchase requests in one transaction.
+    With partial=false (default) the batch is all-or-nothing.
+    """
+    permission_classes = [IsAuthenticated]
+
+    @idempotent
+    def post(self, request):
+        if request.user.role.name not in (Role.ADMIN, Role.MANAGER, Role.STAFF):
+            return Response({"error": "Forbidden"}, status=status.HTTP_403_FORBIDDEN)
+
+        serializer = PurchaseBatchApprovalSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        ok, report = decide_purchase_requests(
+            serializer.validated_data["purchase_request_ids"],
+            serializer.validated_data["decision"],
+            request.user,
+            partial=serializer.validated_data["partial"],
+        )
+        return Response(report, status=status.HTTP_200_OK if ok else status.HTTP_400_BAD_REQUEST)
 
 
 class PurchaseRequestListAPIView(APIView):
@@ -710,12 +981,6 @@ class PurchaseRequestListAPIView(APIView):
         elif user.role.name == Role.MANAGER:
             warehouses = Warehouse.objects.filter(manager__user=user)
             qs = PurchaseRequest.objects.filter(warehouse__in=warehouses)
-            try:
-                with open('qs_debug.log', 'a') as f:
-                    f.write(f"\n[PRList] Manager: {user.username}")
-                    f.write(f"\n[PRList] Warehouses: {list(warehouses.values_list('id', flat=True))}")
-                    f.write(f"\n[PRList] QS Count: {qs.count()}")
-            except: pass
 
         elif user.role.name == Role.STAFF:
             # Allow staff to see ALL requests for their assigned warehouse
@@ -762,15 +1027,14 @@ class PurchaseRequestListAPIView(APIView):
         if ordering not in allowed_ordering:
             ordering = "-id"
 
-        qs = qs.select_related("product", "warehouse", "viewer").order_by(ordering)
-        
-        try:
-             with open('qs_debug.log', 'a') as f:
-                 f.write(f"\n[PRList] Final QS Count: {qs.count()}")
-        except: pass
+        qs = qs.select_related("product", "warehouse", "viewer")
 
-        paginator = StandardResultsSetPagination()
-        page = paginator.paginate_queryset(qs, request)
+        if wants_cursor_pagination(request.query_params):
+            paginator = KeysetPagination()
+            page = paginator.paginate_queryset(qs, request, ordering=ordering)
+        else:
+            paginator = StandardResultsSetPagination()
+            page = paginator.paginate_queryset(qs.order_by(ordering), request)
 
         data = []
         for pr in page:
@@ -784,6 +1048,7 @@ class PurchaseRequestListAPIView(APIView):
                     "requested_by": pr.viewer.username, # Viewer IS the requester
                     "processed_at": pr.processed_at,
                     "viewer": pr.viewer.username, 
+                    "order_id": pr.order_id,
                 }
             )
 
@@ -796,6 +1061,7 @@ class PurchaseRequestListAPIView(APIView):
 class TransferRequestCreateAPIView(APIView):
     permission_classes = [IsAuthenticated]
 
+    @idempotent
     def post(self, request):
         serializer = TransferRequestCreateSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
@@ -811,19 +1077,43 @@ class TransferRequestCreateAPIView(APIView):
         )
 
 
+def _decide_transfer_document(request, validated_data):
+    """
+    Approve or reject a whole transfer document (all lines, one transaction).
+    """
+    try:
+        ok, report = decide_transfer_document(
+            validated_data["transfer_document_id"], validated_data["decision"], request.user
+        )
+    except TransferDocument.DoesNotExist:
+        return Response({"error": "Transfer document not found"}, status=status.HTTP_404_NOT_FOUND)
+
+    return Response(report, status=status.HTTP_200_OK if ok else status.HTTP_400_BAD_REQUEST)
+
 
 class TransferApproveAPIView(APIView):
     permission_classes = [IsManagerOrAdmin]
 
+    @idempotent
     @transaction.atomic
     def post(self, request):
         serializer = TransferApprovalSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
 
-        tr = TransferRequest.objects.select_for_update().get(
+        if "transfer_document_id" in serializer.validated_data:
+            return _decide_transfer_document(request, serializer.validated_data)
+
+        # Not locked: the status change below is a compare-and-swap on version
+        tr = TransferRequest.objects.get(
             id=serializer.validated_data["transfer_request_id"]
         )
 
+        if tr.document_id is not None:
+            return Response(
+                {"error": f"Part of transfer document {tr.document_id}; decide the document instead"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
         # 🔒 Permission Check: Admin or Source Warehouse Manager
         if request.user.role.name == Role.MANAGER:
             # Check if user manages the source warehouse
@@ -839,35 +1129,68 @@ class TransferApproveAPIView(APIView):
         if tr.status != TransferRequest.STATUS_PENDING:
              return Response({"error": "Request already processed"}, status=400)
 
-        if decision == "APPROVED":
-            src = Stock.objects.select_for_update().get(
-                product=tr.product,
-                warehouse=tr.source_warehouse,
+        now = timezone.now()
+        new_status = (
+            TransferRequest.STATUS_APPROVED if decision == "APPROVED" else TransferRequest.STATUS_REJECTED
+        )
+
+        def decide(current):
+            # Re-checked on every attempt: another approver may have got there first
+            if current.status != TransferRequest.STATUS_PENDING:
+                return None
+            current.status = new_status
+            current.approved_by = request.user
+            current.approved_at = now
+            return ["status", "approved_by", "approved_at"]
+
+        # Decide first, so only the approver that wins the request moves stock
+        try:
+            decided = cas_update(TransferRequest, tr.id, decide)
+        except ConcurrentUpdate:
+            return Response(
+                {"error": "Transfer request was modified concurrently; reload and retry"},
+                status=status.HTTP_409_CONFLICT,
             )
-            if src.quantity < tr.quantity:
+        if decided is None:
+            return Response({"error": "Request already processed"}, status=400)
+        tr = decided
+
+        if decision == "APPROVED":
+            try:
+                transfer_stock(
+                    tr.source_warehouse_id,
+                    tr.destination_warehouse_id,
+                    tr.product_id,
+                    tr.quantity,
+                )
+            except InsufficientStock:
+                # Undo the decision made above
+                transaction.set_rollback(True)
                 return Response(
                     {"error": "Insufficient stock"},
                     status=status.HTTP_400_BAD_REQUEST,
                 )
 
-            dst, _ = Stock.objects.get_or_create(
-                product=tr.product,
-                warehouse=tr.destination_warehouse,
-                defaults={"quantity": 0},
-            )
-
-            src.quantity -= tr.quantity
-            dst.quantity += tr.quantity
-            src.save()
-            dst.save()
-
-            tr.status = TransferRequest.STATUS_APPROVED
-        else:
-            tr.status = TransferRequest.STATUS_REJECTED
-
-        tr.approved_by = request.user
-        tr.approved_at = timezone.now()
-        tr.save()
+            record_movements([
+                build_movement(
+                    warehouse_id=tr.source_warehouse_id,
+                    product_id=tr.product_id,
+                    quantity_change=-tr.quantity,
+                    kind=MovementKind.TRANSFER_OUT,
+                    actor=request.user,
+                    counterpart_warehouse_id=tr.destination_warehouse_id,
+                    source=tr,
+                ),
+                build_movement(
+                    warehouse_id=tr.destination_warehouse_id,
+                    product_id=tr.product_id,
+                    quantity_change=tr.quantity,
+                    kind=MovementKind.TRANSFER_IN,
+                    actor=request.user,
+                    counterpart_warehouse_id=tr.source_warehouse_id,
+                    source=tr,
+                ),
+            ])
 
         TransferApproval.objects.create(
             transfer_request=tr,
@@ -875,6 +1198,16 @@ class TransferApproveAPIView(APIView):
             decision=decision,
         )
 
+        publish(TransferDecided(
+            transfer_request_id=tr.id,
+            source_warehouse_id=tr.source_warehouse_id,
+            destination_warehouse_id=tr.destination_warehouse_id,
+            product_id=tr.product_id,
+            quantity=tr.quantity,
+            decision=decision,
+            actor_id=request.user.id,
+        ))
+
         return Response({"status": tr.status})
 
 
@@ -953,7 +1286,11 @@ class TransferRequestListAPIView(APIView):
 class TransferRequestCreateAPIView(APIView):
     permission_classes = [IsManager]
 
+    @idempotent
     def post(self, request):
+        if "lines" in request.data:
+            return self._create_document(request)
+
         serializer = TransferRequestCreateSerializer(
             data=request.data,
             context={"request": request},
@@ -983,20 +1320,60 @@ class TransferRequestCreateAPIView(APIView):
             status=status.HTTP_201_CREATED,
         )
 
+    def _create_document(self, request):
+        serializer = TransferDocumentCreateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        destination_warehouse = serializer.validated_data["destination_warehouse"]
+        if (
+            destination_warehouse.manager is None
+            or destination_warehouse.manager.user != request.user
+        ):
+            return Response(
+                {"error": "Only destination warehouse manager can request transfers"},
+                status=status.HTTP_403_FORBIDDEN,
+            )
+
+        document = create_transfer_document(
+            request.user,
+            serializer.validated_data["source_warehouse"],
+            destination_warehouse,
+            serializer.validated_data["lines"],
+        )
+        return Response(
+            {
+                "transfer_document_id": document.id,
+                "status": document.status,
+                "lines": len(serializer.validated_data["lines"]),
+            },
+            status=status.HTTP_201_CREATED,
+        )
+
 
 
 class TransferApproveAPIView(APIView):
     permission_classes = [IsManagerOrAdmin]
 
+    @idempotent
     @transaction.atomic
     def post(self, request):
         serializer = TransferApprovalSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
 
-        tr = TransferRequest.objects.select_for_update().get(
+        if "transfer_document_id" in serializer.validated_data:
+            return _decide_transfer_document(request, serializer.validated_data)
+
+        # Not locked: the status change below is a compare-and-swap on version
+        tr = TransferRequest.objects.get(
             id=serializer.validated_data["transfer_request_id"]
         )
 
+        if tr.document_id is not None:
+            return Response(
+                {"error": f"Part of transfer document {tr.document_id}; decide the document instead"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
         # 🔒 Permission Check: Admin or Source Warehouse Manager
         if request.user.role.name == Role.MANAGER:
             # Check if user manages the source warehouse
@@ -1008,37 +1385,71 @@ class TransferApproveAPIView(APIView):
 
         decision = serializer.validated_data["decision"]
 
-        if decision == "APPROVED":
-            src = Stock.objects.select_for_update().get(
-                product=tr.product,
-                warehouse=tr.source_warehouse,
+        if tr.status != TransferRequest.STATUS_PENDING:
+            return Response({"error": "Request already processed"}, status=400)
+
+        now = timezone.now()
+        new_status = (
+            TransferRequest.STATUS_APPROVED if decision == "APPROVED" else TransferRequest.STATUS_REJECTED
+        )
+
+        def decide(current):
+            # Re-checked on every attempt: another approver may have got there first
+            if current.status != TransferRequest.STATUS_PENDING:
+                return None
+            current.status = new_status
+            current.approved_by = request.user
+            current.approved_at = now
+            return ["status", "approved_by", "approved_at"]
+
+        # Decide first, so only the approver that wins the request moves stock
+        try:
+            decided = cas_update(TransferRequest, tr.id, decide)
+        except ConcurrentUpdate:
+            return Response(
+                {"error": "Transfer request was modified concurrently; reload and retry"},
+                status=status.HTTP_409_CONFLICT,
             )
-            if src.quantity < tr.quantity:
+        if decided is None:
+            return Response({"error": "Request already processed"}, status=400)
+        tr = decided
+
+        if decision == "APPROVED":
+            try:
+                transfer_stock(
+                    tr.source_warehouse_id,
+                    tr.destination_warehouse_id,
+                    tr.product_id,
+                    tr.quantity,
+                )
+            except InsufficientStock:
+                # Undo the decision made above
+                transaction.set_rollback(True)
                 return Response(
                     {"error": "Insufficient stock"},
                     status=status.HTTP_400_BAD_REQUEST,
                 )
 
-            dst, _ = Stock.objects.get_or_create(
-                product=tr.product,
-                warehouse=tr.destination_warehouse,
-                defaults={"quantity": 0},
-            )
-
-            src.quantity -= tr.quantity
-            dst.quantity += tr.quantity
-            src.save()
-            dst.save()
-
-            tr.status = TransferRequest.STATUS_APPROVED
-            tr.approved_by = request.user  # Record approver
-            tr.approved_at = timezone.now()
-        else:
-            tr.status = TransferRequest.STATUS_REJECTED
-            tr.approved_by = request.user # Record rejecter
-            tr.approved_at = timezone.now()
-
-        tr.save()
+            record_movements([
+                build_movement(
+                    warehouse_id=tr.source_warehouse_id,
+                    product_id=tr.product_id,
+                    quantity_change=-tr.quantity,
+                    kind=MovementKind.TRANSFER_OUT,
+                    actor=request.user,
+                    counterpart_warehouse_id=tr.destination_warehouse_id,
+                    source=tr,
+                ),
+                build_movement(
+                    warehouse_id=tr.destination_warehouse_id,
+                    product_id=tr.product_id,
+                    quantity_change=tr.quantity,
+                    kind=MovementKind.TRANSFER_IN,
+                    actor=request.user,
+                    counterpart_warehouse_id=tr.source_warehouse_id,
+                    source=tr,
+                ),
+            ])
 
         TransferApproval.objects.create(
             transfer_request=tr,
@@ -1046,9 +1457,40 @@ class TransferApproveAPIView(APIView):
             decision=decision,
         )
 
+        publish(TransferDecided(
+            transfer_request_id=tr.id,
+            source_warehouse_id=tr.source_warehouse_id,
+            destination_warehouse_id=tr.destination_warehouse_id,
+            product_id=tr.product_id,
+            quantity=tr.quantity,
+            decision=decision,
+            actor_id=request.user.id,
+        ))
+
         return Response({"status": tr.status})
 
 
+class TransferBatchApproveAPIView(APIView):
+    """
+    Approve or reject a list of transfer requests in one transaction.
+    With partial=false (default) the batch is all-or-nothing.
+    """
+    permission_classes = [IsManagerOrAdmin]
+
+    @idempotent
+    def post(self, request):
+        serializer = TransferBatchApprovalSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        ok, report = decide_transfer_requests(
+            serializer.validated_data["transfer_request_ids"],
+            serializer.validated_data["decision"],
+            request.user,
+            partial=serializer.validated_data["partial"],
+        )
+        return Response(report, status=status.HTTP_200_OK if ok else status.HTTP_400_BAD_REQUEST)
+
+
 class TransferRequestListAPIView(APIView):
     permission_classes = [IsAuthenticated]
 
@@ -1068,8 +1510,15 @@ class TransferRequestListAPIView(APIView):
         else:
             qs = TransferRequest.objects.none()
 
+        qs = qs.select_related("product", "source_warehouse", "destination_warehouse")
+
+        paginator = None
+        if wants_cursor_pagination(request.query_params):
+            paginator = KeysetPagination()
+            qs = paginator.paginate_queryset(qs, request, ordering="-id")
+
         data = []
-        for tr in qs.select_related("product", "source_warehouse", "destination_warehouse"):
+        for tr in qs:
             # Determine if this user can approve
             can_approve = False
             if user.role.name == Role.ADMIN:
@@ -1087,10 +1536,13 @@ class TransferRequestListAPIView(APIView):
                     "status": tr.status,
                     "source_warehouse": tr.source_warehouse.name,
                     "destination_warehouse": tr.destination_warehouse.name,
-                    "can_approve": can_approve
+                    "can_approve": can_approve,
+                    "document_id": tr.document_id,
                 }
             )
 
+        if paginator is not None:
+            return paginator.get_paginated_response(data)
         return Response(data)
 
 
@@ -1100,6 +1552,7 @@ class TransferRequestListAPIView(APIView):
 class StaffApproveAPIView(APIView):
     permission_classes = [IsManagerOrAdmin]
 
+    @transaction.atomic
     def post(self, request):
         log_error(f"StaffApprove POST called by {request.user.username} Data: {request.data}")
         serializer = StaffApprovalSerializer(data=request.data)
@@ -1155,11 +1608,20 @@ class StaffApproveAPIView(APIView):
         # -------------------------------------------------
         # Approve staff
         # -------------------------------------------------
+        previous_warehouse_id = staff.warehouse_id
         staff.warehouse = warehouse
         staff.user.is_active = True
         staff.user.save(update_fields=["is_active"])
         staff.save(update_fields=["warehouse"])
 
+        publish(StaffAssigned(
+            staff_id=staff.id,
+            user_id=staff.user_id,
+            warehouse_id=warehouse.id,
+            previous_warehouse_id=previous_warehouse_id,
+            actor_id=request.user.id,
+        ))
+
         StaffApproval.objects.get_or_create(
             staff=staff,
             defaults={"approved_by": request.user},
@@ -1529,9 +1991,18 @@ class StaffDismissAPIView(APIView):
         staff.user.is_active = False
         staff.user.save(update_fields=["is_active"])
 
+        previous_warehouse_id = staff.warehouse_id
         staff.warehouse = None
         staff.save(update_fields=["warehouse"])
 
+        publish(StaffAssigned(
+            staff_id=staff.id,
+            user_id=staff.user_id,
+            warehouse_id=None,
+            previous_warehouse_id=previous_warehouse_id,
+            actor_id=request.user.id,
+        ))
+
         return Response(
             {"status": "STAFF_DISMISSED"},
             status=status.HTTP_200_OK
@@ -1655,18 +2126,6 @@ class MovementEventSerializer(serializers.Serializer):
     raw = serializers.DictField()  # optional raw data for debugging
 
 
-def _get_datetime_from(obj, candidates):
-    """
-    Helper: try several attribute names on obj (or related obj) and return first
-    non-None datetime. candidates is list of attr names e.g. ["created_at","processed_at","timestamp"].
-    """
-    for name in candidates:
-        val = getattr(obj, name, None)
-        if val:
-            return val
-    return None
-
-
 def _safe_getattr(obj, attr, default=None):
     try:
         return getattr(obj, attr, default)
@@ -1674,6 +2133,33 @@ def _safe_getattr(obj, attr, default=None):
         return default
 
 
+def _cursor_movement_history(user, warehouse_id, params, page_size, ordering):
+    """
+    Cursor mode for the dashboards' movement history. The token carries the
+    ordering and the merge key of the last event served; no totals are computed.
+    """
+    after = None
+    token = params.get("cursor")
+    if token:
+        values = decode_cursor(token)
+        if len(values) != 4 or values[0] != ordering:
+            raise NotFound("Cursor does not match the requested ordering")
+        after = values[1:]
+
+    events, next_key = get_recent_logs_after(
+        user=user,
+        warehouse_id=warehouse_id,
+        limit=page_size,
+        ordering=ordering,
+        after=after,
+    )
+    return {
+        "results": events,
+        "page_size": page_size,
+        "next_cursor": encode_cursor([ordering] + next_key) if next_key else None,
+    }
+
+
 class AdminDashboardAPIView(APIView):
     """
     GET /api/dashboard/admin/
@@ -1702,100 +2188,26 @@ class AdminDashboardAPIView(APIView):
             end = datetime.utcnow().date()
             start = end - timedelta(days=days - 1)
 
-        # build date labels (daily)
-        delta = (end - start).days + 1
-        labels = [(start + timedelta(days=i)).isoformat() for i in range(delta)]
-        net_by_date = {label: 0 for label in labels}
-
-        # ---- collect incoming/outgoing from approvals ----
-        # PURCHASE_APPROVAL (approved) => outgoing from warehouse (negative)
-        try:
-            purchase_approvals = PurchaseApproval.objects.select_related("purchase_request", "approver").all()
-        except Exception:
-            purchase_approvals = []
-
-        for pa in purchase_approvals:
-            # find timestamp
-            ts = _get_datetime_from(pa, ["created_at"]) or _get_datetime_from(pa.purchase_request, ["processed_at", "created_at"])
-            if ts is None:
-                continue
-            ts_date = ts.date().isoformat()
-            if ts_date < labels[0] or ts_date > labels[-1]:
-                continue
-            # treat approved as outgoing, else ignore
-            try:
-                decision = _safe_getattr(pa, "decision", None) or _safe_getattr(pa, "purchase_request", None) and _safe_getattr(pa.purchase_request, "status", None)
-            except Exception:
-                decision = None
-            # only consider APPROVED as outgoing
-            if decision and str(decision).upper().startswith("APPROV"):
-                qty = int(_safe_getattr(pa.purchase_request, "quantity", 0) or 0)
-                net_by_date[ts_date] -= qty
-
-        # TRANSFER_APPROVAL (approved) => outgoing at source (-) and incoming at destination (+)
-        try:
-            transfer_approvals = TransferApproval.objects.select_related("transfer_request", "approver").all()
-        except Exception:
-            transfer_approvals = []
-
-        for ta in transfer_approvals:
-            ts = _get_datetime_from(ta, ["created_at"]) or _get_datetime_from(ta.transfer_request, ["processed_at", "created_at"])
-            if ts is None:
-                continue
-            ts_date = ts.date().isoformat()
-            if ts_date < labels[0] or ts_date > labels[-1]:
-                continue
-            # only APPROVED
-            try:
-                decision = _safe_getattr(ta, "decision", None) or _safe_getattr(ta.transfer_request, "status", None)
-            except Exception:
-                decision = None
-            if decision and str(decision).upper().startswith("APPROV"):
-                qty = int(_safe_getattr(ta.transfer_request, "quantity", 0) or 0)
-                # outgoing
-                net_by_date[ts_date] -= qty
-                # incoming
-                net_by_date[ts_date] += qty  # net change cancels out globally, but this shows transfer movement;
-                # depending on your definition net change could ignore internal transfers - keep both for transparency
-
-        # prepare net_changes array in label order
-        net_changes = [net_by_date[label] for label in labels]
+        # ---- net movement per day from the daily rollup ----
+        daily = movement_trends(start, end, granularity="day")
+        labels = [bucket["bucket"] for bucket in daily]
+        net_changes = [bucket["net_change"] for bucket in daily]
 
         # ---- warehouse comparison ----
-        warehouses = Warehouse.objects.filter(is_deleted=False).select_related("manager").all()
+        warehouses = list(Warehouse.objects.filter(is_deleted=False).select_related("manager"))
+        default_threshold = int(request.query_params.get("default_threshold", DEFAULT_LOW_STOCK_THRESHOLD))
+        metrics = warehouse_metrics((w.id for w in warehouses), default_threshold=default_threshold)
+
         warehouse_list = []
         for w in warehouses:
-            stocks = Stock.objects.filter(warehouse=w).select_related("product")
-            total_qty = 0
-            total_value = 0
-            low_count = 0
-            product_count = stocks.values('product').distinct().count()  # Count unique products
-            
-            for s in stocks:
-                q = int(getattr(s, "quantity", 0) or 0)
-                total_qty += q
-                price = getattr(s.product, "price", None)
-                if price is not None:
-                    try:
-                        total_value += q * float(price)
-                    except Exception:
-                        total_value += 0
-                # threshold: prefer per-stock min_required_quantity if present, else default
-                threshold = getattr(s, "min_required_quantity", None)
-                if threshold is None:
-                    threshold = getattr(s, "threshold", None)
-                if threshold is None:
-                    threshold = int(request.query_params.get("default_threshold", DEFAULT_LOW_STOCK_THRESHOLD))
-                if q <= int(threshold):
-                    low_count += 1
-
+            stats = metrics[w.id]
             warehouse_list.append({
                 "warehouse_id": w.id,
                 "name": w.name,
-                "total_quantity": total_qty,
-                "total_value": int(total_value),
-                "product_count": product_count,
-                "low_stock_count": low_count,
+                "total_quantity": stats["total_quantity"],
+                "total_value": int(stats["total_value"]),
+                "product_count": stats["product_count"],
+                "low_stock_count": stats["low_stock_count"],
                 "manager": getattr(w.manager, "user_id", None) if getattr(w, "manager", None) else None,
             })
 
@@ -1815,48 +2227,30 @@ class AdminDashboardAPIView(APIView):
         
         # Get ordering param (default: -timestamp for newest first)
         ordering = request.GET.get('ordering', '-timestamp')
-        
-        # Fetch logs with larger limit for sorting/filtering
-        all_logs = get_recent_logs(user=request.user, warehouse_id=None, limit=1000)
-        
-        # Apply ordering with deterministic secondary sort (event_id)
-        # This ensures events with identical timestamps always appear in the same order
-        if ordering == 'timestamp':
-            all_logs.sort(key=lambda x: (x.get('timestamp') or x.get('raw_date'), x.get('event_id', 0)))
-        elif ordering == '-timestamp':
-            all_logs.sort(key=lambda x: (x.get('timestamp') or x.get('raw_date'), x.get('event_id', 0)), reverse=True)
-        elif ordering == 'performed_by':
-            all_logs.sort(key=lambda x: (x.get('performed_by', '').lower(), x.get('event_id', 0)))
-        elif ordering == '-performed_by':
-            all_logs.sort(key=lambda x: (x.get('performed_by', '').lower(), x.get('event_id', 0)), reverse=True)
-        elif ordering == 'event_type':
-            all_logs.sort(key=lambda x: (x.get('event_type', '').lower(), x.get('event_id', 0)))
-        elif ordering == '-event_type':
-            all_logs.sort(key=lambda x: (x.get('event_type', '').lower(), x.get('event_id', 0)), reverse=True)
-        else:
-            # Fallback to default if invalid ordering parameter
-            all_logs.sort(key=lambda x: (x.get('timestamp') or x.get('raw_date'), x.get('event_id', 0)), reverse=True)
-        
-        # Calculate pagination
-        total_count = len(all_logs)
-        start_idx = (page - 1) * page_size
-        end_idx = start_idx + page_size
-        
-        # Handle out-of-bounds page requests gracefully
-        if start_idx >= total_count and total_count > 0:
-            # Requested page is beyond available data, return empty results
-            # Frontend will handle this by resetting to page 1
-            paginated_logs = []
+
+        if wants_cursor_pagination(request.GET):
+            movement_history = _cursor_movement_history(
+                request.user, None, request.GET, page_size, ordering
+            )
         else:
-            paginated_logs = all_logs[start_idx:end_idx]
-        
-        movement_history = {
-            "results": paginated_logs,
-            "count": total_count,
-            "page": page,
-            "page_size": page_size,
-            "total_pages": (total_count + page_size - 1) // page_size if page_size > 0 else 0
-        }
+            # Ordering and the page window are pushed down to each log source;
+            # out-of-bounds pages come back empty (frontend resets to page 1)
+            paginated_logs = get_recent_logs(
+                user=request.user,
+                warehouse_id=None,
+                limit=page_size,
+                offset=(page - 1) * page_size,
+                ordering=ordering,
+            )
+            total_count = count_recent_logs(warehouse_id=None)
+
+            movement_history = {
+                "results": paginated_logs,
+                "count": total_count,
+                "page": page,
+                "page_size": page_size,
+                "total_pages": (total_count + page_size - 1) // page_size if page_size > 0 else 0
+            }
 
         # ---- AGGREGATED STATS FOR KPIs ----
         # Total warehouses (active)
@@ -1865,45 +2259,21 @@ class AdminDashboardAPIView(APIView):
         # Total products (active)
         total_products = Product.objects.filter(is_active=True).count()
         
-        # Total stock units (sum of all quantities)
-        from django.db.models import Sum
-        total_stock_units = Stock.objects.aggregate(total=Sum('quantity'))['total'] or 0
-        
-        # Low stock count and items (global)
-        low_stock_count = 0
-        low_stock_items_list = []
-        all_stocks = Stock.objects.filter(product__is_active=True).select_related('product', 'warehouse')
-        thresholds_map = {}
-        for threshold in LowStockThreshold.objects.all():
-            key = (threshold.warehouse_id, threshold.product_id)
-            thresholds_map[key] = threshold.threshold_quantity
-        
-        for stock in all_stocks:
-            key = (stock.warehouse_id, stock.product_id)
-            threshold = thresholds_map.get(key, 10)  # default 10
-            if stock.quantity < threshold:
-                low_stock_count += 1
-                # Add to list for widget display (limit to top 10)
-                if len(low_stock_items_list) < 10:
-                    low_stock_items_list.append({
-                        "stock_id": stock.id,
-                        "product": stock.product.name,
-                        "product_id": stock.product_id,
-                        "warehouse": stock.warehouse.name,
-                        "warehouse_id": stock.warehouse_id,
-                        "quantity": stock.quantity,
-                        "threshold": threshold,
-                        "status": "low"
-                    })
-        
+        # Stock KPIs are read from the per-warehouse summary rows
+        summary = get_global_summary()
+        total_stock_units = summary["total_units"]
+        low_stock_count = summary["low_stock_count"]
+
+        # Low stock items for the widget (10 furthest below threshold), from the low-stock state table
+        low_states = currently_low().filter(product__is_active=True)[:10]
+        low_stock_items_list = [low_state_item(state) for state in low_states]
+
         # Recent purchase requests (latest 10 regardless of status)
         recent_purchases_qs = PurchaseRequest.objects.select_related(
             'product', 'warehouse', 'viewer'
         ).order_by('-created_at')[:10]
         
-        pending_purchase_requests = PurchaseRequest.objects.filter(
-            status=PurchaseRequest.STATUS_PENDING
-        ).count()
+        pending_purchase_requests = summary["pending_purchase_count"]
         
         recent_purchase_requests_list = []
         for pr in recent_purchases_qs:
@@ -1925,25 +2295,16 @@ class AdminDashboardAPIView(APIView):
             status=TransferRequest.STATUS_PENDING
         ).count()
 
-        # Calculate Active Scope metrics (last 30 days)
-        thirty_days_ago = timezone.now() - timedelta(days=30)
+        # Calculate Active Scope metrics (last 30 days) from the daily rollup
+        thirty_days_ago = (timezone.now() - timedelta(days=30)).date()
+
+        # Approved purchases stand in for Stock In
+        stock_in = movement_totals(thirty_days_ago, [MovementKind.PURCHASE], side="out")
 
-        
-        # Stock movements (in/out)
-        # Using Approved Purchase Requests as proxy for Stock In since StockMovement doesn't exist
-        stock_in = PurchaseRequest.objects.filter(
-             created_at__gte=thirty_days_ago,
-             status=PurchaseRequest.STATUS_APPROVED
-        ).aggregate(total=Sum('quantity'))['total'] or 0
-        
         stock_out = 0  # No sales/order model yet
-        
-        # Transfer movements (in/out based on completed transfers)
-        transfers_in = TransferRequest.objects.filter(
-            created_at__gte=thirty_days_ago,
-            status=TransferRequest.STATUS_APPROVED
-        ).aggregate(total=Sum('quantity'))['total'] or 0
-        
+
+        transfers_in = movement_totals(thirty_days_ago, [MovementKind.TRANSFER_IN], side="in")
+
         transfers_out = transfers_in  # For global view, transfers in = transfers out
 
         data = {
@@ -1983,6 +2344,7 @@ class WarehouseDashboardAPIView(APIView):
     """
     POST /api/dashboard/warehouse/
     Body JSON (required): {"warehouse_id": <int>, "page": <int>, "page_size": <int>}
+    Cursor mode (optional): {"pagination": "cursor", "cursor": <next_cursor>} instead of "page"
     Permissions:
       - Admin: can view any warehouse
       - Manager: only if manager of that warehouse
@@ -2023,89 +2385,55 @@ class WarehouseDashboardAPIView(APIView):
         # pagination and ordering
         page = int(data.get("page", 1))
         page_size = int(data.get("page_size", 20))
-        page_size = min(page_size, 100)  # Max 100 per page
+        page_size = max(1, min(page_size, 100))  # Max 100 per page
         
         # Get ordering param (default: -timestamp for newest first)
         ordering = request.GET.get('ordering', '-timestamp')
-        
-        # Fetch logs for this warehouse
-        events = get_recent_logs(user=user, warehouse_id=warehouse.id, limit=1000)
-        
-        # Apply ordering
-        if ordering == 'timestamp':
-            events.sort(key=lambda x: (x.get('timestamp') or x.get('raw_date'), x.get('event_id', 0)))
-        elif ordering == '-timestamp':
-            events.sort(key=lambda x: (x.get('timestamp') or x.get('raw_date'), x.get('event_id', 0)), reverse=True)
-        elif ordering == 'performed_by':
-            events.sort(key=lambda x: (x.get('performed_by', '').lower(), x.get('event_id', 0)))
-        elif ordering == '-performed_by':
-            events.sort(key=lambda x: (x.get('performed_by', '').lower(), x.get('event_id', 0)), reverse=True)
-        elif ordering == 'event_type':
-            events.sort(key=lambda x: (x.get('event_type', '').lower(), x.get('event_id', 0)))
-        elif ordering == '-event_type':
-            events.sort(key=lambda x: (x.get('event_type', '').lower(), x.get('event_id', 0)), reverse=True)
-        
-        # Manual pagination on the list
-        paginator = Paginator(events, page_size)
-        try:
-            page_obj = paginator.page(page)
-        except Exception:
-            page_obj = paginator.page(1)
-            
-        # We need to serialize if get_recent_logs returns dicts? 
-        # get_recent_logs returns list of dicts. 
-        # MovementEventSerializer expects dicts matching fields.
-        # But wait, get_recent_logs returns dicts already formatted.
-        # We can just return them directly or pass through serializer validation?
-        # Serializer adds validation but for read-only it's just keys.
-        # Let's return the results directly as they are already dicts. 
-        # But check if frontend expects specific keys.
-        # Existing serializer `MovementEventSerializer` might transpose keys?
-        # Based on previous code, it just returned the dicts.
-
-        # low stock alerts and items
+
+        if wants_cursor_pagination(data):
+            movement_history = _cursor_movement_history(
+                user, warehouse.id, data, page_size, ordering
+            )
+        else:
+            # Fetch only the requested page of logs for this warehouse
+            total_items = count_recent_logs(warehouse_id=warehouse.id)
+            num_pages = max(1, (total_items + page_size - 1) // page_size)
+            page_number = page if 1 <= page <= num_pages else 1
+
+            events = get_recent_logs(
+                user=user,
+                warehouse_id=warehouse.id,
+                limit=page_size,
+                offset=(page_number - 1) * page_size,
+                ordering=ordering,
+            )
+            movement_history = {
+                "page": page,
+                "page_size": page_size,
+                "total_pages": num_pages,
+                "total_items": total_items,
+                "results": events, # already list of dicts
+            }
+
+        # stats come from the precomputed summary row
+        summary = get_warehouse_summary(warehouse.id)
+        total_stock_units = summary.total_units
+        low_stock_count = summary.low_stock_count
+        total_products = summary.distinct_products
+        pending_purchase_requests = summary.pending_purchase_count
+        pending_transfer_requests = summary.pending_transfer_count
+
+        # low stock alerts: read from the low-stock state table
+        low_alerts = [low_state_item(state) for state in currently_low(warehouse.id)]
+
+        # stock rows feed the top-product charts below
         stocks = Stock.objects.filter(warehouse=warehouse).select_related("product")
-        low_alerts = []
-        total_stock_units = 0
-        low_stock_count = 0
-        
-        # Build threshold map for this warehouse
-        thresholds_map = {}
-        for threshold in LowStockThreshold.objects.filter(warehouse=warehouse):
-            thresholds_map[threshold.product_id] = threshold.threshold_quantity
-        
-        for s in stocks:
-            q = int(getattr(s, "quantity", 0) or 0)
-            total_stock_units += q
-            
-            threshold = thresholds_map.get(s.product_id, DEFAULT_LOW_STOCK_THRESHOLD)  # default threshold
-            
-            if q < threshold:
-                low_stock_count += 1
-                low_alerts.append({
-                    "stock_id": s.id,
-                    "product": _safe_getattr(s.product, "name", str(_safe_getattr(s, "product", ""))),
-                    "product_id": s.product_id,
-                    "warehouse": warehouse.name,
-                    "warehouse_id": warehouse.id,
-                    "quantity": q,
-                    "threshold": int(threshold),
-                    "status": "low"
-                })
-
-        # Count unique products in this warehouse
-        total_products = stocks.values('product').distinct().count()
         
         # Recent purchase requests (latest 10 regardless of status)
         recent_purchases_qs = PurchaseRequest.objects.filter(
             warehouse=warehouse
         ).select_related('product', 'viewer').order_by('-created_at')[:10]
         
-        pending_purchase_requests = PurchaseRequest.objects.filter(
-            warehouse=warehouse,
-            status=PurchaseRequest.STATUS_PENDING
-        ).count()
-        
         recent_purchase_requests_list = []
         for pr in recent_purchases_qs:
             recent_purchase_requests_list.append({
@@ -2121,67 +2449,33 @@ class WarehouseDashboardAPIView(APIView):
                 "created_at": pr.created_at.isoformat() if pr.created_at else None
             })
         
-        # Pending transfer requests (in or out)
-        from django.db.models import Q
-        pending_transfer_requests = TransferRequest.objects.filter(
-            Q(source_warehouse=warehouse) | Q(destination_warehouse=warehouse),
-            status=TransferRequest.STATUS_PENDING
-        ).count()
+        # Calculate Active Scope metrics for this warehouse (last 30 days) from the daily rollup
+        thirty_days_ago = (timezone.now() - timedelta(days=30)).date()
+
+        # Approved purchases stand in for Stock In
+        stock_in = movement_totals(
+            thirty_days_ago, [MovementKind.PURCHASE], warehouse_id=warehouse.id, side="out"
+        )
 
-        # Calculate Active Scope metrics for this warehouse (last 30 days)
-        from datetime import timedelta
-        from django.utils import timezone
-        from django.db.models import Sum
-        
-        thirty_days_ago = timezone.now() - timedelta(days=30)
-        
-        # Stock movements (in/out) for this warehouse
-        # Using Approved Purchase Requests as proxy for Stock In since StockMovement doesn't exist
-        stock_in = PurchaseRequest.objects.filter(
-            warehouse=warehouse,
-            created_at__gte=thirty_days_ago,
-            status=PurchaseRequest.STATUS_APPROVED
-        ).aggregate(total=Sum('quantity'))['total'] or 0
-        
         stock_out = 0  # No sales/order model yet
-        
-        # Transfer movements (in/out) for this warehouse
-        transfers_in = TransferRequest.objects.filter(
-            destination_warehouse=warehouse,
-            created_at__gte=thirty_days_ago,
-            status=TransferRequest.STATUS_APPROVED
-        ).aggregate(total=Sum('quantity'))['total'] or 0
-        
-        transfers_out = TransferRequest.objects.filter(
-            source_warehouse=warehouse,
-            created_at__gte=thirty_days_ago,
-            status=TransferRequest.STATUS_APPROVED
-        ).aggregate(total=Sum('quantity'))['total'] or 0
+
+        transfers_in = movement_totals(
+            thirty_days_ago, [MovementKind.TRANSFER_IN], warehouse_id=warehouse.id, side="in"
+        )
+        transfers_out = movement_totals(
+            thirty_days_ago, [MovementKind.TRANSFER_OUT], warehouse_id=warehouse.id, side="out"
+        )
 
         # ---- Prepare chart data for visualization ----
-        # Build list of products with quantity and value
-        product_data = []
-        for s in stocks:
-            q = int(getattr(s, "quantity", 0) or 0)
-            price = getattr(s.product, "price", None)
-            value = 0
-            if price is not None:
-                try:
-                    value = q * float(price)
-                except Exception:
-                    value = 0
-            
-            product_data.append({
-                "name": s.product.name,
-                "quantity": q,
-                "value": int(value)
-            })
-        
-        # Sort and get top 10 by quantity
-        top_by_quantity = sorted(product_data, key=lambda x: x["quantity"], reverse=True)[:10]
-        
-        # Sort and get top 10 by value
-        top_by_value = sorted(product_data, key=lambda x: x["value"], reverse=True)[:10]
+        # Top 10 products by quantity and by value, ranked in the database
+        top_by_quantity = [
+            {"name": s.product.name, "quantity": int(s.quantity or 0)}
+            for s in stocks.order_by("-quantity", "id")[:10]
+        ]
+        top_by_value = [
+            {"name": s.product.name, "value": int(s.stock_value or 0)}
+            for s in stocks.annotate(stock_value=stock_value_expression()).order_by("-stock_value", "id")[:10]
+        ]
 
         return Response({
             "stats": {
@@ -2200,16 +2494,10 @@ class WarehouseDashboardAPIView(APIView):
             "low_stock_items": low_alerts,  # Use same field name as AdminDashboard
             "recent_purchase_requests": recent_purchase_requests_list,
             "chart_data": {
-                "top_products_quantity": [{"name": p["name"], "quantity": p["quantity"]} for p in top_by_quantity],
-                "top_products_value": [{"name": p["name"], "value": p["value"]} for p in top_by_value],
-            },
-            "movement_history": {
-                "page": page,
-                "page_size": page_size,
-                "total_pages": paginator.num_pages,
-                "total_items": paginator.count,
-                "results": page_obj.object_list, # already list of dicts
+                "top_products_quantity": top_by_quantity,
+                "top_products_value": top_by_value,
             },
+            "movement_history": movement_history,
             "low_stock_alerts": low_alerts,  # Keep for backward compat
         }, status=status.HTTP_200_OK)
 
@@ -2278,68 +2566,39 @@ class StockMovementReportAPIView(APIView):
         # Parse dates to full datetime range for safer filtering
         # Convert date objects to full datetime range for safer filtering
         # Convert date objects to full datetime range for safer filtering
-        start_dt = datetime.combine(start_date, datetime.min.time())
-        end_dt = datetime.combine(end_date, datetime.max.time())
-
-        # Purchases (outgoing)
-        purchases = PurchaseApproval.objects.filter(
-            purchase_request__warehouse__in=warehouses,
-            purchase_request__processed_at__range=(start_dt, end_dt),
-            decision="APPROVED",
-        ).select_related(
-            "purchase_request__product",
-            "purchase_request__warehouse",
-            "approver",
-        )
-
-        for p in purchases:
-            pr = p.purchase_request
-            p_date = pr.processed_at.strftime("%Y-%m-%d %H:%M") if pr.processed_at else "N/A"
-            movements.append({
-                "date": p_date,
-                "product": pr.product.name,
-                "quantity": -pr.quantity,
-                "source": pr.warehouse.name,
-                "destination": "Customer",
-                "performed_by": p.approver.username,
-            })
+        start_dt = timezone.make_aware(datetime.combine(start_date, datetime.min.time()))
+        end_dt = timezone.make_aware(datetime.combine(end_date, datetime.max.time()))
 
-        # Transfers
-        transfers = TransferApproval.objects.filter(
-            transfer_request__status="APPROVED",
-            transfer_request__created_at__range=(start_dt, end_dt),
-        ).filter(
-            Q(transfer_request__source_warehouse__in=warehouses)
-            | Q(transfer_request__destination_warehouse__in=warehouses)
+        ledger = StockMovement.objects.filter(
+            warehouse__in=warehouses,
+            created_at__range=(start_dt, end_dt),
         ).select_related(
-            "transfer_request__product",
-            "transfer_request__source_warehouse",
-            "transfer_request__destination_warehouse",
-            "approver",
-        )
-
-
-        for t in transfers:
-            tr = t.transfer_request
-
-            if tr.source_warehouse in warehouses:
-                qty = -tr.quantity
-                src = tr.source_warehouse.name
-                dst = tr.destination_warehouse.name
-            elif tr.destination_warehouse in warehouses:
-                qty = tr.quantity
-                src = tr.source_warehouse.name
-                dst = tr.destination_warehouse.name
+            "product",
+            "warehouse",
+            "counterpart_warehouse",
+            "actor",
+        ).order_by("created_at", "id")
+
+        for m in ledger:
+            here = m.warehouse.name
+            there = m.counterpart_warehouse.name if m.counterpart_warehouse else None
+
+            if m.kind == MovementKind.PURCHASE:
+                src, dst = here, "Customer"
+            elif m.kind == MovementKind.ASSIGN:
+                src, dst = "Supplier", here
+            elif m.quantity_change < 0:
+                src, dst = here, there
             else:
-                continue
+                src, dst = there, here
 
             movements.append({
-                "date": tr.created_at.strftime("%Y-%m-%d %H:%M"),
-                "product": tr.product.name,
-                "quantity": qty,
+                "date": m.created_at.strftime("%Y-%m-%d %H:%M"),
+                "product": m.product.name,
+                "quantity": m.quantity_change,
                 "source": src,
                 "destination": dst,
-                "performed_by": t.approver.username,
+                "performed_by": m.actor.username if m.actor else "System",
             })
 
         movements.sort(key=lambda x: x["date"])
@@ -2562,40 +2821,62 @@ class WarehouseDeleteConfirmAPIView(APIView):
             )
 
         # -------- STOCK MOVE --------
-        stocks = Stock.objects.filter(warehouse=warehouse)
-
-        if stocks.exists():
-            if "stock_map" not in data:
-                return Response(
-                    {"error": "stock_map required"},
-                    status=400
-                )
+        # Buffered receipts land first so they move with the rest; receipts
+        # another flusher is applying are waited for, not skipped
+        while flush_stock_receipts(warehouse_id=warehouse.id, skip_locked=False)[0]:
+            pass
+        stocks = Stock.objects.select_for_update().filter(warehouse=warehouse)
 
-            for stock in stocks:
-                dest_id = data["stock_map"].get(str(stock.product.id))
-                if not dest_id:
+        # Relocation touches many stock rows; refresh each summary once and
+        # publish all stock changes as one event
+        with deferred_summary_refresh(), batched_stock_changes():
+            if stocks.exists():
+                if "stock_map" not in data:
                     return Response(
-                        {"error": f"No destination for product {stock.product.id}"},
+                        {"error": "stock_map required"},
                         status=400
                     )
 
-                dest_wh = Warehouse.objects.get(id=dest_id, is_deleted=False)
-
-                dest_stock, _ = Stock.objects.get_or_create(
-                    warehouse=dest_wh,
-                    product=stock.product,
-                    defaults={"quantity": 0},
-                )
-
-                dest_stock.quantity += stock.quantity
-                dest_stock.save()
+                movements = []
+                for stock in stocks:
+                    dest_id = data["stock_map"].get(str(stock.product.id))
+                    if not dest_id:
+                        return Response(
+                            {"error": f"No destination for product {stock.product.id}"},
+                            status=400
+                        )
 
-            stocks.delete()
+                    dest_wh = Warehouse.objects.get(id=dest_id, is_deleted=False)
+
+                    increase_stock(dest_wh.id, stock.product_id, stock.quantity)
+
+                    if stock.quantity:
+                        movements.append(build_movement(
+                            warehouse_id=warehouse.id,
+                            product_id=stock.product_id,
+                            quantity_change=-stock.quantity,
+                            kind=MovementKind.RELOCATION_OUT,
+                            actor=request.user,
+                            counterpart_warehouse_id=dest_wh.id,
+                            source=warehouse,
+                        ))
+                        movements.append(build_movement(
+                            warehouse_id=dest_wh.id,
+                            product_id=stock.product_id,
+                            quantity_change=stock.quantity,
+                            kind=MovementKind.RELOCATION_IN,
+                            actor=request.user,
+                            counterpart_warehouse_id=warehouse.id,
+                            source=warehouse,
+                        ))
+
+                record_movements(movements)
+                stocks.delete()
 
-        # -------- STAFF REASSIGN --------
         # -------- STAFF REASSIGN --------
         staff_qs = Staff.objects.filter(warehouse=warehouse)
-        if staff_qs.exists():
+        staff_members = list(staff_qs.values_list("id", "user_id"))
+        if staff_members:
             sid = data.get("staff_reassign_warehouse_id")
             if sid:
                 try:
@@ -2606,8 +2887,20 @@ class WarehouseDeleteConfirmAPIView(APIView):
             else:
                 # Fallback: If no ID provided, just unassign them
                 # This prevents the "required" deadlock
+                new_wh = None
                 staff_qs.update(warehouse=None)
 
+            publish(*[
+                StaffAssigned(
+                    staff_id=staff_id,
+                    user_id=user_id,
+                    warehouse_id=new_wh.id if new_wh else None,
+                    previous_warehouse_id=warehouse.id,
+                    actor_id=request.user.id,
+                )
+                for staff_id, user_id in staff_members
+            ])
+
         # -------- MANAGER HANDLING --------
         manager = getattr(warehouse, "manager", None)
 
@@ -2642,6 +2935,8 @@ class WarehouseDeleteConfirmAPIView(APIView):
         warehouse.deleted_by = request.user
         warehouse.save(update_fields=["is_deleted", "deleted_by"])
 
+        publish(WarehouseDeleted(warehouse_id=warehouse.id, actor_id=request.user.id))
+
         return Response({
             "status": "WAREHOUSE_DELETED",
             "warehouse_id": warehouse.id
@@ -2690,6 +2985,7 @@ class StaffTransferRequestListCreateAPIView(APIView):
         serializer = StaffTransferRequestSerializer(qs, many=True)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
+    @idempotent
     def post(self, request):
         log_error(f"StaffTransfer POST called by {request.user.username} (Role: {request.user.role.name}) Data: {request.data}")
         user = request.user
@@ -2748,39 +3044,49 @@ class StaffTransferRequestListCreateAPIView(APIView):
 
         # Create Request
         try:
-            transfer_req = StaffTransferRequest.objects.create(
-                staff=target_staff,
-                target_warehouse=target_wh,
-                requested_by=user,
-                status=StaffTransferRequest.STATUS_PENDING
-            )
+            with transaction.atomic():
+                transfer_req = StaffTransferRequest.objects.create(
+                    staff=target_staff,
+                    target_warehouse=target_wh,
+                    requested_by=user,
+                    status=StaffTransferRequest.STATUS_PENDING
+                )
             
-            # AUTO-APPROVE Logic for Admin or Dual-Manager
-            should_auto_approve = False
-            if user.role.name == Role.ADMIN:
-                should_auto_approve = True
-            elif user.role.name == Role.MANAGER:
-                # Check if manager manages BOTH source and target
-                source_wh = transfer_req.staff.warehouse
-                target_wh = transfer_req.target_warehouse
-                 # Check Source
-                is_source_mgr = source_wh and source_wh.manager and source_wh.manager.user == user
-                # Check Target
-                is_target_mgr = target_wh.manager and target_wh.manager.user == user
-                
-                if is_source_mgr and is_target_mgr:
+                # AUTO-APPROVE Logic for Admin or Dual-Manager
+                should_auto_approve = False
+                if user.role.name == Role.ADMIN:
                     should_auto_approve = True
+                elif user.role.name == Role.MANAGER:
+                    # Check if manager manages BOTH source and target
+                    source_wh = transfer_req.staff.warehouse
+                    target_wh = transfer_req.target_warehouse
+                     # Check Source
+                    is_source_mgr = source_wh and source_wh.manager and source_wh.manager.user == user
+                    # Check Target
+                    is_target_mgr = target_wh.manager and target_wh.manager.user == user
+                
+                    if is_source_mgr and is_target_mgr:
+                        should_auto_approve = True
                     
-            if should_auto_approve:
-                transfer_req.status = StaffTransferRequest.STATUS_APPROVED
-                transfer_req.approved_by = user
-                transfer_req.approved_at = timezone.now()
-                transfer_req.save()
+                if should_auto_approve:
+                    transfer_req.status = StaffTransferRequest.STATUS_APPROVED
+                    transfer_req.approved_by = user
+                    transfer_req.approved_at = timezone.now()
+                    transfer_req.save()
                 
-                # Update Staff Warehouse
-                staff = transfer_req.staff
-                staff.warehouse = transfer_req.target_warehouse
-                staff.save()
+                    # Update Staff Warehouse
+                    staff = transfer_req.staff
+                    previous_warehouse_id = staff.warehouse_id
+                    staff.warehouse = transfer_req.target_warehouse
+                    staff.save()
+
+                    publish(StaffAssigned(
+                        staff_id=staff.id,
+                        user_id=staff.user_id,
+                        warehouse_id=staff.warehouse_id,
+                        previous_warehouse_id=previous_warehouse_id,
+                        actor_id=user.id,
+                    ))
         except Exception as e:
             import traceback
             log_error(f"Error creating transfer request: {e}")
@@ -2795,6 +3101,7 @@ class StaffTransferRequestListCreateAPIView(APIView):
 class StaffTransferApprovalAPIView(APIView):
     permission_classes = [IsAuthenticated]
 
+    @idempotent
     @transaction.atomic
     def post(self, request, pk):
         # Approve
@@ -2837,8 +3144,17 @@ class StaffTransferApprovalAPIView(APIView):
         
         # Update Staff
         staff = req.staff
+        previous_warehouse_id = staff.warehouse_id
         staff.warehouse = req.target_warehouse
         staff.save()
+
+        publish(StaffAssigned(
+            staff_id=staff.id,
+            user_id=staff.user_id,
+            warehouse_id=staff.warehouse_id,
+            previous_warehouse_id=previous_warehouse_id,
+            actor_id=user.id,
+        ))
         
         return Response({"status": "APPROVED", "staff": staff.user.username, "new_warehouse": req.target_warehouse.name})
 
@@ -2846,6 +3162,7 @@ class StaffTransferApprovalAPIView(APIView):
 class StaffTransferRejectAPIView(APIView):
     permission_classes = [IsAuthenticated]
 
+    @idempotent
     def post(self, request, pk):
         try:
             req = StaffTransferRequest.objects.select_related("staff", "target_warehouse", "staff__warehouse").get(id=pk)
@@ -2925,7 +3242,9 @@ class StockDetailAPIView(APIView):
 
     def get(self, request, pk):
         try:
-            stock = Stock.objects.select_related('product', 'warehouse').get(pk=pk)
+            stock = with_pending_receipts(
+                with_thresholds(Stock.objects.select_related('product', 'warehouse'))
+            ).get(pk=pk)
         except Stock.DoesNotExist:
             return Response({"error": "Stock not found"}, status=404)
         
@@ -3032,6 +3351,139 @@ class TransferRequestDetailAPIView(APIView):
         return Response(serializer.data)
 
 
+class PurchaseOrderListAPIView(APIView):
+    """
+    GET /api/purchase-orders/list/
+    Multi-line purchase orders with their lines, scoped like purchase requests.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        user = request.user
+
+        if user.role.name == Role.ADMIN:
+            qs = PurchaseOrder.objects.all()
+        elif user.role.name == Role.MANAGER:
+            qs = PurchaseOrder.objects.filter(warehouse__manager__user=user)
+        elif user.role.name == Role.STAFF:
+            if hasattr(user, "staff") and user.staff.warehouse:
+                qs = PurchaseOrder.objects.filter(warehouse=user.staff.warehouse)
+            else:
+                qs = PurchaseOrder.objects.none()
+        else:
+            qs = PurchaseOrder.objects.filter(viewer=user)
+
+        status_param = request.query_params.get("status")
+        if status_param:
+            qs = qs.filter(status=status_param)
+
+        qs = (
+            qs.select_related("warehouse", "viewer", "processed_by")
+            .prefetch_related(models.Prefetch("lines", PurchaseRequest.objects.select_related("product")))
+            .order_by("-id")
+        )
+
+        paginator = StandardResultsSetPagination()
+        page = paginator.paginate_queryset(qs, request)
+        return paginator.get_paginated_response(PurchaseOrderReadSerializer(page, many=True).data)
+
+
+class PurchaseOrderDetailAPIView(APIView):
+    """
+    GET /api/purchase-orders/{id}/detail/
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, pk):
+        try:
+            order = (
+                PurchaseOrder.objects
+                .select_related("warehouse", "viewer", "processed_by")
+                .prefetch_related(models.Prefetch("lines", PurchaseRequest.objects.select_related("product")))
+                .get(pk=pk)
+            )
+        except PurchaseOrder.DoesNotExist:
+            return Response({"error": "Purchase order not found"}, status=404)
+
+        user = request.user
+        if user.role.name == Role.ADMIN:
+            pass
+        elif user.role.name == Role.MANAGER:
+            if not Warehouse.objects.filter(id=order.warehouse_id, manager__user=user).exists():
+                return Response({"error": "Forbidden"}, status=403)
+        elif user.role.name == Role.STAFF:
+            if not (hasattr(user, "staff") and user.staff.warehouse_id == order.warehouse_id):
+                return Response({"error": "Forbidden"}, status=403)
+        elif order.viewer_id != user.id:
+            return Response({"error": "Forbidden"}, status=403)
+
+        return Response(PurchaseOrderReadSerializer(order).data)
+
+
+class TransferDocumentListAPIView(APIView):
+    """
+    GET /api/transfer-documents/list/
+    Multi-line transfer documents with their lines, scoped like transfer requests.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        user = request.user
+
+        if user.role.name == Role.ADMIN:
+            qs = TransferDocument.objects.all()
+        elif user.role.name == Role.MANAGER:
+            warehouses = Warehouse.objects.filter(manager__user=user)
+            qs = TransferDocument.objects.filter(
+                models.Q(source_warehouse__in=warehouses)
+                | models.Q(destination_warehouse__in=warehouses)
+            )
+        else:
+            qs = TransferDocument.objects.none()
+
+        status_param = request.query_params.get("status")
+        if status_param:
+            qs = qs.filter(status=status_param)
+
+        qs = (
+            qs.select_related("source_warehouse", "destination_warehouse", "requested_by", "approved_by")
+            .prefetch_related(models.Prefetch("lines", TransferRequest.objects.select_related("product")))
+            .order_by("-id")
+        )
+
+        paginator = StandardResultsSetPagination()
+        page = paginator.paginate_queryset(qs, request)
+        return paginator.get_paginated_response(TransferDocumentReadSerializer(page, many=True).data)
+
+
+class TransferDocumentDetailAPIView(APIView):
+    """
+    GET /api/transfer-documents/{id}/detail/
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, pk):
+        try:
+            document = (
+                TransferDocument.objects
+                .select_related("source_warehouse", "destination_warehouse", "requested_by", "approved_by")
+                .prefetch_related(models.Prefetch("lines", TransferRequest.objects.select_related("product")))
+                .get(pk=pk)
+            )
+        except TransferDocument.DoesNotExist:
+            return Response({"error": "Transfer document not found"}, status=404)
+
+        user = request.user
+        if user.role.name == Role.MANAGER:
+            warehouses = Warehouse.objects.filter(manager__user=user)
+            if not (document.source_warehouse in warehouses or document.destination_warehouse in warehouses):
+                return Response({"error": "Forbidden"}, status=403)
+        elif user.role.name != Role.ADMIN:
+            return Response({"error": "Forbidden"}, status=403)
+
+        return Response(TransferDocumentReadSerializer(document).data)
+
+
 class UserDetailAPIView(APIView):
     """
     GET /api/users/{id}/detail/